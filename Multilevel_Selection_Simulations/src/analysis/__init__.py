@@ -0,0 +1,18 @@
+'''
+Package description: loads and visualizes the data written by the simulations,
+    replacing the data preparation and plotting of the MATLAB scripts
+Modules:
+# sweeps.py:
+    # classes: SweepResults
+    # functions: loadSweep, lowPopulationMask, finalProportions, averageStdDeviations, parameterGrid,
+        derivedTables
+# figures.py:
+    # functions: lineSpecs, plotExperiment, plotAllExperiments
+    
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
@@ -0,0 +1,146 @@
+'''
+Module description:
+    renders the figures of the six experiments of simulation (see the experiment scripts
+    of package simulation) from the derived tables of analysis.sweeps, in place of the
+    MATLAB plotting scripts in matlab_scripts_and_functions. Each experiment gets the three
+    figures of the MATLAB scripts plus a heatmap of final prosocial proportions over both
+    swept parameters. Figures are drawn with matplotlib's non-interactive Agg backend, so
+    no display is needed. matplotlib is an optional dependency, required only to render the
+    figures: without it, the derived tables of analysis.sweeps are still available, and
+    plotExperiment raises RuntimeError
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from sweeps import derivedTables
+from os.path import join, dirname, abspath, exists
+from os import makedirs
+import numpy
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as pyplot
+except ImportError:
+    pyplot = None
+
+# experiment number: (CSV file name, outer swept parameter, inner swept parameter, prosocial phenotype name)
+EXPERIMENTS = {1: ('experiment1_MLS_by_stochastic_dynamics.csv', 'target group size', 'extra reproduction probability', 'altruistic'),
+               2: ('experiment2_weak_selection_control.csv', 'target group size', 'extra reproduction probability', 'altruistic'),
+               3: ('experiment3_phenotype_stratisfied_migration_control.csv', 'target group size', 'extra reproduction probability', 'altruistic'),
+               4: ('experiment4_phenotype_stratified_migration.csv', 'cost of prosociality', 'extra reproduction probability', 'altruistic'),
+               5: ('experiment5_random_redistribution.csv', 'cost of prosociality', 'extra reproduction probability', 'altruistic'),
+               6: ('experiment6_reciprocity.csv', 'cost of prosociality', 'extra reproduction probability', 'reciprocating')}
+
+AXIS_LABELS = {'target group size': 'Target Group Size', 'extra reproduction probability': 'Extra Reproduction Probability',
+               'cost of prosociality': 'Cost of Prosociality'}
+
+PROSOCIAL_NAMES = {'altruistic': 'Altruists', 'reciprocating': 'Reciprocators'}
+
+DATA_DIRECTORY = join(dirname(abspath(__file__)), '..', '..', '..', 'simulation_data')
+PLOT_DIRECTORY = join(dirname(abspath(__file__)), '..', '..', '..', 'python_generated_plots')
+
+def lineSpecs():
+
+    '''returns list of 21 unique matplotlib format strings, all dashed lines with three different markers
+    and 7 different colors, as by get21LineSpecs.m'''
+
+    markers = ['o', 's', '^']
+    colors = ['y', 'm', 'c', 'r', 'g', 'b', 'k']
+    return ['--' + colors[(i + 1) % 7] + markers[(i + 1) % 3] for i in range(21)]
+
+def _plotLines(axes, xValues, lineValues, grid, lineLabel):
+
+    '''plots one line per row of grid against xValues, labelled with the matching value of lineValues'''
+
+    specs = lineSpecs()
+    for lineIndex, lineValue in enumerate(lineValues):
+        axes.plot(xValues, grid[lineIndex], specs[lineIndex % len(specs)], label=str(lineValue))
+    axes.legend(title=lineLabel, loc='center left', bbox_to_anchor=(1, .5), fontsize='small')
+
+def plotExperiment(experimentNumber, dataDirectory=DATA_DIRECTORY, outputDirectory=PLOT_DIRECTORY, cacheDirectory=None):
+
+    '''
+    Description: saves the figures of one experiment as PNG files named experimentN_figure1.png through
+        experimentN_figure3.png and experimentN_heatmap.png. Figure 1 plots final prosocial proportions
+        against the inner swept parameter, one line per value of the outer; figure 2 plots them against
+        the outer, one line per value of the inner; figure 3 plots average standard deviations of groups'
+        prosocial proportions against the outer. Trials with low final populations are omitted
+
+    Parameters:
+    # experimentNumber: key of EXPERIMENTS
+    # dataDirectory: directory of CSV files
+    # outputDirectory: directory to which figures are saved, created if missing
+    # cacheDirectory: optional directory for cached derived tables (see analysis.sweeps.derivedTables)
+
+    Returns: list of paths of saved figures
+
+    Errors:
+    # RuntimeError: raised if matplotlib is not installed
+    '''
+
+    if pyplot is None:
+        raise RuntimeError('rendering figures requires matplotlib')
+    fileName, outerTitle, innerTitle, phenotypeName = EXPERIMENTS[experimentNumber]
+    if not exists(outputDirectory):
+        makedirs(outputDirectory)
+    tables = derivedTables(join(dataDirectory, fileName), outerTitle, innerTitle, cacheDirectory)
+    outerValues, innerValues = tables['rowValues'], tables['columnValues']
+    prosocialName = PROSOCIAL_NAMES[phenotypeName]
+    prefix = join(outputDirectory, 'experiment' + str(experimentNumber))
+    paths = []
+
+    figures = [(innerValues, outerValues, tables['finalProportions'], innerTitle, outerTitle, 'Final Proportion of ' + prosocialName),
+               (outerValues, innerValues, tables['finalProportions'].T, outerTitle, innerTitle, 'Final Proportion of ' + prosocialName),
+               (outerValues, innerValues, tables['averageStdDeviations'].T, outerTitle, innerTitle,
+                'Average Standard Deviation of ' + prosocialName[:-1] + ' Proportions')]
+    for figureIndex, (xValues, lineValues, grid, xTitle, lineTitle, yLabel) in enumerate(figures):
+        figure, axes = pyplot.subplots(figsize=(8, 5))
+        _plotLines(axes, xValues, lineValues, grid, AXIS_LABELS[lineTitle])
+        if figureIndex < 2:
+            # reference lines at the seed proportion and at one half
+            axes.axhline(float(tables['seedProportion']), color='r')
+            axes.axhline(.5, color='k')
+        axes.set_xlabel(AXIS_LABELS[xTitle])
+        axes.set_ylabel(yLabel)
+        figure.tight_layout()
+        paths.append(prefix + '_figure' + str(figureIndex + 1) + '.png')
+        figure.savefig(paths[-1])
+        pyplot.close(figure)
+
+    figure, axes = pyplot.subplots(figsize=(8, 5))
+    image = axes.imshow(numpy.ma.masked_invalid(tables['finalProportions']), origin='lower', aspect='auto',
+                        cmap='viridis', vmin=0, vmax=1,
+                        extent=(innerValues[0], innerValues[-1], outerValues[0], outerValues[-1]))
+    figure.colorbar(image, ax=axes, label='Final Proportion of ' + prosocialName)
+    axes.set_xlabel(AXIS_LABELS[innerTitle])
+    axes.set_ylabel(AXIS_LABELS[outerTitle])
+    figure.tight_layout()
+    paths.append(prefix + '_heatmap.png')
+    figure.savefig(paths[-1])
+    pyplot.close(figure)
+    return paths
+
+def plotAllExperiments(dataDirectory=DATA_DIRECTORY, outputDirectory=PLOT_DIRECTORY, cacheDirectory=None):
+
+    '''saves the figures of every experiment in EXPERIMENTS (see plotExperiment), returning list of paths'''
+
+    paths = []
+    for experimentNumber in sorted(EXPERIMENTS):
+        paths.extend(plotExperiment(experimentNumber, dataDirectory, outputDirectory, cacheDirectory))
+    return paths
+
+if __name__ == '__main__':
+
+    '''regenerates the figures of all experiments, caching derived tables alongside them'''
+
+    from time import time
+    startTime = time()
+    for path in plotAllExperiments(cacheDirectory=PLOT_DIRECTORY):
+        print(path)
+    print('execution time = ' + str(time() - startTime))
@@ -0,0 +1,210 @@
+'''
+Module description:
+    loads the CSV files written by simulation.evo_simulator.EvolutionSimulator into numpy
+    arrays and computes the derived tables used to visualize experiments: final prosocial
+    proportions with low populations masked, average standard deviations of groups'
+    prosocial proportions, and grids of either over two swept parameters. Replaces the
+    data preparation of the MATLAB scripts in matlab_scripts_and_functions (e.g.
+    omitProportionsOfLowPopulations.m), which re-parse the CSV files for every figure.
+    Derived tables may be cached to .npz files, which are reused until the CSV file changes
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+import csv
+import numpy
+from os import stat, makedirs
+from os.path import join, basename, exists
+
+# row titles of the data vectors written by EvolutionSimulator
+PROPORTIONS = 'prosociality proportions:'
+POPULATIONS = 'population counts:'
+GROUPS = 'groups counts:'
+STD_DEVIATIONS = 'standard deviations in prosocial proportions'
+
+class SweepResults:
+
+    '''
+    Description: the trials of a CSV file written by EvolutionSimulator, parsed once into arrays. Each
+        trial is a run of the simulator, written as one row per data vector, beginning with the row of
+        prosociality proportions. Data vectors are looked up by row title, so files with extra data
+        vectors (e.g. the Price equation terms) or written before parameters were added load alike.
+        Trials with fewer rounds than others are padded with NaN
+
+    Instance variables:
+    # filePath: path of CSV file
+    # parameterTitles: list of titles of the parameter columns
+    # parameters: float array of shape (numTrials, number of parameters)
+    # roundTitles: list of titles of the data columns, beginning with 'starting state'
+    # dataVecs: dictionary from row title to float array of shape (numTrials, len(roundTitles))
+    # numTrials: number of trials
+
+    Constructor method signature: __init__(self, filePath)
+
+    Public methods:
+    # parameter(title): returns array of the value of the parameter with the given title in every trial
+    # dataVec(rowTitle): returns array of shape (numTrials, len(roundTitles)) of a data vector
+    # finalValues(rowTitle): returns array of the last recorded value of a data vector in every trial
+    '''
+
+    def __init__(self, filePath):
+
+        '''
+        Errors:
+        # RuntimeError: raised if the file has no column titles or no trials
+        '''
+
+        self.filePath = filePath
+        with open(filePath, 'r') as csvFile:
+            rows = list(csv.reader(csvFile))
+        if not rows or rows[0][0] != 'dependent vars' or len(rows) < 2:
+            raise RuntimeError(filePath + ' is not a CSV file of simulation trials')
+        titles = rows[0]
+        startingStateIndex = titles.index('starting state')
+        self.parameterTitles = titles[1:startingStateIndex]
+        self.roundTitles = titles[startingStateIndex:]
+
+        # assign every row to the trial begun by the latest row of prosociality proportions
+        trialIndices = numpy.cumsum([row[0] == PROPORTIONS for row in rows[1:]]) - 1
+        self.numTrials = int(trialIndices[-1]) + 1
+        self.parameters = numpy.full((self.numTrials, len(self.parameterTitles)), numpy.nan)
+        self.dataVecs = {}
+        for row, trialIndex in zip(rows[1:], trialIndices):
+            values = numpy.array([float(value) for value in row[1:] if value != ''])
+            if row[0] not in self.dataVecs:
+                self.dataVecs[row[0]] = numpy.full((self.numTrials, len(self.roundTitles)), numpy.nan)
+            self.parameters[trialIndex] = values[:startingStateIndex - 1]
+            self.dataVecs[row[0]][trialIndex, :len(values) - startingStateIndex + 1] = values[startingStateIndex - 1:]
+
+    def parameter(self, title):
+
+        '''returns array of the value of the parameter with the given title in every trial'''
+
+        return self.parameters[:, self.parameterTitles.index(title)]
+
+    def dataVec(self, rowTitle):
+
+        '''returns array of shape (numTrials, len(roundTitles)) of the data vector with the given row title'''
+
+        return self.dataVecs[rowTitle]
+
+    def finalValues(self, rowTitle):
+
+        '''returns array of the last recorded (non-NaN) value of a data vector in every trial'''
+
+        dataVec = self.dataVecs[rowTitle]
+        recorded = ~numpy.isnan(dataVec)
+        lastIndices = recorded.shape[1] - 1 - numpy.argmax(recorded[:, ::-1], axis=1)
+        return dataVec[numpy.arange(self.numTrials), lastIndices]
+
+def loadSweep(filePath):
+
+    '''returns SweepResults for the CSV file at filePath'''
+
+    return SweepResults(filePath)
+
+def lowPopulationMask(results):
+
+    '''
+    Description: returns boolean array, true for every trial whose final population is greater than zero
+        but less than its starting population. Proportions of such trials are prone to be misleading, so
+        are omitted from figures, as by omitProportionsOfLowPopulations.m
+    '''
+
+    populations = results.dataVec(POPULATIONS)
+    finalPopulations = results.finalValues(POPULATIONS)
+    return (finalPopulations < populations[:, 0]) & (finalPopulations > 0)
+
+def finalProportions(results, omitLowPopulations=True):
+
+    '''returns array of final prosocial proportions of every trial, NaN for trials masked by
+    lowPopulationMask if omitLowPopulations is true'''
+
+    proportions = results.finalValues(PROPORTIONS)
+    if omitLowPopulations:
+        proportions = numpy.where(lowPopulationMask(results), numpy.nan, proportions)
+    return proportions
+
+def averageStdDeviations(results, omitLowPopulations=True):
+
+    '''returns array of the mean over rounds of the standard deviation in groups' prosocial proportions
+    of every trial, counting the -1 recorded upon extinction as 0. NaN for trials masked by
+    lowPopulationMask if omitLowPopulations is true'''
+
+    stdDeviations = numpy.clip(results.dataVec(STD_DEVIATIONS), 0, None)
+    recorded = ~numpy.isnan(stdDeviations)
+    averages = numpy.where(recorded, stdDeviations, 0).sum(axis=1) / numpy.maximum(recorded.sum(axis=1), 1)
+    if omitLowPopulations:
+        averages = numpy.where(lowPopulationMask(results), numpy.nan, averages)
+    return averages
+
+def parameterGrid(results, rowTitle, columnTitle, values):
+
+    '''
+    Description: arranges a value per trial in a grid over two swept parameters, averaging the trials
+        that share a combination of parameter values and ignoring NaN values
+
+    Parameters:
+    # results: SweepResults
+    # rowTitle, columnTitle: titles of the parameters indexing rows and columns of the grid
+    # values: array with one value per trial
+
+    Returns: tuple (rowValues, columnValues, grid), where rowValues and columnValues are the sorted
+        distinct values of the two parameters, and grid has shape (len(rowValues), len(columnValues)),
+        NaN where no trial has a value
+    '''
+
+    rowValues, rowIndices = numpy.unique(results.parameter(rowTitle), return_inverse=True)
+    columnValues, columnIndices = numpy.unique(results.parameter(columnTitle), return_inverse=True)
+    recorded = ~numpy.isnan(values)
+    sums = numpy.zeros((len(rowValues), len(columnValues)))
+    counts = numpy.zeros((len(rowValues), len(columnValues)))
+    numpy.add.at(sums, (rowIndices[recorded], columnIndices[recorded]), values[recorded])
+    numpy.add.at(counts, (rowIndices[recorded], columnIndices[recorded]), 1)
+    grid = numpy.full(sums.shape, numpy.nan)
+    grid[counts > 0] = sums[counts > 0] / counts[counts > 0]
+    return rowValues, columnValues, grid
+
+def derivedTables(filePath, rowTitle, columnTitle, cacheDirectory=None):
+
+    '''
+    Description: computes grids over two swept parameters of final prosocial proportions and average
+        standard deviations, with low populations omitted. If cacheDirectory is given, the tables are
+        saved there to an .npz file named after the CSV file, and later calls read them back unless the
+        CSV file's size or modification time has changed or a different grid is asked for
+
+    Parameters:
+    # filePath: path of CSV file written by EvolutionSimulator
+    # rowTitle, columnTitle: titles of the parameters indexing rows and columns of the grids
+    # cacheDirectory: optional directory for cached tables, created if missing
+
+    Returns: dictionary with arrays 'rowValues', 'columnValues', 'finalProportions',
+        'averageStdDeviations', and 'seedProportion' (the seed proportion prosocial of the first trial)
+    '''
+
+    fileStat = stat(filePath)
+    signature = numpy.array([fileStat.st_size, fileStat.st_mtime])
+    cachePath = join(cacheDirectory, basename(filePath) + '.npz') if cacheDirectory is not None else None
+    if cachePath is not None and exists(cachePath):
+        cached = numpy.load(cachePath)
+        if (numpy.array_equal(cached['signature'], signature) and str(cached['rowTitle']) == rowTitle
+                and str(cached['columnTitle']) == columnTitle):
+            return dict((key, cached[key]) for key in ('rowValues', 'columnValues', 'finalProportions',
+                                                       'averageStdDeviations', 'seedProportion'))
+
+    results = loadSweep(filePath)
+    rowValues, columnValues, proportionsGrid = parameterGrid(results, rowTitle, columnTitle, finalProportions(results))
+    _, _, stdDeviationsGrid = parameterGrid(results, rowTitle, columnTitle, averageStdDeviations(results))
+    tables = {'rowValues': rowValues, 'columnValues': columnValues, 'finalProportions': proportionsGrid,
+              'averageStdDeviations': stdDeviationsGrid,
+              'seedProportion': numpy.array(results.parameter('seed proportion prosocial')[0])}
+    if cachePath is not None:
+        if not exists(cacheDirectory):
+            makedirs(cacheDirectory)
+        numpy.savez(cachePath, signature=signature, rowTitle=rowTitle, columnTitle=columnTitle, **tables)
+    return tables
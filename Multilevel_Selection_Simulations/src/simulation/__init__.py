@@ -3,9 +3,44 @@ Package description: defines the evolutionary simulator and related modules,
     and contains scripts for running experiments that generate data
 Modules:
 # evo_simulator.py:
-    # classes: EvolutionSimulator
+    # classes: EvolutionSimulator, RoundSnapshot
 # migration.py:
     # classes: MigrationType
+# strategy_simulator.py:
+    # classes: StrategySimulator
+# composition_simulator.py:
+    # classes: CompositionSimulator
+# lane_simulator.py:
+    # classes: LaneSimulator
+# data_vectors.py:
+    # functions: prefixParams, parametersFromPrefix, roundTitles, columnTitles, finalizedDataVecs, writeRows,
+        printRows, readFinalValues
+# recorder.py:
+    # classes: TrajectoryRecorder
+# group_statistics.py:
+    # functions: computeStatistics, quantileStatistic, and the statistics of dictionary STATISTICS
+# group_competition.py:
+    # functions: groupSizeFitness, exponentialFitness, sampleAliasTable, sampleCumulative, competitionEvents
+# sweep.py:
+    # functions: gridPoints, encodeParameters, decodeParameters, parameterKey, runTrial
+# job_queue.py:
+    # classes: JobQueue
+    # functions: runWorker, runLocalWorkers
+# run_catalog.py:
+    # classes: RunCatalog
+    # functions: codeVersion, engineName, runCataloged
+# surrogate.py:
+    # classes: SurrogateModel
+    # functions: sweepObservations
+# abc_inference.py:
+    # classes: ABCSMC
+    # functions: proportionDistance, usesLanes, simulateBatch
+# sensitivity.py:
+    # functions: sobolSequence, saltelliDesign, scalePoint, sobolIndices, sensitivityAnalysis
+# common_random_numbers.py:
+    # functions: finalProportion, survivingFinalProportion, pairedTrials, compareConfigurations
+# approximation_error.py:
+    # functions: approximationError
     
 Created: Spring 2017
 
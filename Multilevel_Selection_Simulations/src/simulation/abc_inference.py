@@ -0,0 +1,340 @@
+'''
+Module description:
+    fits parameters of simulation.evo_simulator.EvolutionSimulator, such as the cost of
+    prosociality and the extra reproduction probability, to an observed trajectory of prosocial
+    proportions by approximate Bayesian computation with sequential Monte Carlo (ABC-SMC).
+    Proposals are simulated in large batches: when every parameter of the model can differ
+    between the lanes of simulation.lane_simulator.LaneSimulator, a batch runs as lanes of one
+    array pass, and otherwise trial by trial (see simulation.sweep.runTrial), with batches split
+    among processes on all cores. Each generation accepts proposals whose trajectory is within a
+    tolerance of the observed one, the tolerance shrinking from generation to generation. The
+    state of the inference is checkpointed to a file after every batch, so that an interrupted
+    run resumes where it stopped
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from lane_simulator import LaneSimulator, LANE_PARAMETERS
+from sweep import runTrial
+from socialunits import jit
+from multiprocessing import Pool, cpu_count
+import json, os
+import numpy
+
+# parameters, besides those of LANE_PARAMETERS, that simulation.lane_simulator.LaneSimulator accepts
+LANE_SHARED_PARAMETERS = ['migrationFunction', 'prosocialPhenotype', 'reproduction', 'typeProsociality', 'rounds',
+                          'populationBudget']
+
+def proportionDistance(simulated, observed):
+
+    '''returns the root mean square difference between a simulated and an observed trajectory of prosocial
+    proportions. A simulated trajectory that ended early (a lane over its population budget) has no value for
+    the later rounds to compare, so is infinitely distant'''
+
+    if len(simulated) < len(observed):
+        return float('inf')
+    return float(numpy.sqrt(numpy.mean((numpy.array(simulated[:len(observed)]) - numpy.array(observed)) ** 2)))
+
+def usesLanes(baseParameters, names):
+
+    '''returns whether points of baseParameters varied in the parameters names can run as lanes of
+    simulation.lane_simulator.LaneSimulator'''
+
+    return (all(name in LANE_PARAMETERS for name in names) and
+            all(name in LANE_PARAMETERS or name in LANE_SHARED_PARAMETERS for name in baseParameters))
+
+def simulateBatch(baseParameters, proposals, seed=None):
+
+    '''
+    Description: simulates one trial of every proposal and returns their trajectories of prosocial proportions
+
+    Parameters:
+    # baseParameters: parameters shared by every proposal, not encoded
+    # proposals: list of dictionaries of the values of the inferred parameters
+    # seed: optional seed of numpy.random and compiled kernels, and of random for trials run one by one
+
+    Returns: list of lists of prosocial proportions, one per proposal, beginning with the starting state
+    '''
+
+    if seed is not None:
+        jit.seed(seed)
+    if usesLanes(baseParameters, proposals[0].keys() if proposals else []):
+        simulator = LaneSimulator(proposals, toPrintDataVecs=False, recordData=True, **baseParameters)
+        simulator.runEvolutionarySimulation()
+        return [result['prosocialProportions'] for result in simulator.laneResults()]
+    trajectories = []
+    for index, proposal in enumerate(proposals):
+        point = dict(baseParameters, **proposal)
+        if seed is not None:
+            point['seed'] = seed + index
+        trajectories.append(runTrial(point)['prosocialProportions'])
+    return trajectories
+
+def _simulateChunk(arguments):
+
+    '''runs simulateBatch on a chunk of proposals in a worker process'''
+
+    return simulateBatch(*arguments)
+
+class ABCSMC:
+
+    '''
+    Description: approximate Bayesian computation by sequential Monte Carlo, after Beaumont et al. (2009),
+        with uniform priors and an adaptive tolerance. Generation 0 accepts particles proposals drawn from the
+        priors. The tolerance of each later generation is the given quantile of the distances of the previous
+        generation's particles, and its proposals are particles of the previous generation, drawn by weight,
+        perturbed by independent normal steps of twice the weighted variance of each parameter, and discarded if
+        outside the priors. Proposals are accepted if the distance of their simulated trajectory to the observed
+        one (see proportionDistance) is within the tolerance, and weighted by the inverse of their density under
+        the perturbation of the previous generation. Proposals at infinite distance, whose trajectory ended early,
+        are rejected even in generation 0
+
+    Parameters/instance variables:
+    # observed: observed trajectory of prosocial proportions, one per round beginning with the starting state
+    # baseParameters: parameters of the simulations shared by every proposal (not encoded), including rounds
+    # priors: dictionary from name of each inferred parameter to (low, high) of its uniform prior
+    # particles: number of particles accepted per generation
+    # quantile: quantile of the previous generation's distances that sets the tolerance
+    # batchSize: number of proposals simulated at a time
+    # processes: number of worker processes among which every batch is split, by default the number of cores
+    # checkpointPath: optional path of a JSON file to which the state is written after every batch, and from
+        which it is restored on construction if the file exists
+
+    Other instance variables:
+    # names: sorted list of names of inferred parameters
+    # generation: number of the generation being accepted
+    # tolerance: tolerance of the current generation (inf for generation 0)
+    # population, weights, distances: arrays of the accepted particles (one row per particle, one column per
+        name), their normalized weights, and their distances, of the last completed generation
+    # accepted: list of (particle, weight, distance) accepted so far in the current generation
+    # simulations: total number of simulations run
+    # history: list of (tolerance, simulations) of every completed generation
+
+    Constructor method signature: __init__(self, observed, baseParameters, priors, particles=200, quantile=.5,
+        batchSize=1000, processes=None, checkpointPath=None)
+
+    Public methods:
+    # run(generations): runs until generations generations have completed, and returns population and weights
+    # posteriorMean(): returns dictionary from name to weighted mean of the last completed generation
+    # posteriorStandardDeviation(): returns dictionary from name to weighted standard deviation of the last
+        completed generation
+    '''
+
+    def __init__(self, observed, baseParameters, priors, particles=200, quantile=.5, batchSize=1000, processes=None,
+                 checkpointPath=None):
+        self.observed = list(observed)
+        self.baseParameters = baseParameters
+        self.priors = priors
+        self.names = sorted(priors)
+        self.particles = particles
+        self.quantile = quantile
+        self.batchSize = batchSize
+        self.processes = processes if processes is not None else cpu_count()
+        self.checkpointPath = checkpointPath
+        self.generation = 0
+        self.tolerance = float('inf')
+        self.population = None
+        self.weights = None
+        self.distances = None
+        self.accepted = []
+        self.simulations = 0
+        self.history = []
+        self.lows = numpy.array([priors[name][0] for name in self.names], dtype=float)
+        self.highs = numpy.array([priors[name][1] for name in self.names], dtype=float)
+        if checkpointPath is not None and os.path.exists(checkpointPath):
+            self._restore()
+
+    def _checkpoint(self):
+
+        '''writes the state of the inference to checkpointPath, replacing the previous checkpoint only once the
+        new one is complete'''
+
+        if self.checkpointPath is None:
+            return
+        randomState = numpy.random.get_state()
+        state = {'generation': self.generation, 'tolerance': self.tolerance, 'simulations': self.simulations,
+                 'history': self.history, 'accepted': [(list(particle), weight, distance) for particle, weight, distance
+                                                       in self.accepted],
+                 'population': self.population.tolist() if self.population is not None else None,
+                 'weights': self.weights.tolist() if self.weights is not None else None,
+                 'distances': self.distances.tolist() if self.distances is not None else None,
+                 'randomState': [randomState[0], randomState[1].tolist()] + list(randomState[2:])}
+        temporaryPath = self.checkpointPath + '.tmp'
+        with open(temporaryPath, 'w') as checkpointFile:
+            json.dump(state, checkpointFile)
+        if os.path.exists(self.checkpointPath):
+            os.remove(self.checkpointPath)
+        os.rename(temporaryPath, self.checkpointPath)
+
+    def _restore(self):
+
+        '''restores the state of the inference from checkpointPath'''
+
+        with open(self.checkpointPath) as checkpointFile:
+            state = json.load(checkpointFile)
+        self.generation = state['generation']
+        self.tolerance = state['tolerance']
+        self.simulations = state['simulations']
+        self.history = [tuple(entry) for entry in state['history']]
+        self.accepted = [(numpy.array(particle), weight, distance) for particle, weight, distance in state['accepted']]
+        if state['population'] is not None:
+            self.population = numpy.array(state['population'])
+            self.weights = numpy.array(state['weights'])
+            self.distances = numpy.array(state['distances'])
+        randomState = state['randomState']
+        numpy.random.set_state((str(randomState[0]), numpy.array(randomState[1], dtype=numpy.uint32)) +
+                               tuple(randomState[2:]))
+
+    def _perturbationDeviations(self):
+
+        '''returns the standard deviations of the perturbation of each parameter'''
+
+        mean = self.weights.dot(self.population)
+        return numpy.sqrt(2 * self.weights.dot((self.population - mean) ** 2)) + 1e-12
+
+    def _propose(self, count):
+
+        '''returns array of count proposals inside the priors, one row per proposal'''
+
+        if self.population is None:
+            return self.lows + (self.highs - self.lows) * numpy.random.random_sample((count, len(self.names)))
+        deviations = self._perturbationDeviations()
+        proposals = numpy.empty((0, len(self.names)))
+        while len(proposals) < count:
+            ancestors = numpy.random.choice(len(self.population), count, p=self.weights)
+            candidates = self.population[ancestors] + deviations * numpy.random.standard_normal((count, len(self.names)))
+            inside = ((candidates >= self.lows) & (candidates <= self.highs)).all(axis=1)
+            proposals = numpy.vstack([proposals, candidates[inside]])
+        return proposals[:count]
+
+    def _weight(self, particle):
+
+        '''returns the unnormalized weight of an accepted particle. Priors are uniform, so only the density of
+        the perturbation matters'''
+
+        if self.population is None:
+            return 1.0
+        deviations = self._perturbationDeviations()
+        densities = numpy.exp(-.5 * (((particle - self.population) / deviations) ** 2).sum(axis=1))
+        return 1.0 / self.weights.dot(densities)
+
+    def _simulate(self, proposals):
+
+        '''simulates a batch of proposals, split among worker processes, and returns their distances'''
+
+        points = [dict(zip(self.names, [float(value) for value in proposal])) for proposal in proposals]
+        numChunks = max(min(self.processes, len(points)), 1)
+        chunks = [(self.baseParameters, points[start::numChunks], int(numpy.random.randint(2 ** 31 - 1)))
+                  for start in range(numChunks)]
+        if numChunks == 1:
+            chunkTrajectories = [_simulateChunk(chunks[0])]
+        else:
+            pool = Pool(numChunks)
+            try:
+                chunkTrajectories = pool.map(_simulateChunk, chunks)
+            finally:
+                pool.close()
+                pool.join()
+        # chunks took every numChunks-th point, so their trajectories interleave back into order
+        trajectories = [None] * len(points)
+        for start, chunk in enumerate(chunkTrajectories):
+            trajectories[start::numChunks] = chunk
+        self.simulations += len(points)
+        return numpy.array([proportionDistance(trajectory, self.observed) for trajectory in trajectories])
+
+    def _completeGeneration(self):
+
+        '''makes the particles accepted in the current generation the population, and sets the tolerance of the
+        next generation'''
+
+        accepted = self.accepted[:self.particles]
+        self.population = numpy.array([particle for particle, _, _ in accepted])
+        weights = numpy.array([weight for _, weight, _ in accepted])
+        self.weights = weights / weights.sum()
+        self.distances = numpy.array([distance for _, _, distance in accepted])
+        self.history.append((self.tolerance, self.simulations))
+        self.generation += 1
+        self.tolerance = float(numpy.percentile(self.distances, 100 * self.quantile))
+        self.accepted = []
+
+    def run(self, generations):
+
+        '''
+        Description: runs the inference until generations generations have completed, continuing from the
+            checkpoint if one was restored
+
+        Parameters:
+        # generations: total number of generations, counting generation 0
+
+        Returns: tuple (population, weights) of the last completed generation
+        '''
+
+        while self.generation < generations:
+            # particles are weighted against the population of the previous generation
+            while len(self.accepted) < self.particles:
+                proposals = self._propose(self.batchSize)
+                distances = self._simulate(proposals)
+                for proposal, distance in zip(proposals, distances):
+                    if distance <= self.tolerance and numpy.isfinite(distance):
+                        self.accepted.append((proposal, self._weight(proposal), float(distance)))
+                if len(self.accepted) >= self.particles:
+                    self._completeGeneration()
+                    self._checkpoint()
+                    break
+                self._checkpoint()
+        return self.population, self.weights
+
+    def posteriorMean(self):
+
+        '''returns dictionary from name of each inferred parameter to its weighted mean over the particles of the
+        last completed generation'''
+
+        mean = self.weights.dot(self.population)
+        return dict(zip(self.names, mean))
+
+    def posteriorStandardDeviation(self):
+
+        '''returns dictionary from name of each inferred parameter to its weighted standard deviation over the
+        particles of the last completed generation'''
+
+        mean = self.weights.dot(self.population)
+        return dict(zip(self.names, numpy.sqrt(self.weights.dot((self.population - mean) ** 2))))
+
+if __name__ == '__main__':
+
+    '''infers the cost of prosociality and extra reproduction probability of a trajectory simulated with known
+    values, checkpointing to a temporary file, then resumes from the checkpoint to run further generations'''
+
+    from socialunits.enums import ReproductionType, ProsocialityType
+    from migration import randomRedistribution
+    from tempfile import mkdtemp
+    from time import time
+
+    base = dict(numGroups=100, migrationFunction=randomRedistribution, rounds=20, targetGroupSize=10,
+                seedProportionProsocial=.5, reproduction=ReproductionType.asexual, baseReproductionChances=1,
+                baseReproductionProbability=.9, mutationRate=0.0, typeProsociality=ProsocialityType.strong,
+                populationBudget=10 ** 5)
+    truth = {'costOfProsociality': .05, 'extraReproductionProbability': .3}
+    observed = simulateBatch(base, [truth], seed=1)[0]
+    priors = {'costOfProsociality': (0.0, .2), 'extraReproductionProbability': (0.0, .5)}
+    checkpointPath = os.path.join(mkdtemp(), 'abc.json')
+
+    numpy.random.seed(2)
+    for generations in [3, 5]:
+        # the second inference is constructed afresh and resumes from the checkpoint of the first
+        inference = ABCSMC(observed, base, priors, particles=300, batchSize=2000, checkpointPath=checkpointPath)
+        startTime = time()
+        simulationsBefore = inference.simulations
+        inference.run(generations)
+        seconds = time() - startTime
+        mean, deviation = inference.posteriorMean(), inference.posteriorStandardDeviation()
+        print('after ' + str(inference.generation) + ' generations (tolerance ' + str(round(inference.history[-1][0], 4)) +
+              ', ' + str(inference.simulations) + ' simulations, ' +
+              str(int((inference.simulations - simulationsBefore) / seconds)) + ' per second): ' +
+              ', '.join(name + ' ' + str(round(mean[name], 4)) + ' +/- ' + str(round(deviation[name], 4)) + ' (true ' +
+                        str(truth[name]) + ')' for name in inference.names))
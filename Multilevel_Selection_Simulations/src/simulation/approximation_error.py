@@ -0,0 +1,110 @@
+'''
+Module description:
+    reports the error of the normal approximation mode of
+    simulation.evo_simulator.EvolutionSimulator (see its normalApproximationThreshold)
+    against the exact engine. Every binomial count the mode approximates has a distribution
+    function within a Berry-Esseen bound of the exact one, and the error this brings about in
+    data vectors is estimated by running replicates of both engines and comparing their mean
+    trajectories round by round
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from sweep import runTrial
+from socialunits.vectorized import normalApproximationBound
+from time import time
+import numpy
+
+def approximationError(parameters, normalThreshold, replicates, seed=0):
+
+    '''
+    Description: runs replicates of a parameter point with the exact engine and with the normal approximation,
+        and compares the mean prosocial proportion and population count of every round. Replicate r of both
+        runs with seed seed + r. Rounds in which a run's population is extinct are left out of its mean
+        proportion
+
+    Parameters:
+    # parameters: parameter point, as for simulation.sweep.runTrial, without normalApproximationThreshold
+    # normalThreshold: normalApproximationThreshold of the approximate runs
+    # replicates: number of replicates of each engine, at least 2
+    # seed: seed of the first replicate
+
+    Returns: dictionary with entries
+    # proportionDifferences: array of the mean prosocial proportion of approximate runs minus that of exact
+        runs, per round, beginning with the starting state
+    # proportionStandardErrors: array of the standard errors of proportionDifferences
+    # maxZScore: largest absolute ratio of a difference to its standard error, over rounds with both
+    # populationRatios: array of the mean population count of approximate runs over that of exact runs, per
+        round (nan where exact runs are extinct)
+    # distributionBound: bound on the distance between the distribution functions of an approximated count
+        and of the exact one (see socialunits.vectorized.normalApproximationBound)
+    # exactSeconds, approximateSeconds: seconds taken by the runs of each engine
+    '''
+
+    trajectories = []
+    seconds = []
+    for threshold in [None, normalThreshold]:
+        point = dict(parameters) if threshold is None else dict(parameters, normalApproximationThreshold=threshold)
+        results = []
+        startTime = time()
+        for replicate in range(replicates):
+            results.append(runTrial(dict(point, seed=seed + replicate)))
+        seconds.append(time() - startTime)
+        proportions = numpy.array([result['prosocialProportions'] for result in results], dtype=float)
+        populations = numpy.array([result['populationCounts'] for result in results], dtype=float)
+        trajectories.append((numpy.ma.masked_less(proportions, 0.0), populations))
+
+    (exactProportions, exactPopulations), (approximateProportions, approximatePopulations) = trajectories
+    differences = approximateProportions.mean(axis=0) - exactProportions.mean(axis=0)
+    standardErrors = numpy.ma.sqrt(approximateProportions.var(axis=0, ddof=1) / approximateProportions.count(axis=0) +
+                                   exactProportions.var(axis=0, ddof=1) / exactProportions.count(axis=0))
+    zScores = numpy.ma.masked_where(standardErrors == 0, differences) / standardErrors
+    exactMeans = exactPopulations.mean(axis=0)
+    return {'proportionDifferences': differences.filled(numpy.nan),
+            'proportionStandardErrors': standardErrors.filled(numpy.nan),
+            'maxZScore': float(abs(zScores).max()) if zScores.count() else 0.0,
+            'populationRatios': approximatePopulations.mean(axis=0) / numpy.where(exactMeans > 0, exactMeans, numpy.nan),
+            'distributionBound': float(normalApproximationBound(normalThreshold)),
+            'exactSeconds': seconds[0],
+            'approximateSeconds': seconds[1]}
+
+if __name__ == '__main__':
+
+    '''reports the error of the approximation for groups of 100 against the exact engine, then times rounds of
+    the simulator for groups of growing size with both engines'''
+
+    from socialunits.enums import ReproductionType, ProsocialityType
+    from evo_simulator import EvolutionSimulator
+    from migration import randomRedistribution
+
+    parameters = dict(numGroups=20, migrationFunction=randomRedistribution, rounds=10, targetGroupSize=100,
+                      seedProportionProsocial=.5, reproduction=ReproductionType.asexual, costOfProsociality=.05,
+                      extraReproductionProbability=.3, baseReproductionChances=1, baseReproductionProbability=.8,
+                      mutationRate=.01, typeProsociality=ProsocialityType.strong, generationsPerMigration=2)
+    for normalThreshold in [10, 50]:
+        error = approximationError(parameters, normalThreshold, 100)
+        print('threshold ' + str(normalThreshold) + ': distribution bound per count ' +
+              str(round(error['distributionBound'], 4)) + ', largest difference in mean proportion ' +
+              str(round(abs(error['proportionDifferences']).max(), 4)) + ' (max |z| ' + str(round(error['maxZScore'], 2)) +
+              '), population ratios ' + str(round(numpy.nanmin(error['populationRatios']), 4)) + ' to ' +
+              str(round(numpy.nanmax(error['populationRatios']), 4)) + ', seconds exact ' +
+              str(round(error['exactSeconds'], 2)) + ' vs approximate ' + str(round(error['approximateSeconds'], 2)))
+
+    print('group size, milliseconds per group-round of EvolutionSimulator (exact, approximate)')
+    for groupSize in [10 ** 2, 10 ** 3, 10 ** 4]:
+        point = dict(parameters, numGroups=100, targetGroupSize=groupSize, rounds=5, generationsPerMigration=1,
+                     recordData=True, toPrintDataVecs=False, threaded=False)
+        times = []
+        # the exact engine builds every individual, so is left out for the largest groups
+        for threshold in ([None, 10] if groupSize <= 10 ** 3 else [10]):
+            simulator = EvolutionSimulator(normalApproximationThreshold=threshold, **point)
+            startTime = time()
+            simulator.runEvolutionarySimulation()
+            groupRounds = sum(simulator.groupCountsVec[1:])
+            times.append(str(round((time() - startTime) / groupRounds * 1000, 3)))
+        print(str(groupSize) + ', ' + ', '.join(['-'] * (2 - len(times)) + times))
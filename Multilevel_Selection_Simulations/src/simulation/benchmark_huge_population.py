@@ -0,0 +1,56 @@
+'''
+Module description:
+    this script benchmarks simulation.strategy_simulator.StrategySimulator in its huge-population
+    mode, in which groups stream through the life cycle and migration in chunks. Populations from
+    10^4 to 10^7 individuals, in groups of 10, are each run for a few rounds of the default social
+    game with random redistribution, in a separate process so that every run's peak memory is
+    measured on its own. Time per individual per round should stay roughly constant as the
+    population grows, i.e. time scales linearly with population size, while peak memory grows
+    only by the count arrays
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from strategy_simulator import StrategySimulator
+from socialunits.enums import Phenotype, ProsocialityType
+from socialunits.kernels import SoberWilsonKernel
+from migration import randomRedistribution
+from multiprocessing import Process, Queue
+from time import time
+import resource
+
+def runBenchmark(populationSize, rounds, chunkSize, resultQueue):
+
+    '''runs one simulation of populationSize individuals and puts (seconds, peak memory in MB) on resultQueue'''
+
+    simulator = StrategySimulator(numGroups=populationSize // 10, migrationFunction=randomRedistribution,
+                                  strategyNames=['altruistic', 'selfish'], payoffKernel=SoberWilsonKernel(Phenotype.altruistic),
+                                  rounds=rounds, targetGroupSize=10, seedProportions=[.5, .5], costOfProsociality=.02,
+                                  extraReproductionProbability=.15, baseReproductionChances=1,
+                                  baseReproductionProbability=.9, typeProsociality=ProsocialityType.strong,
+                                  toPrintDataVecs=False, chunkSize=chunkSize)
+    startTime = time()
+    simulator.runEvolutionarySimulation()
+    # ru_maxrss is in kilobytes on Linux
+    resultQueue.put((time() - startTime, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0))
+
+if __name__ == '__main__':
+
+    '''runs the benchmark at every population size, each in its own process'''
+
+    rounds = 5
+    chunkSize = 2 ** 16
+    print('population, seconds, nanoseconds per individual per round, peak memory (MB)')
+    for populationSize in [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]:
+        resultQueue = Queue()
+        process = Process(target=runBenchmark, args=(populationSize, rounds, chunkSize, resultQueue))
+        process.start()
+        seconds, peakMemory = resultQueue.get()
+        process.join()
+        print(str(populationSize) + ', ' + str(round(seconds, 2)) + ', ' +
+              str(round(seconds * 1e9 / (populationSize * rounds), 1)) + ', ' + str(round(peakMemory, 1)))
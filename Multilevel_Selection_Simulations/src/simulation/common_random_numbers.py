@@ -0,0 +1,141 @@
+'''
+Module description:
+    estimates differences between two parameter points (e.g. random vs biased redistribution,
+    or two costs of prosociality) by paired trials that use common random numbers: both
+    points of a replicate run with the same randomSeed of
+    simulation.evo_simulator.EvolutionSimulator, and so draw from synchronized random streams.
+    Optionally each replicate also runs the antithetic counterparts of both trials. The
+    variance of the estimated difference is compared with that of independent trials, estimated
+    from the same runs, and reported as a variance reduction factor: the number of independent
+    trials that would be needed for every trial run here to reach the same precision. Drift
+    amplifies the small differences between paired runs from round to round, so the reduction
+    is largest for responses measured after few rounds. Replicates in which any trial's population
+    went extinct are left out of the comparison
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from sweep import runTrial
+import numpy
+
+def finalProportion(result):
+
+    '''returns the final prosocial proportion of a trial's result (-.1 if the population went extinct)'''
+
+    return result['prosocialProportions'][-1]
+
+def survivingFinalProportion(result):
+
+    '''returns the final prosocial proportion of a trial's result, or NaN if the population went extinct, so
+    that the -.1 recorded upon extinction is not averaged as a proportion'''
+
+    proportion = result['prosocialProportions'][-1]
+    return proportion if proportion >= 0 else float('nan')
+
+def pairedTrials(parametersA, parametersB, replicates, seed=0, antithetic=False, response=survivingFinalProportion):
+
+    '''
+    Description: runs paired trials of two parameter points with common random numbers, and returns the
+        responses of every trial. Replicate r of both points runs with randomSeed seed + r and, if antithetic
+        is true, again with antithetic draws
+
+    Parameters:
+    # parametersA, parametersB: parameter points, as for simulation.sweep.runTrial, without randomSeed
+    # replicates: number of replicates
+    # seed: randomSeed of the first replicate
+    # antithetic: boolean, whether to run the antithetic counterpart of every trial too
+    # response: function from the result of a trial to the number compared, or NaN if the trial has none,
+        by default the final prosocial proportion of a surviving population (NaN upon extinction)
+
+    Returns: array of responses of shape (replicates, 2) if antithetic is false, and (replicates, 4) if it is
+        true, with columns (A, B) or (A, B, antithetic A, antithetic B)
+    '''
+
+    trials = [(parametersA, False), (parametersB, False)]
+    if antithetic:
+        trials += [(parametersA, True), (parametersB, True)]
+    responses = numpy.empty((replicates, len(trials)))
+    for replicate in range(replicates):
+        for column, (parameters, isAntithetic) in enumerate(trials):
+            point = dict(parameters, randomSeed=seed + replicate, antithetic=isAntithetic)
+            responses[replicate, column] = response(runTrial(point))
+    return responses
+
+def compareConfigurations(parametersA, parametersB, replicates, seed=0, antithetic=False,
+                          response=survivingFinalProportion):
+
+    '''
+    Description: estimates the difference in mean response between parameter points A and B from paired
+        trials (see pairedTrials), and the variance reduction achieved over independent trials. Common random
+        numbers leave the distribution of either point's responses unchanged, so the variance of independent
+        trials is estimated from the responses of the plain (non-antithetic) trials of each point. Replicates
+        with a NaN response in any trial (by default, those in which a population went extinct) are left out,
+        so that pairs stay matched
+
+    Parameters: as for pairedTrials. replicates must be at least 2
+
+    Returns: dictionary with entries
+    # difference: estimated mean response of A minus that of B
+    # standardError: standard error of difference
+    # simulations: number of simulations run
+    # droppedReplicates: number of replicates left out for a NaN response
+    # independentStandardError: standard error of the difference estimated by as many independent simulations
+        as those of the replicates kept
+    # varianceReduction: ratio of the variance of the difference by independent simulations to that by paired
+        trials, for equal numbers of simulations
+    # correlation: correlation of the responses of A and B in the same replicate
+    # antitheticCorrelation: correlation of the responses of A and its antithetic counterpart in the same
+        replicate, or None if antithetic is false
+
+    Errors:
+    # RuntimeError: raised if fewer than 2 replicates have responses in every trial
+    '''
+
+    responses = pairedTrials(parametersA, parametersB, replicates, seed, antithetic, response)
+    simulations = responses.size
+    responses = responses[~numpy.isnan(responses).any(axis=1)]
+    if len(responses) < 2:
+        raise RuntimeError('fewer than 2 replicates have responses in every trial')
+    differences = responses[:, 0] - responses[:, 1]
+    if antithetic:
+        differences = (differences + responses[:, 2] - responses[:, 3]) / 2.0
+    pairedVariance = differences.var(ddof=1) / len(responses)
+    # variance of the difference of the means of as many independent trials of each point as the kept
+    # replicates ran of it
+    independentVariance = (responses[:, 0].var(ddof=1) + responses[:, 1].var(ddof=1)) / (responses.size / 2.0)
+    return {'difference': differences.mean(),
+            'standardError': numpy.sqrt(pairedVariance),
+            'simulations': simulations,
+            'droppedReplicates': replicates - len(responses),
+            'independentStandardError': numpy.sqrt(independentVariance),
+            'varianceReduction': independentVariance / pairedVariance if pairedVariance > 0 else float('inf'),
+            'correlation': numpy.corrcoef(responses[:, 0], responses[:, 1])[0, 1],
+            'antitheticCorrelation': numpy.corrcoef(responses[:, 0], responses[:, 2])[0, 1] if antithetic else None}
+
+if __name__ == '__main__':
+
+    '''compares random with biased redistribution (experiments 5 and 4), and costs of prosociality of .02
+    and .03, with common random numbers alone and with antithetic pairs'''
+
+    from socialunits.enums import ReproductionType, ProsocialityType
+    from migration import randomRedistribution, biasedRedistribution
+
+    base = dict(numGroups=20, migrationFunction=randomRedistribution, rounds=10, targetGroupSize=10,
+                seedProportionProsocial=.5, reproduction=ReproductionType.asexual, costOfProsociality=.02,
+                extraReproductionProbability=.3, baseReproductionChances=1, baseReproductionProbability=.9,
+                mutationRate=0.0, typeProsociality=ProsocialityType.strong)
+    comparisons = [('biased vs random redistribution', dict(base, migrationFunction=biasedRedistribution), base),
+                   ('cost .02 vs .03', base, dict(base, costOfProsociality=.03))]
+    for title, parametersA, parametersB in comparisons:
+        for antithetic in [False, True]:
+            comparison = compareConfigurations(parametersA, parametersB, 40 if antithetic else 80, antithetic=antithetic)
+            print(title + (', antithetic' if antithetic else '') + ': difference ' + str(round(comparison['difference'], 4)) +
+                  ' +/- ' + str(round(comparison['standardError'], 4)) + ' (independent: +/- ' +
+                  str(round(comparison['independentStandardError'], 4)) + ') from ' + str(comparison['simulations']) +
+                  ' simulations (' + str(comparison['droppedReplicates']) + ' replicates extinct), variance reduction ' +
+                  str(round(comparison['varianceReduction'], 2)) + ', correlation ' + str(round(comparison['correlation'], 3)))
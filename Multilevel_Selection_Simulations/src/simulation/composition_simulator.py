@@ -0,0 +1,275 @@
+'''
+Module description:
+    defines a single custom class, CompositionSimulator, which runs the simulations of
+    simulation.evo_simulator.EvolutionSimulator on a histogram of groups by composition
+    (see socialunits.compositions), so that the cost of a round scales with the number of
+    distinct group compositions rather than with the numbers of groups or individuals
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from socialunits.compositions import offspringDistribution, lifeCycleHistogram, dealHistogram, histogramCounts
+from socialunits.enums import ReproductionType, ProsocialityType, Phenotype
+from migration import randomRedistribution, totalIsolation
+from data_vectors import PROPORTIONS, POPULATIONS, GROUPS, STD_DEVIATIONS, prefixParams, roundTitles, columnTitles,\
+    finalizedDataVecs, writeRows, printRows
+import math
+from os.path import join
+import numpy
+
+class CompositionSimulator:
+
+    '''
+    Description:
+        runs evolutionary simulations like simulation.evo_simulator.EvolutionSimulator, with the default
+        social game and death and reproduction of socialunits.group.SocialGroup and asexual reproduction,
+        but keeps only the histogram of groups by composition, groupHistogram, whose entry [p, s] is the
+        number of groups of p prosocial and s selfish members. The exact offspring distribution of each
+        composition is computed the first time the composition occurs and cached, and each round the
+        progeny of all groups of a composition are one multinomial draw over it (see
+        socialunits.compositions.lifeCycleHistogram). Random redistribution needs only the population
+        totals and deals them straight into a histogram (see socialunits.compositions.dealHistogram). Since
+        groups of around targetGroupSize members take only a few dozen compositions, a round of a million
+        groups takes milliseconds, its cost growing with the number of groups only as the square root, through
+        the dealing of random redistribution. Migration functions simulation.migration.
+        randomRedistribution and simulation.migration.totalIsolation are supported: the pooling and dealing
+        methods they call act on the histogram. Rows of data are laid out by simulation.data_vectors; there
+        being no migration rate, group competition, or survival, those columns read 0
+
+    Non-instance variable parameters:
+    # fileName: name of CSV file to write/append, including extension
+
+    Parameters/instance variables:
+    # numGroups: number of groups--initially has value of parameter numGroups
+    # migrationFunction: simulation.migration.randomRedistribution or simulation.migration.totalIsolation
+    # prosocialPhenotype, mutationRate, toWriteCSV, toWriteColumnTitles, toPrintDataVecs: as for
+        EvolutionSimulator
+
+    Keyword args/instance variables:
+    # reproduction, baseReproductionChances, baseReproductionProbability, costOfProsociality,
+        extraReproductionProbability, typeProsociality, targetGroupSize, seedProportionProsocial, rounds: as for
+        EvolutionSimulator. reproduction must be asexual
+    # recordData: optional, default False, as for EvolutionSimulator
+
+    Other instance variables:
+    # populationCount, countProsocial, countSelfish, kwargs, groupCountsVec, populationCountsVec,
+        prosocialProportionsVec, stdDeviationsVec, prefixParams, columnTitles, filePath, toUpdateData: as for
+        EvolutionSimulator
+    # groupHistogram: integer array, entry [p, s] the number of groups of p prosocial and s selfish members
+    # allIndividuals: tuple (countProsocial, countSelfish) of the population while pooled for migration, the
+        pool from which random redistribution deals the next round's histogram
+    # offspringDistributions: dictionary from composition (p, s) to its offspring distribution
+
+    Constructor method signature: __init__(self, numGroups=10, migrationFunction=randomRedistribution,
+        prosocialPhenotype=Phenotype.altruistic, mutationRate=0, toWriteCSV=False, fileName=None,
+        toWriteColumnTitles=True, toPrintDataVecs=True, **kwargs)
+
+    Public methods:
+    # runEvolutionarySimulation(self): runs complete evolutionary simulation given parameters specified
+        in constructor
+    '''
+
+    def __init__(self, numGroups=10, migrationFunction=randomRedistribution, prosocialPhenotype=Phenotype.altruistic,
+                 mutationRate=0, toWriteCSV=False, fileName=None, toWriteColumnTitles=True, toPrintDataVecs=True,
+                 **kwargs):
+
+        '''
+        --See class's docstring for description of constructor's parameters--
+
+        Errors:
+        # TypeError: raised if typeProsociality not of type socialunits.enums.ProsocialityType
+        # RuntimeError: raised if migrationFunction is not supported, or if reproduction is sexual
+       '''
+
+        self.numGroups = numGroups
+        if migrationFunction not in (randomRedistribution, totalIsolation):
+            raise RuntimeError('CompositionSimulator supports only randomRedistribution and totalIsolation migration')
+        self.migrationFunction = migrationFunction
+        self.prosocialPhenotype = prosocialPhenotype
+        self.mutationRate = mutationRate
+        self.toWriteCSV = toWriteCSV
+        self.toWriteColumnTitles = toWriteColumnTitles
+        self.toPrintDataVecs = toPrintDataVecs
+
+        #keyword args:
+        self.reproduction = kwargs['reproduction']
+        if not self.reproduction == ReproductionType.asexual:
+            raise RuntimeError('CompositionSimulator supports only asexual reproduction')
+        self.baseReproductionChances = kwargs['baseReproductionChances']
+        self.baseReproductionProbability = kwargs['baseReproductionProbability']
+        self.costOfProsociality = kwargs['costOfProsociality']
+        self.extraReproductionProbability = kwargs['extraReproductionProbability']
+        self.typeProsociality = kwargs['typeProsociality']
+        if not isinstance(self.typeProsociality, ProsocialityType):
+            raise TypeError('typeProsociality must of type socialunits.enums.ProsocialityType')
+        self.targetGroupSize = kwargs['targetGroupSize']
+        self.seedProportionProsocial = kwargs['seedProportionProsocial']
+        self.rounds = kwargs['rounds']
+
+        #other instance vars:
+        self.populationCount = self.numGroups * self.targetGroupSize
+        self.kwargs = kwargs
+        self.groupCountsVec = []
+        self.populationCountsVec = []
+        self.prosocialProportionsVec = []
+        self.stdDeviationsVec = []
+        self.offspringDistributions = {}
+        self.toUpdateData = toWriteCSV or toPrintDataVecs or kwargs.get('recordData', False)
+        if toWriteCSV or self.toPrintDataVecs:
+            self.prefixParams = prefixParams(self)
+            self.columnTitles = columnTitles(roundTitles(self.rounds))
+            if toWriteCSV:
+                self.filePath = join('..', '..', 'simulationdata', fileName)
+
+        # initialize pooled population, as EvolutionSimulator initializes its individuals
+        self.countProsocial = int(math.ceil(self.populationCount * self.seedProportionProsocial))
+        self.countSelfish = self.populationCount - self.countProsocial
+        self.allIndividuals = (self.countProsocial, self.countSelfish)
+        self.groupHistogram = numpy.zeros((1, 1), dtype=numpy.int64)
+
+    def _dataVecs(self):
+
+        '''returns list of data vectors, in final representation if _finalizeDataVecs has been called'''
+
+        return [self.prosocialProportionsVec, self.populationCountsVec, self.groupCountsVec, self.stdDeviationsVec]
+
+    def _finalizeDataVecs(self):
+
+        '''prepends row titles and prefix parameters to data vectors'''
+
+        (self.prosocialProportionsVec, self.populationCountsVec, self.groupCountsVec,
+         self.stdDeviationsVec) = finalizedDataVecs(self.prefixParams, [(PROPORTIONS, self.prosocialProportionsVec),
+                                                                        (POPULATIONS, self.populationCountsVec),
+                                                                        (GROUPS, self.groupCountsVec),
+                                                                        (STD_DEVIATIONS, self.stdDeviationsVec)])
+
+    def _writeDataVecs(self):
+
+        '''writes column titles if required, then data vectors, to file'''
+
+        writeRows(self.filePath, ([self.columnTitles] if self.toWriteColumnTitles else []) + self._dataVecs())
+
+    def _updatePopulationData(self):
+
+        '''called each round to append data from round to data vectors. The standard deviation of prosocial
+        proportions is over groups with members, each counted once, and is -1 if the population is extinct'''
+
+        prosocialCounts, selfishCounts, groupCounts = histogramCounts(self.groupHistogram)
+        self.countProsocial = int((prosocialCounts * groupCounts).sum())
+        self.countSelfish = int((selfishCounts * groupCounts).sum())
+        self.populationCount = self.countProsocial + self.countSelfish
+        if self.populationCount > 0:
+            hasMembers = prosocialCounts + selfishCounts > 0
+            proportions = prosocialCounts[hasMembers] / (prosocialCounts + selfishCounts)[hasMembers].astype(float)
+            weights = groupCounts[hasMembers] / float(groupCounts[hasMembers].sum())
+            meanProportion = (weights * proportions).sum()
+            self.prosocialProportionsVec.append(self.countProsocial / float(self.populationCount))
+            self.stdDeviationsVec.append(math.sqrt((weights * (proportions - meanProportion) ** 2).sum()))
+        else:
+            # proportion of -.1 indicates that populationCount is 0, thus entire population is extinct
+            self.prosocialProportionsVec.append(-.1)
+            self.stdDeviationsVec.append(-1)
+        self.populationCountsVec.append(self.populationCount)
+        self.groupCountsVec.append(self.numGroups)
+
+    def _offspringDistribution(self, prosocialCount, selfishCount):
+
+        '''returns the offspring distribution of a group of the given composition, computing it once'''
+
+        composition = (prosocialCount, selfishCount)
+        if composition not in self.offspringDistributions:
+            self.offspringDistributions[composition] = offspringDistribution(prosocialCount, selfishCount,
+                                                                             self.prosocialPhenotype, self.mutationRate,
+                                                                             **self.kwargs)
+        return self.offspringDistributions[composition]
+
+    def _mergeGroups(self):
+
+        '''pools all groups, leaving (countProsocial, countSelfish) of the population in self.allIndividuals'''
+
+        prosocialCounts, selfishCounts, groupCounts = histogramCounts(self.groupHistogram)
+        self.allIndividuals = (int((prosocialCounts * groupCounts).sum()), int((selfishCounts * groupCounts).sum()))
+
+    def _resetGroupsBeforeReassignment(self):
+
+        '''sets self.numGroups for next round, as EvolutionSimulator._resetGroupsBeforeReassignment'''
+
+        self.populationCount = sum(self.allIndividuals)
+        self.numGroups = max(self.populationCount // self.targetGroupSize, 1) if self.populationCount > 0 else 0
+
+    def _assignToGroupsRandomly(self, populationCounts):
+
+        '''randomly deals the pooled population into self.numGroups groups whose sizes differ by at most one'''
+
+        self.groupHistogram = dealHistogram(populationCounts[0], populationCounts[1], self.numGroups)
+
+    def _migrationPhase(self):
+
+        '''wrapper method that simply calls the migration function instance variable'''
+
+        self.migrationFunction(self)
+
+    def runEvolutionarySimulation(self):
+
+        '''
+        Description: runs complete evolutionary simulation. The population is dealt randomly into groups,
+            then for each of self.rounds rounds the progeny of every composition class are drawn, followed by
+            the migration phase
+        '''
+
+        self._assignToGroupsRandomly(self.allIndividuals)
+        if self.toUpdateData:
+            self._updatePopulationData()
+
+        for _ in range(self.rounds):
+            self.groupHistogram = lifeCycleHistogram(self.groupHistogram, self._offspringDistribution)
+            self._migrationPhase()
+            if self.toUpdateData:
+                self._updatePopulationData()
+
+        if self.toWriteCSV or self.toPrintDataVecs:
+            self._finalizeDataVecs()
+            if self.toPrintDataVecs:
+                printRows([self.columnTitles] + self._dataVecs())
+            if self.toWriteCSV:
+                self._writeDataVecs()
+
+if __name__ == '__main__':
+
+    '''checks the mean prosocial proportion after a few rounds against that of EvolutionSimulator, then
+    times rounds for growing numbers of groups'''
+
+    from evo_simulator import EvolutionSimulator
+    from time import time
+
+    parameters = dict(rounds=5, targetGroupSize=10, seedProportionProsocial=.5, reproduction=ReproductionType.asexual,
+                      costOfProsociality=.02, extraReproductionProbability=.3, baseReproductionChances=1,
+                      baseReproductionProbability=.9, typeProsociality=ProsocialityType.strong, toPrintDataVecs=False,
+                      recordData=True)
+    trials = 300
+    for migrationFunction in [randomRedistribution, totalIsolation]:
+        finalProportions = []
+        for simulatorClass, extra in [(CompositionSimulator, {}), (EvolutionSimulator, {'threaded': False})]:
+            proportions = []
+            for _ in range(trials):
+                simulator = simulatorClass(numGroups=20, migrationFunction=migrationFunction, mutationRate=.01,
+                                           **dict(parameters, **extra))
+                simulator.runEvolutionarySimulation()
+                proportions.append(simulator.prosocialProportionsVec[-1])
+            finalProportions.append(numpy.array(proportions))
+        composition, individuals = finalProportions
+        zScore = (composition.mean() - individuals.mean()) / math.sqrt((composition.var() + individuals.var()) / trials)
+        print(migrationFunction.__name__ + ': mean final proportion ' + str(round(composition.mean(), 4)) + ' vs ' +
+              str(round(individuals.mean(), 4)) + ', z = ' + str(round(zScore, 2)))
+
+    print('groups, seconds per round')
+    for numGroups in [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]:
+        simulator = CompositionSimulator(numGroups=numGroups, **dict(parameters, rounds=20, recordData=False))
+        startTime = time()
+        simulator.runEvolutionarySimulation()
+        print(str(numGroups) + ', ' + str(round((time() - startTime) / 20, 4)))
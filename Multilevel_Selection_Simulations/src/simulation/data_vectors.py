@@ -0,0 +1,208 @@
+'''
+Module description:
+    module for laying out the data vectors that the simulators write to CSV files. Every
+    data vector is a row: a row title, the prefix parameters of the simulation, then one
+    value per round recorded. The prefix parameters and column titles are defined here once,
+    so that simulation.evo_simulator.EvolutionSimulator,
+    simulation.composition_simulator.CompositionSimulator, and
+    simulation.lane_simulator.LaneSimulator write rows that analysis.sweeps reads alike.
+    readFinalValues reads back the final values of the trials of such a file, without the
+    arrays of analysis.sweeps, for the run catalog of simulation.run_catalog
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from migration import randomRedistribution, biasedRedistribution, totalIsolation, neighbourMigration,\
+    partialMigration, fissionFusion, getMigrationFunctionKey
+from socialunits.enums import ReproductionType, ProsocialityType, Phenotype
+from enum import Enum
+import csv
+
+# row titles of data vectors
+PROPORTIONS = 'prosociality proportions:'
+POPULATIONS = 'population counts:'
+GROUPS = 'groups counts:'
+STD_DEVIATIONS = 'standard deviations in prosocial proportions'
+BETWEEN_GROUP_SELECTION = 'between-group selection (Price covariance term):'
+WITHIN_GROUP_SELECTION = 'within-group selection (Price expectation term):'
+COMPETITION_SECONDS = 'group competition seconds:'
+COMPETITION_EFFECT = 'change in prosocial proportions by group competition:'
+
+# prefix parameters in column order, as (name of parameter of EvolutionSimulator, column title)
+PREFIX_PARAMETERS = [('targetGroupSize', 'target group size'),
+                     ('extraReproductionProbability', 'extra reproduction probability'),
+                     ('costOfProsociality', 'cost of prosociality'),
+                     ('reproduction', 'reproduction type'),
+                     ('prosocialPhenotype', 'prosocial phenotype'),
+                     ('rounds', 'number of rounds'),
+                     ('baseReproductionChances', 'base reproduction rate'),
+                     ('baseReproductionProbability', 'base reproduction probability'),
+                     ('typeProsociality', 'prosociality type'),
+                     ('migrationFunction', 'migration type'),
+                     ('seedProportionProsocial', 'seed proportion prosocial'),
+                     ('mutationRate', 'mutation rate'),
+                     ('migrationRate', 'migration rate'),
+                     ('groupCompetitionRate', 'group competition rate'),
+                     ('prosocialSurvivalProbability', 'prosocial survival probability'),
+                     ('selfishSurvivalProbability', 'selfish survival probability')]
+
+# values of prefix parameters for simulators that do not have them
+PREFIX_DEFAULTS = {'migrationRate': 0.0, 'groupCompetitionRate': 0.0, 'prosocialSurvivalProbability': 0.0,
+                   'selfishSurvivalProbability': 0.0}
+
+# number of placeholder columns left after the prefix parameters
+NUM_PLACEHOLDERS = 1
+
+# prefix parameters recorded by the value of an enum, by the enum class, and prefix parameters taking integers
+PREFIX_ENUMS = {'reproduction': ReproductionType, 'prosocialPhenotype': Phenotype, 'typeProsociality': ProsocialityType}
+INTEGER_PARAMETERS = ['targetGroupSize', 'rounds', 'baseReproductionChances']
+
+# migration functions by their keys (see simulation.migration.getMigrationFunctionKey)
+MIGRATION_FUNCTIONS = dict((getMigrationFunctionKey(function), function) for function in 
+                           [randomRedistribution, biasedRedistribution, totalIsolation, neighbourMigration, 
+                            partialMigration, fissionFusion])
+
+def prefixParams(simulator, **values):
+
+    '''
+    Description: returns a vector of numeric values representing the parameters of PREFIX_PARAMETERS,
+        followed by a value of -10 for each placeholder. Placeholders keep room for parameters added later,
+        so that data vectors written earlier are of equal length; parameters added so far took the place of
+        the first placeholders, so data written before them reads -10 in their columns. Enumerations are
+        recorded by value, migration functions by key (see simulation.migration.getMigrationFunctionKey), and
+        a probability given by age class by its first entry, that of the youngest
+
+    Parameters:
+    # simulator: simulator whose instance variables, then keyword args (simulator.kwargs), give the values
+        of parameters, or PREFIX_DEFAULTS if it has neither
+
+    Keyword args:
+    # values of parameters taking precedence over those of the simulator, e.g. those of a lane of
+        simulation.lane_simulator.LaneSimulator
+
+    Returns: list of numeric values, of length len(PREFIX_PARAMETERS) + NUM_PLACEHOLDERS
+    '''
+
+    prefix = []
+    for name, _ in PREFIX_PARAMETERS:
+        if name in values:
+            value = values[name]
+        elif hasattr(simulator, name):
+            value = getattr(simulator, name)
+        else:
+            value = simulator.kwargs.get(name)
+        if value is None:
+            value = PREFIX_DEFAULTS[name]
+        if name == 'migrationFunction':
+            value = getMigrationFunctionKey(value)
+        elif isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, (list, tuple)):
+            value = value[0]
+        prefix.append(value)
+    return prefix + [-10] * NUM_PLACEHOLDERS
+
+def parametersFromPrefix(titles, values):
+
+    '''
+    Description: inverse of prefixParams: returns the encoded parameter point (see simulation.sweep.
+        encodeParameters) of the prefix parameters of a data vector. Columns whose title is not that of a
+        parameter of PREFIX_PARAMETERS, such as placeholders, are left out, as are parameters reading -10,
+        which were written before the parameter was recorded
+
+    Parameters:
+    # titles: column titles of the prefix parameters, as in a data file
+    # values: numeric values of the prefix parameters, one per title
+
+    Returns: dictionary from parameter name to value, enums and migration functions by name
+    '''
+
+    names = dict((title, name) for name, title in PREFIX_PARAMETERS)
+    parameters = {}
+    for title, value in zip(titles, values):
+        name = names.get(title)
+        if name is None or value == -10:
+            continue
+        if name == 'migrationFunction':
+            parameters[name] = MIGRATION_FUNCTIONS[int(value)].__name__
+        elif name in PREFIX_ENUMS:
+            parameters[name] = PREFIX_ENUMS[name](int(value)).name
+        elif name in INTEGER_PARAMETERS:
+            parameters[name] = int(value)
+        else:
+            parameters[name] = float(value)
+    return parameters
+
+def roundTitles(rounds):
+
+    '''returns titles of the columns of the starting state and each of rounds rounds'''
+
+    return ['starting state'] + ['Round ' + str(i+1) for i in range(rounds)]
+
+def columnTitles(roundTitles):
+
+    '''returns column titles for data vectors whose data columns have the given titles'''
+
+    placeholderTitles = ['placeholder ' + str(i) for i in range(1, NUM_PLACEHOLDERS + 1)]
+    return ['dependent vars'] + [title for _, title in PREFIX_PARAMETERS] + placeholderTitles + roundTitles
+
+def finalizedDataVecs(prefix, titledDataVecs):
+
+    '''returns data vectors in final representation, given the prefix parameters and a list of pairs (row
+    title, data vector): each data vector is prepended with its row title and the prefix parameters'''
+
+    return [[title] + prefix + dataVec for title, dataVec in titledDataVecs]
+
+def writeRows(filePath, rows):
+
+    '''appends rows, such as column titles and finalized data vectors, to the CSV file at filePath'''
+
+    with open(filePath, 'ab') as csvFile:
+        csvWriter = csv.writer(csvFile)
+        for row in rows:
+            csvWriter.writerow(row)
+
+def printRows(rows):
+
+    '''prints rows, such as column titles and finalized data vectors'''
+
+    for row in rows:
+        print(row)
+
+def readFinalValues(filePath, rowTitles):
+
+    '''
+    Description: reads the trials of a CSV file of data vectors, as written by writeRows. Each trial begins
+        with its row of prosociality proportions, and the last recorded value of each of its data vectors
+        with one of the given row titles is kept
+
+    Parameters:
+    # filePath: path of CSV file
+    # rowTitles: row titles of the data vectors whose final values are read, e.g. PROPORTIONS
+
+    Returns: tuple (parameterTitles, trials), where parameterTitles are the titles of the prefix parameter
+        columns and trials is a list with a tuple (parameter values, dictionary from row title to final
+        value) per trial, in the order of the file. A data vector with no recorded value reads NaN
+
+    Errors:
+    # RuntimeError: raised if the file has no column titles or no trials
+    '''
+
+    with open(filePath, 'r') as csvFile:
+        rows = list(csv.reader(csvFile))
+    if not rows or rows[0][0] != 'dependent vars' or len(rows) < 2 or rows[1][0] != PROPORTIONS:
+        raise RuntimeError(filePath + ' is not a CSV file of simulation trials')
+    numParameters = rows[0].index('starting state') - 1
+    trials = []
+    for row in rows[1:]:
+        if row[0] == PROPORTIONS:
+            trials.append(([float(value) for value in row[1:numParameters + 1]], {}))
+        if row[0] in rowTitles:
+            values = [value for value in row[numParameters + 1:] if value != '']
+            trials[-1][1][row[0]] = float(values[-1]) if values else float('nan')
+    return rows[0][1:numParameters + 1], trials
@@ -14,13 +14,64 @@ Course: COSI 210a, Independent study with Professor Jordan Pollack
 
 from socialunits.individual import Individual 
 from socialunits.group import SocialGroup
+from socialunits.vectorized import lifeCycleSexualVectorized, lifeCycleStrategiesVectorized, priceDecomposition,\
+    dealCountsToGroups
+from socialunits.jit import lifeCycleCounts
+from socialunits import jit, streams
 from socialunits.enums import Genotype, ReproductionType, ProsocialityType,\
     Phenotype
-from migration import randomRedistribution, biasedRedistribution, totalIsolation, getMigrationFunctionKey
+from recorder import TrajectoryRecorder
+from group_statistics import STATISTICS, computeStatistics
+from data_vectors import PROPORTIONS, POPULATIONS, GROUPS, STD_DEVIATIONS, BETWEEN_GROUP_SELECTION,\
+    WITHIN_GROUP_SELECTION, COMPETITION_SECONDS, COMPETITION_EFFECT, prefixParams, roundTitles, columnTitles,\
+    finalizedDataVecs, writeRows, printRows
+from group_competition import competitionEvents, groupSizeFitness
+from migration import randomRedistribution, biasedRedistribution, totalIsolation, fissionFusion
 from itertools import chain
-import math, random, csv, threading
+from operator import attrgetter
+import math, threading
 from os.path import join
+from time import time
 import numpy
+
+# migration functions with count-based implementations, which move groups kept only as counts without creating 
+# their members
+COUNT_MIGRATION_FUNCTIONS = (randomRedistribution, totalIsolation)
+      
+class RoundSnapshot(object):
+    
+    '''
+    Description: read-only view of the state of a simulation after a round, as yielded by 
+        EvolutionSimulator.iterRounds. Holds arrays of counts per group rather than copies of members
+    
+    Instance variables:
+    # round: number of the round, 0 for the starting state
+    # prosocialCounts, selfishCounts: read-only integer arrays of counts of prosocial and selfish individuals
+        per group
+    '''
+    
+    __slots__ = ('round', 'prosocialCounts', 'selfishCounts')
+    
+    def __init__(self, currentRound, prosocialCounts, selfishCounts):
+        
+        prosocialCounts.flags.writeable = False
+        selfishCounts.flags.writeable = False
+        self.round = currentRound
+        self.prosocialCounts = prosocialCounts
+        self.selfishCounts = selfishCounts
+        
+    def populationCount(self):
+        
+        '''returns total count of population'''
+        
+        return int(self.prosocialCounts.sum() + self.selfishCounts.sum())
+    
+    def prosocialProportion(self):
+        
+        '''returns proportion of prosocial individuals in population, -.1 if the population is extinct'''
+        
+        populationCount = self.populationCount()
+        return self.prosocialCounts.sum() / float(populationCount) if populationCount > 0 else -.1
       
 class EvolutionSimulator:
     
@@ -72,17 +123,106 @@ class EvolutionSimulator:
     # seedProportionProsocial: approximate proportion of prosocial individuals in starting population 
         (actual number of prosocial individuals equals the ceiling of seedProportionProsocial times the initial population size)
     # rounds: number of rounds of the simulation
+    # migrationRate: optional, default 0. Per-individual probability of migrating each round, used by 
+        migration functions that move only part of the population (simulation.migration.neighbourMigration and
+        simulation.migration.partialMigration). Recorded in the migration rate column of data vectors
+    # groupTopology: optional, default None. List with one list of neighbouring group indices per group, 
+        used by simulation.migration.neighbourMigration. If None, groups are laid out on a 2-D toroidal lattice.
+        RuntimeError is raised if its length is not numGroups or a neighbour index is out of range
+    # fissionSize: optional, default double targetGroupSize. Groups larger than this split in two under 
+        simulation.migration.fissionFusion
+    # fusionSize: optional, default half targetGroupSize. Groups smaller than this merge under 
+        simulation.migration.fissionFusion. Under fissionFusion, RuntimeError is raised if fissionSize is less 
+        than 1 or fusionSize exceeds fissionSize
+    # dispersalInterval: optional, default None. If not None, simulation.migration.fissionFusion disperses 
+        the population by random redistribution every dispersalInterval rounds
+    # generationsPerMigration: optional, default 1. Number of generations of social game and death and 
+        reproduction played in each round, between migration phases. If greater than 1, the generations 
+        of a round are run on arrays of group counts by socialunits.jit.lifeCycleCounts (compiled if numba 
+        is installed, and otherwise socialunits.vectorized.lifeCycleVectorized), which implements the 
+        default behavior of socialunits.group.SocialGroup (overrides of its private methods are bypassed). 
+        Groups are then kept only as counts from generation to generation and from round to round: their 
+        members are created only for the migration phase, and only if the migration function moves 
+        individuals (any but those of COUNT_MIGRATION_FUNCTIONS). Sexually reproducing populations always 
+        run this way, on arrays of genotype counts
+    # payoffKernel: optional, default None. Instance of a subclass of socialunits.kernels.PayoffKernel for 
+        two strategies ordered (prosocial, selfish). If given, every round runs on arrays of group counts as 
+        with generationsPerMigration greater than 1, with the social game played by the kernel. Asexual 
+        reproduction only
+    # normalApproximationThreshold: optional, default None. If not None, every round runs on arrays of group 
+        counts as with generationsPerMigration greater than 1, and offspring counts (and the other binomial 
+        counts of the life cycle) whose expected numbers of successes and failures are both at least the 
+        threshold are drawn from moment-matched normal distributions, with exact binomial draws below it (see 
+        socialunits.vectorized.binomialDraws). As groups are kept only as counts, with migration dealing 
+        pooled counts rather than individuals, the cost per group then no longer grows with group size. The 
+        distribution function of every approximated count is within 
+        socialunits.vectorized.normalApproximationBound(threshold) of the exact one; see 
+        simulation.approximation_error for the resulting error in data vectors. Asexual reproduction, without 
+        payoff kernels, and migration by one of COUNT_MIGRATION_FUNCTIONS only: the other migration functions 
+        move or assign individuals one at a time, at a cost that grows with group size
+    # recordEveryGeneration: optional, default False. If true and generationsPerMigration is greater than 1, 
+        data vectors get an entry for every generation rather than only for every round
+    # trajectoryFile: optional, default None. If not None, path to which the counts of prosocial and selfish 
+        individuals in every group are recorded, at every entry of the data vectors, by 
+        simulation.recorder.TrajectoryRecorder. Read back with simulation.recorder.loadTrajectory
+    # recordPriceEquation: optional, default False. If true, the change in prosocial proportion brought 
+        about by death and reproduction is decomposed by the Price equation into between-group and 
+        within-group selection terms (see socialunits.vectorized.priceDecomposition), recorded in two 
+        extra data vectors with an entry at every entry of the other data vectors
+    # statistics: optional, default empty list. Names of additional statistics of group counts to record, 
+        each in an extra data vector, chosen from the keys of simulation.group_statistics.STATISTICS (e.g. 
+        'weightedStd', 'minProportion', 'median'), to which custom statistics may be added
+    # recordData: optional, default False. If true, data vectors are gathered even if they are neither 
+        written nor printed, so that they can be read from the simulator after it runs (see simulation.sweep)
+    # randomSeed: optional, default None. If not None, the simulation draws from synchronized random 
+        streams: the initial assignment to groups, the life cycle of every group in every round, and every 
+        migration phase each reseed the generators of socialunits.streams, numpy.random, and compiled kernels 
+        from a seed derived from randomSeed, the round, the phase, and (for life cycles of individuals) the 
+        group index. Shuffles are those of socialunits.streams.SynchronizedRandom, with individuals classed by 
+        phenotype, and individuals are assigned to groups in consecutive runs rather than one by one. Runs of 
+        different parameter points with equal randomSeed thus use common random numbers, so that differences 
+        between them are driven by the parameters more than by noise (see simulation.common_random_numbers). 
+        Life cycles of individuals are then never threaded
+    # groupCompetitionRate: optional, default 0. If greater than 0, every round has an explicit phase of 
+        between-group selection after death and reproduction: each group goes extinct with probability 
+        groupCompetitionRate and is replaced by a copy of a group sampled with probability proportional to 
+        group fitness (see simulation.group_competition). The time taken by the phase and the change in 
+        prosocial proportion it brings about are recorded in two extra data vectors. Recorded in the group 
+        competition rate column of data vectors
+    # groupFitness: optional, default simulation.group_competition.groupSizeFitness. Function from arrays 
+        (prosocialCounts, selfishCounts) per group to nonnegative fitness weights per group
+    # groupCompetitionSampler: optional, default None. 'alias' or 'cumulative', the method of sampling 
+        replicating groups, or None to choose automatically (see simulation.group_competition.competitionEvents)
+    # antithetic: optional, default False. If true, every uniform draw of socialunits.streams u is replaced 
+        by 1 - u (see socialunits.streams.AntitheticRandom), so that a run is the antithetic counterpart of 
+        the run with the same randomSeed. Requires randomSeed, and life cycles of individuals (draws of 
+        numpy.random, as by array-based life cycles, cannot be reflected)
+    # prosocialSurvivalProbability, selfishSurvivalProbability: optional, default 0. If either is nonzero, 
+        generations overlap: parents survive death and reproduction with the probability of their phenotype, 
+        given either as one probability or as a list of probabilities by age class (see 
+        socialunits.group.SocialGroup.deathAndReproduction). Requires life cycles of individuals, which 
+        track the age of every individual. Recorded in the survival probability columns of data vectors
     
     Other instance variables:
     # populationCount: count of population at large--initially assigned numGroups*targetGroupSize
-    # allIndividuals: list of all individuals (type socialunits.inidividual.Individual) in population
-    # groups: list of all groups (type socialunits.group.SocialGroup)
+    # allIndividuals: list of all individuals (type socialunits.inidividual.Individual) in population, or 
+        integer array of pooled counts per row of groupCounts if groups are kept only as counts
+    # groups: list of all groups (type socialunits.group.SocialGroup), empty while groups are kept only as 
+        counts
+    # groupCounts: integer array of counts per group, one row per genotype of _countedGenotypes, while groups 
+        are kept only as counts (whenever rounds run on arrays of group counts, save during the migration 
+        phase of a migration function that moves individuals); None otherwise
+    # membersCreated: boolean, whether groups otherwise kept only as counts have members for the migration 
+        phase under way
     # kwargs: reference to key word args maintained so that they can be inputted to instance methods 
         of class SocialGroup as required
     # groupCountsVec: list of counts of groups (how many groups in play each round)
     # populationCountsVec: list of counts of total population (how many total individuals each round)
     # prosocialProportionsVec: list of prosocial proportions (proportion of prosocial individuals each round)
     # stdDeviationsVec: list of standard deviations (one per round) of prosocial proportions among all groups 
+    # betweenGroupSelectionVec, withinGroupSelectionVec: lists of the between-group and within-group terms 
+        of the Price equation, computed from group counts before and after death and reproduction, with 0 
+        for the starting state. Updated only if recordPriceEquation is true
     # prefixParams: vector of numeric values that represent simulation parameters. prefixParams 
         gets concatenated with vectors of output data before vectors appended to CSV file. Initialized
         only if toWriteCSV or toPrintDataVecs is true
@@ -91,6 +231,23 @@ class EvolutionSimulator:
     # filePath: path for which to write/append CSV file. Initialized only if toWriteCSV is true
     # countProsocial: total count of prosocial individuals in population
     # countSelfish: total count of selfish individuals in population
+    # toUpdateData: boolean, whether data is gathered each round (true if writing, printing, or recording 
+        a trajectory, or if recordData is true)
+    # trajectoryRecorder: instance of simulation.recorder.TrajectoryRecorder while a simulation with a 
+        trajectoryFile runs, None otherwise
+    # currentRound: number of the round being played, 0 before the first round
+    # groupAdjacency: (indptr, indices) arrays giving group neighbourhoods in compressed sparse row form.
+        Built lazily by simulation.migration.neighbourMigration
+    # statisticsVecs: list of data vectors, one per name in statistics
+    # groupProsocialCounts, groupSelfishCounts: integer arrays of counts of prosocial and selfish individuals
+        per group, as of the latest entry of the data vectors. Updated only if data is gathered
+    # priceParentCounts: (prosocialCounts, selfishCounts) arrays per group at the start of the current 
+        interval of death and reproduction, if recordPriceEquation is true, None otherwise
+    # groupCompetitionSecondsVec, groupCompetitionEffectVec: lists of the time in seconds taken by the phase 
+        of group competition, and of the change in prosocial proportion it brought about, with 0 for the 
+        starting state. Updated only if groupCompetitionRate is greater than 0
+    # randomGenerator: generator used by socialunits.streams while a simulation with a randomSeed runs, 
+        None otherwise
     
     Constructor method signature: __init__(self, numGroups=10, migrationFunction=randomRedistribution, 
         prosocialPhenotype=Phenotype.altruistic, mutationRate=0, threaded=True, toWriteCSV=False, 
@@ -99,6 +256,8 @@ class EvolutionSimulator:
     Public methods:
     # runEvolutionarySimulation(self): runs complete evolutionary simulation given parameters specified
         in constructor
+    # iterRounds(self): generator that runs the simulation round by round, yielding a RoundSnapshot of 
+        each round
     '''
     
     def __init__(self, numGroups=10, migrationFunction=randomRedistribution, prosocialPhenotype=Phenotype.altruistic,
@@ -111,6 +270,11 @@ class EvolutionSimulator:
         Errors:
         # TypeError: raised if reproduction is not of type socialunits.enums.ReproductionType
         # TypeError: raised if typeProsociality not of type socialunits.enums.ProsocialityType 
+        # RuntimeError: raised if antithetic is true without a randomSeed, or with an array-based life cycle
+        # RuntimeError: raised if prosocialSurvivalProbability or selfishSurvivalProbability is nonzero with 
+            an array-based life cycle
+        # RuntimeError: raised if normalApproximationThreshold is given with sexual reproduction, a payoffKernel, 
+            or a migration function other than randomRedistribution or totalIsolation
        ''' 
         
         # instance vars that may have default value: 
@@ -137,6 +301,52 @@ class EvolutionSimulator:
         self.targetGroupSize = kwargs['targetGroupSize']
         self.seedProportionProsocial = kwargs['seedProportionProsocial']
         self.rounds = kwargs['rounds']
+        self.migrationRate = kwargs.get('migrationRate', 0.0)
+        self.groupTopology = kwargs.get('groupTopology')
+        if self.groupTopology is not None:
+            if len(self.groupTopology) != self.numGroups:
+                raise RuntimeError('groupTopology must have one list of neighbours per group')
+            for neighbours in self.groupTopology:
+                if any(not 0 <= neighbour < self.numGroups for neighbour in neighbours):
+                    raise RuntimeError('neighbour indices of groupTopology must be between 0 and numGroups - 1')
+        self.fissionSize = kwargs.get('fissionSize', 2 * self.targetGroupSize)
+        self.fusionSize = kwargs.get('fusionSize', self.targetGroupSize // 2)
+        if self.migrationFunction == fissionFusion and self.fissionSize < 1:
+            raise RuntimeError('fissionSize must be at least 1')
+        if self.migrationFunction == fissionFusion and self.fusionSize > self.fissionSize:
+            raise RuntimeError('fusionSize must not exceed fissionSize')
+        self.dispersalInterval = kwargs.get('dispersalInterval')
+        self.generationsPerMigration = kwargs.get('generationsPerMigration', 1)
+        self.recordEveryGeneration = kwargs.get('recordEveryGeneration', False)
+        self.payoffKernel = kwargs.get('payoffKernel')
+        self.trajectoryFile = kwargs.get('trajectoryFile')
+        self.recordPriceEquation = kwargs.get('recordPriceEquation', False)
+        self.statistics = list(kwargs.get('statistics', []))
+        for name in self.statistics:
+            if name not in STATISTICS:
+                raise RuntimeError('unknown statistic ' + str(name) + '; see simulation.group_statistics.STATISTICS')
+        if self.reproduction == ReproductionType.sexual and not self.prosocialPhenotype == Phenotype.altruistic:
+            raise RuntimeError('sexual genotypes are implemented only for the altruistic prosocial phenotype')
+        if self.reproduction == ReproductionType.sexual and self.payoffKernel is not None:
+            raise RuntimeError('payoff kernels are implemented only for asexual reproduction')
+        self.groupCompetitionRate = kwargs.get('groupCompetitionRate', 0.0)
+        self.groupFitness = kwargs.get('groupFitness', groupSizeFitness)
+        self.groupCompetitionSampler = kwargs.get('groupCompetitionSampler')
+        self.randomSeed = kwargs.get('randomSeed')
+        self.antithetic = kwargs.get('antithetic', False)
+        self.normalApproximationThreshold = kwargs.get('normalApproximationThreshold')
+        if self.normalApproximationThreshold is not None and (self.reproduction == ReproductionType.sexual 
+                                                              or self.payoffKernel is not None):
+            raise RuntimeError('normal approximation is implemented only for the default asexual life cycle')
+        if self.normalApproximationThreshold is not None and self.migrationFunction not in COUNT_MIGRATION_FUNCTIONS:
+            raise RuntimeError('normal approximation supports only randomRedistribution and totalIsolation migration')
+        if self.antithetic and self.randomSeed is None:
+            raise RuntimeError('antithetic runs require a randomSeed')
+        if self.antithetic and self._usesArrayLifeCycle():
+            raise RuntimeError('antithetic draws are implemented only for life cycles of individuals')
+        if ((kwargs.get('prosocialSurvivalProbability') or kwargs.get('selfishSurvivalProbability')) 
+                and self._usesArrayLifeCycle()):
+            raise RuntimeError('overlapping generations are implemented only for life cycles of individuals')
         
         #other instance vars:
         self.populationCount = self.numGroups * self.targetGroupSize
@@ -147,6 +357,22 @@ class EvolutionSimulator:
         self.populationCountsVec = []
         self.prosocialProportionsVec = []
         self.stdDeviationsVec = []
+        self.betweenGroupSelectionVec = []
+        self.withinGroupSelectionVec = []
+        self.groupCompetitionSecondsVec = []
+        self.groupCompetitionEffectVec = []
+        self.statisticsVecs = [[] for _ in self.statistics]
+        self.groupProsocialCounts = None
+        self.groupSelfishCounts = None
+        self.groupCounts = None
+        self.membersCreated = False
+        self.groupAdjacency = None
+        self.currentRound = 0
+        self.toUpdateData = (toWriteCSV or toPrintDataVecs or self.trajectoryFile is not None 
+                             or kwargs.get('recordData', False))
+        self.trajectoryRecorder = None
+        self.priceParentCounts = None
+        self.randomGenerator = None
         if toWriteCSV or self.toPrintDataVecs:
             self.prefixParams = self._prefixParams()
             self.columnTitles = self._columnTitles()
@@ -155,14 +381,16 @@ class EvolutionSimulator:
         
         '''initialize all individuals to specifications of phenotype proportions. Also initializes two additional
            instance variables, countProsocial and countSelfish'''
-        if self.reproduction == ReproductionType.asexual:
+        if self._keepsGroupCounts():
+            # the pooled population is only its counts, which the initial assignment deals into groups
+            self._createCounts(self.seedProportionProsocial)
+        else:
             self._createIndividualsAsexual(self.seedProportionProsocial)
-        elif self.reproduction == ReproductionType.sexual:
-            self._createIndividualsSexual(self.seedProportionProsocial)
         
         # initialize groups:
-        for _ in range(self.numGroups):
-            self.groups.append(SocialGroup(self.reproduction))
+        if not self._keepsGroupCounts():
+            for _ in range(self.numGroups):
+                self.groups.append(SocialGroup(self.reproduction))
             
     def _createIndividualsAsexual(self, seedProportionProsocial):
         
@@ -178,113 +406,266 @@ class EvolutionSimulator:
                                   [Individual(prosocialGenotype, self.reproduction, self.mutationRate) for _ in range(self.countProsocial)], 
                                   [Individual(Genotype.S, self.reproduction, self.mutationRate) for _ in range(self.countSelfish)]))
     
-    def _createIndividualsSexual(self, seedProportionProsocial):
+    def _createCounts(self, seedProportionProsocial):
         
-        '''initialize sexually reproducing population by populating list self.allIndividuals'''
+        '''initialize population kept only as counts by setting self.allIndividuals to an integer array of its 
+        counts per genotype of _countedGenotypes. Counts of prosocial (AA or Aa) and selfish (aa) sexually 
+        reproducing individuals are as for asexual populations, and prosocial individuals are split between 
+        AA and Aa in Hardy-Weinberg proportions'''
         
-        raise RuntimeError('sexual reproduction not yet implemented')
+        self.countProsocial = int(math.ceil(self.populationCount * seedProportionProsocial))
+        self.countSelfish = self.populationCount - self.countProsocial
+        if self.reproduction == ReproductionType.asexual:
+            genotypeCounts = [self.countProsocial, self.countSelfish]
+        elif self.populationCount == 0:
+            genotypeCounts = [0, 0, 0]
+        else:
+            # frequency of the dominant allele A under Hardy-Weinberg equilibrium, given frequency of aa
+            dominantFrequency = 1 - math.sqrt(self.countSelfish / float(self.populationCount))
+            recessiveFrequency = 1 - dominantFrequency
+            countAA = (int(round(self.countProsocial * dominantFrequency / (dominantFrequency + 2 * recessiveFrequency))) 
+                       if self.countProsocial else 0)
+            genotypeCounts = [countAA, self.countProsocial - countAA, self.countSelfish]
+        self.allIndividuals = numpy.array(genotypeCounts, dtype=numpy.int64)
     
     def _prefixParams(self):    
         
         '''
         returns a vector numeric values represent the parameters/independent variables of the simulation. These
         will prepend the vectors containing the dependent trial data. In this way the simulation parameters
-        get associated with results before the data is written to file. The five values of -10 are placeholders
-        for additional parameters, so that if parameters are added later earlier data will still have vectors of
-        equal length
+        get associated with results before the data is written to file. See simulation.data_vectors.prefixParams
         '''
         
-        return [self.targetGroupSize, self.extraReproductionProbability, self.costOfProsociality, self.reproduction.value,
-                self.prosocialPhenotype.value, self.rounds, self.baseReproductionChances, self.baseReproductionProbability,
-                self.typeProsociality.value, getMigrationFunctionKey(self.migrationFunction), self.seedProportionProsocial,
-                self.mutationRate, -10, -10, -10, -10, -10] 
+        return prefixParams(self) 
     
     def _columnTitles(self):
         
         '''returns column titles for data vectors'''
         
-        roundTitles = ['starting state'] + ['Round ' + str(i+1) for i in range(self.rounds)]
-        placeholderTitles = ['placeholder ' + str(i) for i in range(1,6)]
-        return ['dependent vars', 'target group size', 'extra reproduction probability', 'cost of prosociality', 
-                'reproduction type', 'prosocial phenotype', 'number of rounds', 'base reproduction rate', 
-                'base reproduction probability', 'prosociality type', 'migration type', 'seed proportion prosocial', 
-                'mutation rate'] + placeholderTitles + roundTitles 
+        if self.recordEveryGeneration and self.generationsPerMigration > 1:
+            return columnTitles(['starting state'] + ['Round ' + str(i+1) + ' generation ' + str(j+1) 
+                                                      for i in range(self.rounds) for j in range(self.generationsPerMigration)])
+        return columnTitles(roundTitles(self.rounds))
           
     def _writeColumnTitles(self):
         
         '''writes column titles to file'''
         
-        with open(self.filePath, 'ab') as csvFile:
-            csvWriter = csv.writer(csvFile)
-            csvWriter.writerow(self.columnTitles)
-            
+        writeRows(self.filePath, [self.columnTitles])
+    
     def _finalizeDataVecs(self):
         
         '''appends row titles with prefix parameters and dependant variable data to put data vectors in final
         representation'''
         
-        self.prosocialProportionsVec = ['prosociality proportions:'] + self.prefixParams + self.prosocialProportionsVec
-        self.populationCountsVec = ['population counts:'] + self.prefixParams + self.populationCountsVec
-        self.groupCountsVec = ['groups counts:'] + self.prefixParams + self.groupCountsVec
-        self.stdDeviationsVec = ['standard deviations in prosocial proportions'] + self.prefixParams + self.stdDeviationsVec
+        (self.prosocialProportionsVec, self.populationCountsVec, self.groupCountsVec, self.stdDeviationsVec, 
+         self.betweenGroupSelectionVec, self.withinGroupSelectionVec, self.groupCompetitionSecondsVec, 
+         self.groupCompetitionEffectVec) = finalizedDataVecs(self.prefixParams, 
+                                                             [(PROPORTIONS, self.prosocialProportionsVec),
+                                                              (POPULATIONS, self.populationCountsVec),
+                                                              (GROUPS, self.groupCountsVec),
+                                                              (STD_DEVIATIONS, self.stdDeviationsVec),
+                                                              (BETWEEN_GROUP_SELECTION, self.betweenGroupSelectionVec),
+                                                              (WITHIN_GROUP_SELECTION, self.withinGroupSelectionVec),
+                                                              (COMPETITION_SECONDS, self.groupCompetitionSecondsVec),
+                                                              (COMPETITION_EFFECT, self.groupCompetitionEffectVec)])
+        self.statisticsVecs = finalizedDataVecs(self.prefixParams, [(STATISTICS[name][0], statisticsVec) for name, 
+                                                                    statisticsVec in zip(self.statistics, self.statisticsVecs)])
+    
+    def _dataVecs(self):
+        
+        '''returns list of the data vectors recorded, in final representation if _finalizeDataVecs has been 
+        called'''
+        
+        dataVecs = [self.prosocialProportionsVec, self.populationCountsVec, self.groupCountsVec, self.stdDeviationsVec]
+        if self.recordPriceEquation:
+            dataVecs += [self.betweenGroupSelectionVec, self.withinGroupSelectionVec]
+        if self.groupCompetitionRate > 0:
+            dataVecs += [self.groupCompetitionSecondsVec, self.groupCompetitionEffectVec]
+        return dataVecs + self.statisticsVecs
         
     def _writeDataVecs(self):
         
         '''writes data vectors to file'''
         
-        with open(self.filePath, 'ab') as csvFile:
-            csvWriter = csv.writer(csvFile)
-            csvWriter.writerow(self.prosocialProportionsVec)
-            csvWriter.writerow(self.populationCountsVec)
-            csvWriter.writerow(self.groupCountsVec)
-            csvWriter.writerow(self.stdDeviationsVec)
+        writeRows(self.filePath, self._dataVecs())
     
     def _printDataVecs(self):
         
         '''prints data vectors'''
         
-        print(self.columnTitles)
-        print(self.prosocialProportionsVec)
-        print(self.populationCountsVec)
-        print(self.groupCountsVec)
-        print(self.stdDeviationsVec)
+        printRows([self.columnTitles] + self._dataVecs())
         
     def _updatePopulationData(self):
         
         '''called each round to append data from round to data vectors'''
         
-        # update counts and make list of group's proportions to calculate std deviation
-        self.populationCount = 0
-        self.countProsocial = 0
-        self.countSelfish = 0
-        prosocialProportionsAllGroups = []
-        for group in self.groups:
-            self.countProsocial += group.countProsocial
-            self.countSelfish += group.countSelfish
-            self.populationCount += group.size()
-            try:
-                prosocialProportionsAllGroups.append(group.proportionProsocial())
-            except ZeroDivisionError:
-                # skip appending proportion of groups for which the population is zero
-                pass
+        self._updatePopulationDataFromCounts(*self._groupCountArrays())
+        
+    def _updatePopulationDataFromCounts(self, prosocialCounts, selfishCounts):
+        
+        '''appends data to data vectors given arrays of prosocial and selfish counts per group, which the 
+        simulator keeps as its current group counts, and records the counts to the trajectory if there is one'''
+        
+        self.groupProsocialCounts, self.groupSelfishCounts = prosocialCounts, selfishCounts
+        if self.trajectoryRecorder is not None:
+            self.trajectoryRecorder.record(prosocialCounts, selfishCounts)
+        
+        self.countProsocial = int(prosocialCounts.sum())
+        self.countSelfish = int(selfishCounts.sum())
+        self.populationCount = self.countProsocial + self.countSelfish
+        # std deviation and additional statistics skip groups for which the population is zero, and are -1 
+        # in case of complete extinction of population
+        statistics = computeStatistics(['unweightedStd'] + self.statistics, prosocialCounts, selfishCounts)
             
         # append to data vectors
-        try:
+        if self.populationCount > 0:
             self.prosocialProportionsVec.append(self.countProsocial / float(self.populationCount))
-        except ZeroDivisionError:
+        else:
             # proportion of -.1 indicates that populationCount is 0, thus entire population is extinct
             self.prosocialProportionsVec.append(-.1)
         self.populationCountsVec.append(self.populationCount)
         self.groupCountsVec.append(self.numGroups)
-        if prosocialProportionsAllGroups:
-            self.stdDeviationsVec.append(numpy.std(prosocialProportionsAllGroups))
+        self.stdDeviationsVec.append(statistics[0])
+        for statisticsVec, value in zip(self.statisticsVecs, statistics[1:]):
+            statisticsVec.append(value)
+            
+    def _recordGeneration(self, prosocialCounts, selfishCounts):
+        
+        '''records data between the generations of a round, given arrays of prosocial and selfish counts per group'''
+        
+        if self.recordPriceEquation:
+            self._updatePriceTerms(prosocialCounts, selfishCounts)
+        self._updatePopulationDataFromCounts(prosocialCounts, selfishCounts)
+        
+    def _updatePriceTerms(self, prosocialCounts, selfishCounts):
+        
+        '''appends the Price equation terms for the change from self.priceParentCounts to the given arrays of 
+        prosocial and selfish counts per group, which then become the parent counts of the next interval'''
+        
+        between, within = priceDecomposition(self.priceParentCounts[0], self.priceParentCounts[1], 
+                                             prosocialCounts, selfishCounts)
+        self.betweenGroupSelectionVec.append(between)
+        self.withinGroupSelectionVec.append(within)
+        self.priceParentCounts = (prosocialCounts, selfishCounts)
+        
+    def _groupCountArrays(self):
+        
+        '''returns tuple of integer arrays (prosocialCounts, selfishCounts), one entry per group. Groups of 
+        individuals already keep their own counts, so reading them costs one attribute per group and nothing 
+        per individual; groups kept only as counts return the rows of groupCounts as they are (prosocial 
+        genotypes AA and Aa summed)'''
+        
+        if self._keepsGroupCounts():
+            if self.reproduction == ReproductionType.sexual:
+                return self.groupCounts[0] + self.groupCounts[1], self.groupCounts[2]
+            return self.groupCounts[0], self.groupCounts[1]
+        prosocialCounts = numpy.fromiter((group.countProsocial for group in self.groups), dtype=numpy.int64, 
+                                         count=len(self.groups))
+        selfishCounts = numpy.fromiter((group.countSelfish for group in self.groups), dtype=numpy.int64, 
+                                       count=len(self.groups))
+        return prosocialCounts, selfishCounts
+    
+    def _keepsGroupCounts(self):
+        
+        '''returns whether groups are kept only as the array groupCounts, without individuals'''
+        
+        return self._usesArrayLifeCycle() and not self.membersCreated
+    
+    def _countedGenotypes(self):
+        
+        '''returns list of the genotypes counted by the rows of groupCounts'''
+        
+        if self.reproduction == ReproductionType.sexual:
+            return [Genotype.AA, Genotype.Aa, Genotype.aa]
+        prosocialGenotype = Genotype.A if self.prosocialPhenotype == Phenotype.altruistic else Genotype.R
+        return [prosocialGenotype, Genotype.S]
+    
+    def _usesArrayLifeCycle(self):
+        
+        '''returns whether rounds run on arrays of group counts rather than on individuals'''
+        
+        return (self.generationsPerMigration > 1 or self.reproduction == ReproductionType.sexual 
+                or self.payoffKernel is not None or self.normalApproximationThreshold is not None)
+    
+    def _runGenerationsVectorized(self):
+        
+        '''runs self.generationsPerMigration generations on the arrays of groupCounts, which carry the 
+        resulting counts to the next round'''
+        
+        toRecord = self.recordEveryGeneration and self.toUpdateData
+        onGeneration = self._recordGeneration if toRecord else None
+        if self.reproduction == ReproductionType.sexual:
+            self.groupCounts = lifeCycleSexualVectorized(self.groupCounts, mutationRate=self.mutationRate,
+                                                         generations=self.generationsPerMigration, 
+                                                         onGeneration=onGeneration, **self.kwargs)
+        elif self.payoffKernel is not None:
+            self.groupCounts = lifeCycleStrategiesVectorized(self.groupCounts, self.payoffKernel, 
+                                                             mutationMatrix=[[1 - self.mutationRate, self.mutationRate],
+                                                                             [self.mutationRate, 1 - self.mutationRate]],
+                                                             generations=self.generationsPerMigration,
+                                                             onGeneration=(lambda counts: onGeneration(*counts)) if toRecord else None, 
+                                                             **self.kwargs)
         else:
-            # append with -1 in case of complete extinction of population
-            self.stdDeviationsVec.append(-1)
+            self.groupCounts = numpy.vstack(lifeCycleCounts(self.groupCounts[0], self.groupCounts[1], 
+                                                            prosocialPhenotype=self.prosocialPhenotype,
+                                                            mutationRate=self.mutationRate, 
+                                                            generations=self.generationsPerMigration,
+                                                            onGeneration=onGeneration, **self.kwargs))
+            
+    def _groupGenotypeCounts(self):
+        
+        '''returns integer array of shape (3, numGroups) counting members of genotypes AA, Aa, and aa per group'''
+        
+        genotypeRows = {Genotype.AA: 0, Genotype.Aa: 1, Genotype.aa: 2}
+        genotypeCounts = numpy.zeros((3, len(self.groups)), dtype=numpy.int64)
+        for groupIndex, group in enumerate(self.groups):
+            for member in group.members:
+                genotypeCounts[genotypeRows[member.genotype], groupIndex] += 1
+        return genotypeCounts
+        
+    def _populateGroupsFromCounts(self, genotypes, genotypeCounts):
+        
+        '''replaces the members of every group with new individuals matching the given counts, where 
+        genotypeCounts has one row of counts per group for each genotype in list genotypes'''
+        
+        for groupIndex, group in enumerate(self.groups):
+            progeny = SocialGroup(self.reproduction)
+            progeny.addMembers(chain(*[[Individual(genotype, self.reproduction, self.mutationRate) 
+                                        for _ in range(counts[groupIndex])] 
+                                       for genotype, counts in zip(genotypes, genotypeCounts)]))
+            group._supplantGroup(progeny)
+            
+    def _createMembers(self):
+        
+        '''creates the members of groups kept only as counts, for a migration function that moves individuals'''
+        
+        self.membersCreated = True
+        self.groups = [SocialGroup(self.reproduction) for _ in range(self.numGroups)]
+        self._populateGroupsFromCounts(self._countedGenotypes(), self.groupCounts)
+        
+    def _countMembers(self):
+        
+        '''keeps groups created by _createMembers only as counts again, once the migration function has moved 
+        their members'''
+        
+        if self.reproduction == ReproductionType.sexual:
+            self.groupCounts = self._groupGenotypeCounts()
+        else:
+            self.groupCounts = numpy.vstack(self._groupCountArrays())
+        self.numGroups = len(self.groups)
+        self.groups = []
+        self.allIndividuals = self.groupCounts.sum(axis=1)
+        self.membersCreated = False
+            
     def _mergeGroups(self):
         
-        '''merge members of all groups into single population'''
+        '''merge members of all groups into single population, or pool the counts of all groups if groups are 
+        kept only as counts'''
         
+        if self._keepsGroupCounts():
+            self.allIndividuals = self.groupCounts.sum(axis=1)
+            return
         self.allIndividuals = []
         self.allIndividuals = list(chain(*[group.members for group in self.groups]))
         
@@ -292,7 +673,7 @@ class EvolutionSimulator:
         
         '''reassigns self.groups with a new list of groups of appropriate length for next round'''
 
-        self.populationCount = len(self.allIndividuals)
+        self.populationCount = int(self.allIndividuals.sum()) if self._keepsGroupCounts() else len(self.allIndividuals)
         if self.populationCount == 0:
             self.numGroups = 0
             self.groups = []
@@ -304,21 +685,96 @@ class EvolutionSimulator:
         self.numGroups = self.populationCount / self.targetGroupSize        
         if self.numGroups == 0:
             self.numGroups = 1
+        if self._keepsGroupCounts():
+            return
         
         self.groups = [SocialGroup(self.reproduction) for _ in range(self.numGroups)]
         
+    def _groupCompetitionPhase(self):
+        
+        '''replaces the groups that go extinct in a round of group competition by copies of the members of 
+        replicating groups, and records the time taken and the change in prosocial proportion if data is 
+        gathered'''
+        
+        startTime = time()
+        prosocialCounts, selfishCounts = self._groupCountArrays()
+        replicating, extinct = competitionEvents(prosocialCounts, selfishCounts, self.groupCompetitionRate, 
+                                                 self.groupFitness, self.groupCompetitionSampler)
+        if self._keepsGroupCounts():
+            # a new array, since arrays handed out by _groupCountArrays (e.g. to snapshots) are views of groupCounts
+            groupCounts = self.groupCounts.copy()
+            groupCounts[:, extinct] = self.groupCounts[:, replicating]
+            self.groupCounts = groupCounts
+            if self.toUpdateData:
+                before = prosocialCounts.sum() / float(max(prosocialCounts.sum() + selfishCounts.sum(), 1))
+                prosocialCounts, selfishCounts = self._groupCountArrays()
+                after = prosocialCounts.sum() / float(max(prosocialCounts.sum() + selfishCounts.sum(), 1))
+                self.groupCompetitionSecondsVec.append(time() - startTime)
+                self.groupCompetitionEffectVec.append(after - before)
+            return
+        # copies are taken before any group is replaced, since a group may both replicate and go extinct
+        replicas = [[(member.genotype, member.age) for member in self.groups[groupIndex].members] for groupIndex in replicating]
+        for groupIndex, groupReplicas in zip(extinct, replicas):
+            copy = SocialGroup(self.reproduction)
+            for genotype, age in groupReplicas:
+                individual = Individual(genotype, self.reproduction, self.mutationRate)
+                individual.age = age
+                copy.addMember(individual)
+            self.groups[groupIndex]._supplantGroup(copy)
+        
+        if self.toUpdateData:
+            before = prosocialCounts.sum() / float(max(prosocialCounts.sum() + selfishCounts.sum(), 1))
+            prosocialCounts[extinct] = prosocialCounts[replicating]
+            selfishCounts[extinct] = selfishCounts[replicating]
+            after = prosocialCounts.sum() / float(max(prosocialCounts.sum() + selfishCounts.sum(), 1))
+            self.groupCompetitionSecondsVec.append(time() - startTime)
+            self.groupCompetitionEffectVec.append(after - before)
+        
+    def _seedStreams(self, phase, groupIndex=None):
+        
+        '''reseeds self.randomGenerator from the stream of the given phase of the current round and, unless 
+        the stream is that of a single group, numpy.random and compiled kernels as well'''
+        
+        seedValue = streams.deriveSeed(self.randomSeed, self.currentRound, phase, groupIndex)
+        self.randomGenerator.seed(seedValue)
+        if groupIndex is None:
+            jit.seed(seedValue)
+        
     def _migrationPhase(self):
         
-        '''wrapper method that simply calls the migration function instance variable'''
+        '''wrapper method that calls the migration function instance variable. Groups kept only as counts are 
+        given members for a migration function that moves individuals, and counted again after it'''
         
-        self.migrationFunction(self)
+        if self._keepsGroupCounts() and self.migrationFunction not in COUNT_MIGRATION_FUNCTIONS:
+            self._createMembers()
+            self.migrationFunction(self)
+            self._countMembers()
+        else:
+            self.migrationFunction(self)
     
     def _assignToGroupsRandomly(self, individuals):
         
-        '''randomly assigns individuals in input list to groups'''
+        '''randomly assigns individuals in input list to groups, or deals the pooled counts per row of 
+        groupCounts into groups whose sizes differ by at most one if groups are kept only as counts'''
+        
+        if self._keepsGroupCounts():
+            groupSize, remainder = divmod(int(individuals.sum()), max(self.numGroups, 1))
+            groupSizes = numpy.full(self.numGroups, groupSize, dtype=numpy.int64)
+            groupSizes[:remainder] += 1
+            self.groupCounts = dealCountsToGroups(individuals, groupSizes)
+            return
         
         # shuffle individuals to achieve random ordering
-        random.shuffle(individuals)
+        streams.shuffle(individuals)
+        
+        if self.randomSeed is not None:
+            # with synchronized streams, groups take consecutive runs of individuals, so that an individual
+            # more or less in the shuffled order moves others across at most one group boundary each
+            for groupIndex, group in enumerate(self.groups):
+                group.addMembers(individuals[groupIndex * len(individuals) // len(self.groups):
+                                             (groupIndex + 1) * len(individuals) // len(self.groups)])
+            del individuals[:]
+            return
         
         # assign to groups one by one
         while len(individuals) > 0:
@@ -328,18 +784,43 @@ class EvolutionSimulator:
                 else:
                     break; 
 
-    def  runEvolutionarySimulation(self):
+    def _snapshot(self):
+        
+        '''returns RoundSnapshot of the current round, reusing the group counts of the data vectors if they 
+        were just updated'''
+        
+        if self.toUpdateData:
+            prosocialCounts, selfishCounts = self.groupProsocialCounts, self.groupSelfishCounts
+        else:
+            prosocialCounts, selfishCounts = self._groupCountArrays()
+        return RoundSnapshot(self.currentRound, prosocialCounts, selfishCounts)
+
+    def iterRounds(self):
      
         '''
-         Description: runs complete evolutionary simulation. Works principally by running
-             a loop as many times as self.rounds. For each round, for each group in self.groups,
+         Description: generator that runs the evolutionary simulation one round at a time. Works principally 
+             by running a loop as many times as self.rounds. For each round, for each group in self.groups,
              the instance methods socialunits.group.SocialGroup playSocialGame() and
              deathAndReproduction() are called, followed by migration phase (managed by method 
              _migrationPhase of this class). If self.threaded is true, threading is used to process 
              instance methods of SocialGroup in parallel, with four threads (note that if playSocialGame 
              or deathAndReproduction are overridden and changed in such a way that groups interact with 
              other groups during the execution of these methods, self.threaded will need to be set 
-             to false to avoid race conditions).  
+             to false to avoid race conditions). If self.generationsPerMigration is greater than 1, each
+             round instead runs that many generations for all groups at once on arrays of group counts.
+             Sexually reproducing populations always run on arrays of genotype counts in this way, as do
+             simulations given a payoff kernel or a normalApproximationThreshold. If self.randomSeed is not 
+             None, socialunits.streams draws from self.randomGenerator, reseeded at the start of every 
+             phase, until the generator is exhausted or closed (so other simulations should not draw from 
+             socialunits.streams while a seeded generator is suspended). 
+             
+             Data vectors are updated, and a trajectory recorded, as in runEvolutionarySimulation, but are 
+             neither printed nor written; otherwise no history is retained. A caller may stop early by 
+             breaking out of its loop, which closes any trajectory file once the generator is closed or 
+             collected
+         
+         Returns: generator of RoundSnapshot, one for the starting state (round 0) after the initial 
+             assignment to groups and one after the migration phase of every round
          '''
         
         def getSplits(self):
@@ -369,34 +850,94 @@ class EvolutionSimulator:
                 group.playSocialGame(**self.kwargs)
                 group.deathAndReproduction(**self.kwargs)
          
-        # initial assignment to groups        
-        self._assignToGroupsRandomly(self.allIndividuals)
-        
-        # prepare initial data if printing or writing data
-        if self.toWriteCSV or self.toPrintDataVecs:
-            if self.toWriteCSV:
-                if self.toWriteColumnTitles:
-                    self._writeColumnTitles()
-            self._updatePopulationData()
-        
-        # play every round    
-        for _ in range(self.rounds):
-            if self.threaded:
-                splits = getSplits(self)
-                threads = []
-                for split in splits:
-                    thread = threading.Thread(target=_runLifeCycleGroupsSplit, args=(self, split,))
-                    thread.start()
-                    threads.append(thread)
-                for thread in threads:
-                    thread.join()
-            else:
-                _runLifeCycleGroupsSplit(self, self.groups)
+        if self.randomSeed is not None:
+            generatorClass = streams.AntitheticRandom if self.antithetic else streams.SynchronizedRandom
+            self.randomGenerator = generatorClass(classOf=attrgetter('phenotype'))
+            streams.useGenerator(self.randomGenerator)
+        try:
+            # initial assignment to groups        
+            if self.randomSeed is not None:
+                self._seedStreams('assignment')
+            self._assignToGroupsRandomly(self.allIndividuals)
+        
+            if self.trajectoryFile is not None:
+                self.trajectoryRecorder = TrajectoryRecorder(self.trajectoryFile)
+        
+            # prepare initial data if printing, writing, or recording data
+            if self.toUpdateData:
+                if self.toWriteCSV:
+                    if self.toWriteColumnTitles:
+                        self._writeColumnTitles()
+                self._updatePopulationData()
+                if self.recordPriceEquation:
+                    self.betweenGroupSelectionVec.append(0.0)
+                    self.withinGroupSelectionVec.append(0.0)
+                if self.groupCompetitionRate > 0:
+                    self.groupCompetitionSecondsVec.append(0.0)
+                    self.groupCompetitionEffectVec.append(0.0)
+            yield self._snapshot()
+        
+            # play every round    
+            for self.currentRound in range(1, self.rounds + 1):
+                toUpdatePrice = self.toUpdateData and self.recordPriceEquation
+                if toUpdatePrice:
+                    self.priceParentCounts = self._groupCountArrays()
+                if self._usesArrayLifeCycle():
+                    if self.randomSeed is not None:
+                        self._seedStreams('life cycle')
+                    self._runGenerationsVectorized()
+                elif self.randomSeed is not None:
+                    # every group draws from its own stream, which threads would interleave
+                    for groupIndex, group in enumerate(self.groups):
+                        self._seedStreams('social game', groupIndex)
+                        group.playSocialGame(**self.kwargs)
+                        self._seedStreams('reproduction', groupIndex)
+                        group.deathAndReproduction(**self.kwargs)
+                elif self.threaded:
+                    splits = getSplits(self)
+                    threads = []
+                    for split in splits:
+                        thread = threading.Thread(target=_runLifeCycleGroupsSplit, args=(self, split,))
+                        thread.start()
+                        threads.append(thread)
+                    for thread in threads:
+                        thread.join()
+                else:
+                    _runLifeCycleGroupsSplit(self, self.groups)
+            
+                # groups keep their positions until migration, so progeny are compared with their parents' groups
+                if toUpdatePrice:
+                    self._updatePriceTerms(*self._groupCountArrays())
                                 
-            self._migrationPhase()
+                if self.groupCompetitionRate > 0:
+                    if self.randomSeed is not None:
+                        self._seedStreams('group competition')
+                    self._groupCompetitionPhase()
+                
+                if self.randomSeed is not None:
+                    self._seedStreams('migration')
+                self._migrationPhase()
             
-            if self.toWriteCSV or self.toPrintDataVecs:
-                self._updatePopulationData()
+                if self.toUpdateData:
+                    self._updatePopulationData()
+                yield self._snapshot()
+        finally:
+            if self.trajectoryRecorder is not None:
+                self.trajectoryRecorder.close()
+                self.trajectoryRecorder = None
+            if self.randomGenerator is not None:
+                streams.useDefaultGenerator()
+                self.randomGenerator = None
+    
+    def runEvolutionarySimulation(self):
+     
+        '''
+         Description: runs complete evolutionary simulation by consuming iterRounds, then prints and writes 
+             the data vectors as specified in the constructor
+         '''
+        
+        for _ in self.iterRounds():
+            pass
         
         if self.toWriteCSV or self.toPrintDataVecs:    
             self._finalizeDataVecs()
@@ -20,6 +20,7 @@ from evo_simulator import EvolutionSimulator
 from socialunits.enums import ReproductionType, ProsocialityType
 from migration import biasedRedistribution
 from time import time
+from run_catalog import RunCatalog, CATALOG_PATH
 
 '''test every combination of target group size from 2 to 21 and extra reproduction probability from 
 0 to .5 in steps of .05.'''
@@ -50,3 +51,6 @@ for targetGroupSize in range (2, 22):
         print(' targetGroupSize = ' + str(targetGroupSize))  
         print(' extraReproductionProbability = ' + str(extraReproductionProbability))
         print(' execution time = ' + str(time() - startTime) + '\n')
+
+# record the trials of the experiment in the catalog of runs, beside those of earlier runs of it
+RunCatalog(CATALOG_PATH).importSweep(simulator.filePath, experiment='experiment3')
@@ -21,6 +21,7 @@ from evo_simulator import EvolutionSimulator
 from socialunits.enums import ReproductionType, ProsocialityType
 from migration import biasedRedistribution
 from time import time
+from run_catalog import RunCatalog, CATALOG_PATH
 
 '''test every combination of cost of prosociality from 0 to .2 in steps of .01 and 
 extra reproduction probability from 0 to .5 in steps of .05.'''
@@ -50,4 +51,7 @@ for costOfProsociality in [prob / 100.0 for prob in range(0, 21)]:
         print('finished round:')
         print(' costOfProsocialiy = ' + str(costOfProsociality))  
         print(' extraReproductionProbability = ' + str(extraReproductionProbability))
-        print(' execution time = ' + str(time() - startTime) + '\n')
\ No newline at end of file
+        print(' execution time = ' + str(time() - startTime) + '\n')
+
+# record the trials of the experiment in the catalog of runs, beside those of earlier runs of it
+RunCatalog(CATALOG_PATH).importSweep(simulator.filePath, experiment='experiment4')
@@ -0,0 +1,119 @@
+'''
+Module description:
+    module for defining the explicit between-group selection phase that
+    simulation.evo_simulator.EvolutionSimulator may run each round, between death and
+    reproduction and migration. In this phase each group goes extinct with probability
+    equal to the simulator's group competition rate, and every extinct group is replaced
+    by a copy of a group sampled with probability proportional to group fitness, as in
+    models of group selection by differential group extinction and replication. Group
+    fitness is a function of arrays of counts per group, by default group size. Sampling
+    tables are rebuilt once per round, and every sample then takes constant time with
+    the alias method (or logarithmic time with cumulative sums), so the phase scales to
+    hundreds of thousands of groups
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from socialunits.jit import aliasTable, JIT_AVAILABLE
+import numpy
+
+def groupSizeFitness(prosocialCounts, selfishCounts):
+
+    '''fitness of each group equal to its number of members after death and reproduction, which already
+    reflects the benefits its prosocial members granted'''
+
+    return prosocialCounts + selfishCounts
+
+def exponentialFitness(strength):
+
+    '''returns a group fitness function equal to exp(strength times prosocial proportion) per group, with
+    groups without members of fitness 0'''
+
+    def fitness(prosocialCounts, selfishCounts):
+        sizes = prosocialCounts + selfishCounts
+        return numpy.where(sizes > 0, numpy.exp(strength * prosocialCounts / numpy.maximum(sizes, 1).astype(float)), 0.0)
+    return fitness
+
+def sampleAliasTable(acceptance, alias, size):
+
+    '''returns size indices sampled from a table built by socialunits.jit.aliasTable'''
+
+    indices = numpy.random.randint(0, len(acceptance), size)
+    return numpy.where(numpy.random.random_sample(size) < acceptance[indices], indices, alias[indices])
+
+def sampleCumulative(weights, size):
+
+    '''returns size indices sampled with probability proportional to weights, by binary search of cumulative
+    sums. Indices of weight 0 are never sampled'''
+
+    cumulativeWeights = numpy.cumsum(weights, dtype=float)
+    return numpy.searchsorted(cumulativeWeights, numpy.random.random_sample(size) * cumulativeWeights[-1], side='right')
+
+def competitionEvents(prosocialCounts, selfishCounts, rate, fitness=groupSizeFitness, sampler=None):
+
+    '''
+    Description: draws the extinctions and replications of a round of group competition
+
+    Parameters:
+    # prosocialCounts, selfishCounts: integer arrays of counts per group
+    # rate: probability that each group goes extinct
+    # fitness: function from (prosocialCounts, selfishCounts) to nonnegative weights per group
+    # sampler: 'alias' or 'cumulative', the method of sampling replicating groups. If None, the alias method
+        if numba is installed (which compiles the building of its table), and cumulative sums otherwise
+
+    Returns: tuple of integer arrays (replicating, extinct) of equal length: extinct group extinct[i] is
+        replaced by a copy of group replicating[i] as it was before the phase. A group may replicate more than
+        once, and may replicate and go extinct in the same round. Both are empty if no group goes extinct or
+        if every group has fitness 0
+
+    Errors:
+    # RuntimeError: raised if sampler is not 'alias', 'cumulative', or None
+    '''
+
+    if sampler is None:
+        sampler = 'alias' if JIT_AVAILABLE else 'cumulative'
+    if sampler not in ('alias', 'cumulative'):
+        raise RuntimeError("sampler must be 'alias' or 'cumulative'")
+    weights = numpy.asarray(fitness(prosocialCounts, selfishCounts), dtype=float)
+    extinct = numpy.flatnonzero(numpy.random.random_sample(len(weights)) < rate)
+    if len(extinct) == 0 or not weights.sum() > 0:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+    if sampler == 'alias':
+        acceptance, alias = aliasTable(weights)
+        replicating = sampleAliasTable(acceptance, alias, len(extinct))
+    else:
+        replicating = sampleCumulative(weights, len(extinct))
+    return replicating, extinct
+
+if __name__ == '__main__':
+
+    '''checks both samplers against the weights they sample from, then times a round of competition for
+    growing numbers of groups with each'''
+
+    from time import time
+
+    weights = numpy.array([0.0, 1.0, 2.0, 3.0, 0.0, 4.0])
+    samples = 10 ** 6
+    print('expected frequencies ' + str(weights / weights.sum()))
+    print('alias frequencies ' + str(numpy.bincount(sampleAliasTable(*(aliasTable(weights) + (samples,))),
+                                                    minlength=len(weights)) / float(samples)))
+    print('cumulative frequencies ' + str(numpy.bincount(sampleCumulative(weights, samples),
+                                                         minlength=len(weights)) / float(samples)))
+
+    print('groups, seconds per round (alias), seconds per round (cumulative)')
+    for numGroups in [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]:
+        prosocialCounts = numpy.random.binomial(10, .5, numGroups)
+        selfishCounts = numpy.random.binomial(10, .5, numGroups)
+        times = []
+        for sampler in ['alias', 'cumulative']:
+            competitionEvents(prosocialCounts, selfishCounts, .1, sampler=sampler)
+            startTime = time()
+            for _ in range(10):
+                competitionEvents(prosocialCounts, selfishCounts, .1, sampler=sampler)
+            times.append(str(round((time() - startTime) / 10, 5)))
+        print(str(numGroups) + ', ' + ', '.join(times))
@@ -0,0 +1,115 @@
+'''
+Module description:
+    module for defining the per-round statistics that simulation.evo_simulator.EvolutionSimulator
+    may record in addition to its default data vectors. Each statistic is a single vectorized
+    reduction over arrays of counts per group, so recording more statistics adds no per-group
+    Python work. Population totals and prosocial proportions are always recorded, as data
+    vectors of EvolutionSimulator. Statistics are looked up by name in the dictionary
+    STATISTICS, to which custom statistics may be added
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+import numpy
+
+def totalProsocial(prosocialCounts, groupSizes, proportions):
+
+    '''count of prosocial individuals in the population'''
+
+    return prosocialCounts.sum()
+
+def totalSelfish(prosocialCounts, groupSizes, proportions):
+
+    '''count of selfish individuals in the population'''
+
+    return groupSizes.sum() - prosocialCounts.sum()
+
+def unweightedStdDeviation(prosocialCounts, groupSizes, proportions):
+
+    '''standard deviation of groups' prosocial proportions, each group counted once'''
+
+    return numpy.std(proportions)
+
+def weightedStdDeviation(prosocialCounts, groupSizes, proportions):
+
+    '''standard deviation of groups' prosocial proportions, each group weighted by its size, i.e. the
+    standard deviation over individuals of the prosocial proportion of their group'''
+
+    meanProportion = prosocialCounts.sum() / float(groupSizes.sum())
+    return numpy.sqrt((groupSizes * (proportions - meanProportion) ** 2).sum() / float(groupSizes.sum()))
+
+def minProportion(prosocialCounts, groupSizes, proportions):
+
+    '''smallest of groups' prosocial proportions'''
+
+    return proportions.min()
+
+def maxProportion(prosocialCounts, groupSizes, proportions):
+
+    '''largest of groups' prosocial proportions'''
+
+    return proportions.max()
+
+def meanGroupSize(prosocialCounts, groupSizes, proportions):
+
+    '''mean size of groups with at least one member'''
+
+    return groupSizes.mean()
+
+def maxGroupSize(prosocialCounts, groupSizes, proportions):
+
+    '''size of the largest group'''
+
+    return groupSizes.max()
+
+def quantileStatistic(percentile):
+
+    '''returns a statistic giving the given percentile (0 to 100) of groups' prosocial proportions'''
+
+    def quantileProportion(prosocialCounts, groupSizes, proportions):
+
+        '''percentile of groups' prosocial proportions'''
+
+        return numpy.percentile(proportions, percentile)
+    return quantileProportion
+
+'''name of statistic: (row title of its data vector, function). Every function takes arrays
+(prosocialCounts, groupSizes, proportions) restricted to groups with at least one member, where proportions
+are the groups' prosocial proportions, and returns a number'''
+STATISTICS = {'totalProsocial': ('total prosocial individuals:', totalProsocial),
+              'totalSelfish': ('total selfish individuals:', totalSelfish),
+              'unweightedStd': ('unweighted standard deviations in prosocial proportions:', unweightedStdDeviation),
+              'weightedStd': ('size-weighted standard deviations in prosocial proportions:', weightedStdDeviation),
+              'minProportion': ('minimum group prosocial proportions:', minProportion),
+              'maxProportion': ('maximum group prosocial proportions:', maxProportion),
+              'lowerQuartile': ('lower quartiles of group prosocial proportions:', quantileStatistic(25)),
+              'median': ('medians of group prosocial proportions:', quantileStatistic(50)),
+              'upperQuartile': ('upper quartiles of group prosocial proportions:', quantileStatistic(75)),
+              'meanGroupSize': ('mean group sizes:', meanGroupSize),
+              'maxGroupSize': ('maximum group sizes:', maxGroupSize)}
+
+def computeStatistics(names, prosocialCounts, selfishCounts):
+
+    '''
+    Description: computes the named statistics from arrays of counts per group. Groups without members are
+        ignored, and every statistic is -1 if the population is extinct
+
+    Parameters:
+    # names: list of keys of STATISTICS
+    # prosocialCounts, selfishCounts: integer arrays of counts per group
+
+    Returns: list of values, one per name
+    '''
+
+    groupSizes = prosocialCounts + selfishCounts
+    occupied = groupSizes > 0
+    if not occupied.any():
+        return [-1] * len(names)
+    prosocialCounts, groupSizes = prosocialCounts[occupied], groupSizes[occupied]
+    proportions = prosocialCounts / groupSizes.astype(float)
+    return [STATISTICS[name][1](prosocialCounts, groupSizes, proportions) for name in names]
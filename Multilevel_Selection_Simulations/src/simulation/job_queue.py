@@ -0,0 +1,314 @@
+'''
+Module description:
+    defines a job queue for running sweeps (see simulation.sweep) on several hosts at once.
+    The queue and the store of results share a single SQLite database file, which workers on
+    any host with access to a shared filesystem open directly, so no server is needed. A
+    coordinator submits parameter points; workers claim them one at a time under a lease,
+    which they renew by heartbeats while the trial runs. The jobs of workers that die are
+    claimed again once their leases expire. Results are keyed by parameter point and
+    replicate, and writing a result that is already stored has no effect, so a job retried
+    after its first worker finished late does not duplicate data
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from sweep import encodeParameters, parameterKey, runTrial
+from run_catalog import runCataloged
+from multiprocessing import Process
+from socket import gethostname
+from time import time, sleep
+import json, os, sqlite3, threading, traceback
+
+class JobQueue:
+
+    '''
+    Description: SQLite-backed queue of simulation jobs with leased claims, and store of their results.
+        Every method opens its own short transaction, so instances may be used from any number of
+        processes at once, on one host or many. Jobs are in one of four states: pending (never claimed,
+        or released after an error), leased (claimed, with a lease expiring at leaseExpires), done, or
+        failed (claimed maxAttempts times without finishing). Claims are only exclusive if SQLite's file
+        locks are: many network filesystems (e.g. NFS without a working lock manager, or SMB mounts with
+        caching) implement locking unreliably, and may then grant a job to two workers at once or corrupt
+        the database, so the shared filesystem must support POSIX advisory locks across hosts. Unlike
+        simulation.run_catalog.RunCatalog, the queue is not in write-ahead-log mode, which would confine it
+        to a single host
+
+    Parameters/instance variables:
+    # path: path of database file, created if missing
+    # leaseSeconds: time for which a claim holds without a heartbeat
+    # maxAttempts: number of claims of a job after which it is marked failed rather than claimed again
+
+    Constructor method signature: __init__(self, path, leaseSeconds=60.0, maxAttempts=3)
+
+    Public methods:
+    # submit(points, replicates=1): adds jobs for parameter points, skipping jobs already in the queue.
+        Returns number of jobs added
+    # claim(workerId): leases a pending or expired job to workerId. Returns (key, parameters), or None if
+        there is nothing to claim
+    # heartbeat(key, workerId): renews the lease of a job. Returns false if workerId no longer holds it
+    # complete(key, workerId, result): stores the result of a job and marks it done
+    # release(key, workerId, error): gives up a job after an error, so that it may be claimed again
+    # stateCounts(): returns dictionary from job state to number of jobs
+    # isFinished(): returns true if every job is done or failed
+    # results(): returns list of (parameters, replicate, result) of finished jobs
+    '''
+
+    def __init__(self, path, leaseSeconds=60.0, maxAttempts=3):
+        self.path = path
+        self.leaseSeconds = leaseSeconds
+        self.maxAttempts = maxAttempts
+        connection = self._connect()
+        try:
+            connection.execute('''CREATE TABLE IF NOT EXISTS jobs (key TEXT PRIMARY KEY, parameters TEXT,
+                                  replicate INTEGER, state TEXT, worker TEXT, leaseExpires REAL,
+                                  attempts INTEGER, error TEXT)''')
+            connection.execute('CREATE INDEX IF NOT EXISTS jobsByState ON jobs (state, leaseExpires)')
+            connection.execute('''CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, parameters TEXT,
+                                  replicate INTEGER, result TEXT, worker TEXT, finished REAL)''')
+        finally:
+            connection.close()
+
+    def _connect(self):
+
+        '''returns a new connection in autocommit mode, which waits for locks held by other processes'''
+
+        return sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+
+    def submit(self, points, replicates=1):
+
+        '''
+        Description: adds a pending job for every replicate of every parameter point, in a single
+            transaction. Jobs already in the queue, whatever their state, are skipped
+
+        Parameters:
+        # points: iterable of parameter points, encoded or not (see simulation.sweep.encodeParameters)
+        # replicates: number of replicates of every point
+
+        Returns: number of jobs added
+        '''
+
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            added = 0
+            for parameters in points:
+                encoded = json.dumps(encodeParameters(parameters), sort_keys=True)
+                for replicate in range(replicates):
+                    added += connection.execute('''INSERT OR IGNORE INTO jobs VALUES (?, ?, ?, 'pending', NULL, 0, 0, NULL)''',
+                                                (parameterKey(parameters, replicate), encoded, replicate)).rowcount
+            connection.execute('COMMIT')
+            return added
+        finally:
+            connection.close()
+
+    def claim(self, workerId):
+
+        '''
+        Description: leases the oldest job that is pending or whose lease expired to workerId, for
+            leaseSeconds. Expired jobs on their final attempt are marked failed rather than claimed
+
+        Parameters:
+        # workerId: name of the claiming worker
+
+        Returns: tuple (key, parameters) of the job, parameters encoded and their 'seed' (if any) offset by
+            the replicate, or None if there is nothing to claim
+        '''
+
+        now = time()
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            # jobs whose leases expired on their final attempt are given up
+            connection.execute('''UPDATE jobs SET state = 'failed', error = 'lease expired'
+                                  WHERE state = 'leased' AND leaseExpires < ? AND attempts >= ?''', (now, self.maxAttempts))
+            row = connection.execute('''SELECT key, parameters, replicate FROM jobs WHERE state = 'pending'
+                                        OR (state = 'leased' AND leaseExpires < ?) ORDER BY rowid LIMIT 1''', (now,)).fetchone()
+            if row is not None:
+                connection.execute('''UPDATE jobs SET state = 'leased', worker = ?, leaseExpires = ?,
+                                      attempts = attempts + 1 WHERE key = ?''', (workerId, now + self.leaseSeconds, row[0]))
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        parameters = json.loads(row[1])
+        if 'seed' in parameters:
+            # replicates of a seeded point differ in their seeds
+            parameters['seed'] += row[2]
+        return row[0], parameters
+
+    def heartbeat(self, key, workerId):
+
+        '''renews the lease of the job with the given key for another leaseSeconds, and returns whether
+        workerId still held it'''
+
+        connection = self._connect()
+        try:
+            return connection.execute('''UPDATE jobs SET leaseExpires = ? WHERE key = ? AND worker = ?
+                                         AND state = 'leased' ''', (time() + self.leaseSeconds, key, workerId)).rowcount == 1
+        finally:
+            connection.close()
+
+    def complete(self, key, workerId, result):
+
+        '''stores the result (JSON-serializable, e.g. as returned by simulation.sweep.runTrial) of the job
+        with the given key and marks it done. A result already stored for the job is kept'''
+
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('''INSERT OR IGNORE INTO results SELECT key, parameters, replicate, ?, ?, ? FROM jobs
+                                  WHERE key = ?''', (json.dumps(result), workerId, time(), key))
+            connection.execute('''UPDATE jobs SET state = 'done', worker = ?, error = NULL WHERE key = ?''', (workerId, key))
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+
+    def release(self, key, workerId, error):
+
+        '''gives up the job with the given key held by workerId after an error (e.g. a traceback), which is
+        recorded. The job becomes pending again, or failed if it has been claimed maxAttempts times'''
+
+        connection = self._connect()
+        try:
+            connection.execute('''UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                                  error = ? WHERE key = ? AND worker = ? AND state = 'leased' ''',
+                               (self.maxAttempts, error, key, workerId))
+        finally:
+            connection.close()
+
+    def stateCounts(self):
+
+        '''returns dictionary from job state to number of jobs in it, leaving out states without jobs'''
+
+        connection = self._connect()
+        try:
+            return dict(connection.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+        finally:
+            connection.close()
+
+    def isFinished(self):
+
+        '''returns true if every job is done or failed'''
+
+        counts = self.stateCounts()
+        return counts.get('pending', 0) == 0 and counts.get('leased', 0) == 0
+
+    def results(self):
+
+        '''returns list of (parameters, replicate, result) of finished jobs in order of completion,
+        parameters encoded'''
+
+        connection = self._connect()
+        try:
+            rows = connection.execute('SELECT parameters, replicate, result FROM results ORDER BY rowid').fetchall()
+        finally:
+            connection.close()
+        return [(json.loads(parameters), replicate, json.loads(result)) for parameters, replicate, result in rows]
+
+def runWorker(path, workerId=None, leaseSeconds=60.0, pollSeconds=1.0, catalogPath=None):
+
+    '''
+    Description: claims and runs jobs from the queue at path until every job is done or failed. While a
+        trial runs, a thread renews its lease every third of leaseSeconds; the thread is stopped and joined
+        once the trial ends, however it ends. Errors raised by a trial release the job for another attempt
+
+    Parameters:
+    # path: path of queue database
+    # workerId: name of worker, by default host name and process id
+    # leaseSeconds: lease of claims, as for JobQueue
+    # pollSeconds: wait between claims while other workers hold all remaining jobs
+    # catalogPath: if not None, path of a simulation.run_catalog.RunCatalog in which every trial is recorded,
+        pointing to its result in the queue
+
+    Returns: number of jobs completed by this worker
+    '''
+
+    if workerId is None:
+        workerId = gethostname() + ':' + str(os.getpid())
+    queue = JobQueue(path, leaseSeconds)
+    completed = 0
+    while True:
+        claimed = queue.claim(workerId)
+        if claimed is None:
+            if queue.isFinished():
+                return completed
+            sleep(pollSeconds)
+            continue
+        key, parameters = claimed
+        finished = threading.Event()
+
+        def beat():
+            while not finished.wait(leaseSeconds / 3.0):
+                queue.heartbeat(key, workerId)
+        heartbeatThread = threading.Thread(target=beat)
+        heartbeatThread.daemon = True
+        heartbeatThread.start()
+        error = None
+        try:
+            if catalogPath is None:
+                result = runTrial(parameters)
+            else:
+                result = runCataloged(catalogPath, parameters, trajectory=path + '#' + key)
+        except Exception:
+            error = traceback.format_exc()
+        finally:
+            finished.set()
+            heartbeatThread.join()
+        if error is not None:
+            queue.release(key, workerId, error)
+            continue
+        queue.complete(key, workerId, result)
+        completed += 1
+
+def runLocalWorkers(path, numWorkers, leaseSeconds=60.0, catalogPath=None):
+
+    '''runs numWorkers worker processes on this host against the queue at path, and waits for them to
+    finish. Stands in for workers on other hosts, which run runWorker (e.g. via this module's main).
+    Trials are recorded in the catalog at catalogPath if it is not None'''
+
+    workers = [Process(target=runWorker, args=(path, None, leaseSeconds), kwargs={'catalogPath': catalogPath})
+               for _ in range(numWorkers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+if __name__ == '__main__':
+
+    '''with a path argument, runs a worker against the queue at that path (start one per core on every
+    host sharing the file). Without arguments, runs a small sweep on local worker processes, one of which
+    is killed mid-trial to show that its job is claimed again once its lease expires'''
+
+    import sys
+    from sweep import gridPoints
+    from socialunits.enums import ReproductionType, ProsocialityType
+    from migration import randomRedistribution
+    from tempfile import mkdtemp
+
+    if len(sys.argv) > 1:
+        print('completed ' + str(runWorker(sys.argv[1])) + ' jobs')
+        sys.exit()
+
+    path = os.path.join(mkdtemp(), 'sweep.sqlite')
+    base = dict(migrationFunction=randomRedistribution, rounds=20, targetGroupSize=10, seedProportionProsocial=.53,
+                reproduction=ReproductionType.asexual, costOfProsociality=.02, extraReproductionProbability=.3,
+                baseReproductionChances=1, baseReproductionProbability=1.0, mutationRate=0.0,
+                typeProsociality=ProsocialityType.strong, seed=1)
+    queue = JobQueue(path, leaseSeconds=2.0)
+    print('submitted ' + str(queue.submit(gridPoints(base, [('targetGroupSize', [4, 8, 12])]), replicates=3)) + ' jobs')
+    print('resubmitted ' + str(queue.submit(gridPoints(base, [('targetGroupSize', [4, 8, 12])]), replicates=3)) + ' jobs')
+    doomed = Process(target=runWorker, args=(path, 'doomed', 2.0))
+    doomed.start()
+    sleep(.5)
+    doomed.terminate()
+    runLocalWorkers(path, 3, leaseSeconds=2.0)
+    print(queue.stateCounts())
+    for parameters, replicate, result in queue.results():
+        print(str(parameters['targetGroupSize']) + ', replicate ' + str(replicate) + ': final proportion ' +
+              str(result['prosocialProportions'][-1]))
@@ -0,0 +1,397 @@
+'''
+Module description:
+    defines a single custom class, LaneSimulator, which runs a whole grid of parameter
+    points of simulation.evo_simulator.EvolutionSimulator together, such as the grids of
+    costs of prosociality and extra reproduction probabilities looped over by the
+    experiment scripts. Each parameter point is a lane: the groups of every lane are
+    held in the same arrays of counts, and each group draws with the probabilities of
+    its own lane, so a round of the whole grid is one pass of numpy operations rather
+    than one simulator instance per point
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from socialunits.vectorized import lifeCycleVectorized, dealCountsToGroups
+from socialunits.enums import ReproductionType, ProsocialityType, Phenotype
+from migration import randomRedistribution, totalIsolation
+from data_vectors import PROPORTIONS, POPULATIONS, GROUPS, STD_DEVIATIONS, prefixParams, roundTitles, columnTitles,\
+    finalizedDataVecs, writeRows, printRows
+import math
+from os.path import join
+import numpy
+
+# parameters that may differ between lanes, with their defaults if neither a lane nor the shared
+# keyword args give them
+LANE_PARAMETERS = {'numGroups': 10, 'targetGroupSize': None, 'costOfProsociality': None,
+                   'extraReproductionProbability': None, 'baseReproductionChances': None,
+                   'baseReproductionProbability': None, 'seedProportionProsocial': None, 'mutationRate': 0}
+
+class LaneSimulator:
+
+    '''
+    Description:
+        runs evolutionary simulations like simulation.evo_simulator.EvolutionSimulator, with the default
+        social game and death and reproduction of socialunits.group.SocialGroup and asexual reproduction, for
+        many parameter points (lanes) at once. The parameters of LANE_PARAMETERS may differ between lanes;
+        all others are shared. Groups are represented only by their counts, as by
+        socialunits.vectorized.lifeCycleVectorized, and the groups of all lanes lie in the same arrays, those
+        of each lane contiguous and in lane order. Every round the per-lane probabilities are broadcast to
+        the groups of their lanes, so that the life cycle of every group of every lane is one set of binomial
+        draws, and random redistribution deals each lane's pooled population into its own groups in one
+        pass (see socialunits.vectorized.dealCountsToGroups). Lanes whose population goes extinct keep
+        recording, as EvolutionSimulator does, but have no groups left to cost anything. Given a
+        populationBudget, a lane whose population exceeds it drops out at the end of the round, its data
+        vectors ending with that round, so that exploding lanes do not slow the rest. Migration functions
+        simulation.migration.randomRedistribution and simulation.migration.totalIsolation are supported,
+        the pooling and dealing they call being done for every lane at once. Each lane writes its own rows
+        of data, laid out by simulation.data_vectors under the lane's parameters
+
+    Non-instance variable parameters:
+    # fileName: name of CSV file to write/append, including extension
+
+    Parameters/instance variables:
+    # laneParameters: list of dictionaries, one per lane, of values of the parameters of LANE_PARAMETERS.
+        Parameters a lane does not give take the value of the shared keyword arg of the same name
+    # migrationFunction: simulation.migration.randomRedistribution or simulation.migration.totalIsolation
+    # prosocialPhenotype, toWriteCSV, toWriteColumnTitles, toPrintDataVecs: as for EvolutionSimulator
+
+    Keyword args/instance variables:
+    # reproduction, typeProsociality, rounds: as for EvolutionSimulator, shared by every lane. reproduction
+        must be asexual
+    # numGroups, targetGroupSize, costOfProsociality, extraReproductionProbability, baseReproductionChances,
+        baseReproductionProbability, seedProportionProsocial, mutationRate: as for EvolutionSimulator, the
+        values of lanes that do not give their own
+    # populationBudget: optional, default None. If not None, lanes whose population exceeds it drop out
+    # recordData: optional, default False, as for EvolutionSimulator
+
+    Other instance variables:
+    # numLanes: number of lanes
+    # laneValues: dictionary from each name of LANE_PARAMETERS to an array of its values per lane
+    # numGroups: integer array of the number of groups of each lane
+    # laneStarts: integer array of the index of the first group of each lane in the arrays of counts
+    # groupLanes: integer array of the lane of each group
+    # prosocialCounts, selfishCounts: integer arrays of counts per group
+    # allIndividuals: integer array of shape (2, numLanes), prosocial and selfish counts of each lane's
+        population while pooled for migration, from which random redistribution deals each lane's groups
+    # populationCount: integer array of the population of each lane
+    # recording: boolean array, whether each lane is still running (has not dropped out)
+    # dropoutRounds: integer array, the round after which each lane dropped out, -1 if it has not
+    # kwargs: reference to shared keyword args
+    # groupCountsVec, populationCountsVec, prosocialProportionsVec, stdDeviationsVec: lists of the data
+        vectors of each lane, as for EvolutionSimulator
+    # prefixParams: list of the prefix parameters of each lane. Initialized only if toWriteCSV or
+        toPrintDataVecs is true
+    # columnTitles, filePath, toUpdateData, currentRound: as for EvolutionSimulator
+
+    Constructor method signature: __init__(self, laneParameters, migrationFunction=randomRedistribution,
+        prosocialPhenotype=Phenotype.altruistic, toWriteCSV=False, fileName=None, toWriteColumnTitles=True,
+        toPrintDataVecs=True, **kwargs)
+
+    Public methods:
+    # runEvolutionarySimulation(self): runs complete evolutionary simulation of every lane
+    # laneResults(self): returns the data vectors of every lane
+    '''
+
+    def __init__(self, laneParameters, migrationFunction=randomRedistribution, prosocialPhenotype=Phenotype.altruistic,
+                 toWriteCSV=False, fileName=None, toWriteColumnTitles=True, toPrintDataVecs=True, **kwargs):
+
+        '''
+        --See class's docstring for description of constructor's parameters--
+
+        Errors:
+        # TypeError: raised if typeProsociality not of type socialunits.enums.ProsocialityType
+        # RuntimeError: raised if migrationFunction is not supported, if reproduction is sexual, if a lane
+            gives a parameter not in LANE_PARAMETERS, or if a lane parameter is given neither by a lane nor
+            by the keyword args
+       '''
+
+        if migrationFunction not in (randomRedistribution, totalIsolation):
+            raise RuntimeError('LaneSimulator supports only randomRedistribution and totalIsolation migration')
+        self.migrationFunction = migrationFunction
+        self.prosocialPhenotype = prosocialPhenotype
+        self.toWriteCSV = toWriteCSV
+        self.toWriteColumnTitles = toWriteColumnTitles
+        self.toPrintDataVecs = toPrintDataVecs
+
+        #keyword args:
+        self.reproduction = kwargs['reproduction']
+        if not self.reproduction == ReproductionType.asexual:
+            raise RuntimeError('LaneSimulator supports only asexual reproduction')
+        self.typeProsociality = kwargs['typeProsociality']
+        if not isinstance(self.typeProsociality, ProsocialityType):
+            raise TypeError('typeProsociality must of type socialunits.enums.ProsocialityType')
+        self.rounds = kwargs['rounds']
+        self.populationBudget = kwargs.get('populationBudget')
+
+        # values of lane parameters per lane
+        self.numLanes = len(laneParameters)
+        self.laneValues = {}
+        for parameters in laneParameters:
+            for name in parameters:
+                if name not in LANE_PARAMETERS:
+                    raise RuntimeError(str(name) + ' cannot differ between lanes; see LANE_PARAMETERS')
+        for name, default in LANE_PARAMETERS.items():
+            values = [parameters.get(name, kwargs.get(name, default)) for parameters in laneParameters]
+            if None in values:
+                raise RuntimeError('no value of ' + name + ' for some lanes')
+            self.laneValues[name] = numpy.array(values)
+
+        #other instance vars:
+        self.kwargs = kwargs
+        self.groupCountsVec = [[] for _ in range(self.numLanes)]
+        self.populationCountsVec = [[] for _ in range(self.numLanes)]
+        self.prosocialProportionsVec = [[] for _ in range(self.numLanes)]
+        self.stdDeviationsVec = [[] for _ in range(self.numLanes)]
+        self.recording = numpy.ones(self.numLanes, dtype=bool)
+        self.dropoutRounds = numpy.full(self.numLanes, -1, dtype=numpy.int64)
+        self.currentRound = 0
+        self.toUpdateData = toWriteCSV or toPrintDataVecs or kwargs.get('recordData', False)
+        if toWriteCSV or self.toPrintDataVecs:
+            self.prefixParams = [prefixParams(self, **dict((name, values[lane]) for name, values in self.laneValues.items()))
+                                 for lane in range(self.numLanes)]
+            self.columnTitles = columnTitles(roundTitles(self.rounds))
+            if toWriteCSV:
+                self.filePath = join('..', '..', 'simulationdata', fileName)
+
+        # initialize pooled populations, as EvolutionSimulator initializes its individuals
+        self.numGroups = self.laneValues['numGroups'].astype(numpy.int64)
+        self.populationCount = self.numGroups * self.laneValues['targetGroupSize'].astype(numpy.int64)
+        countProsocial = numpy.array([int(math.ceil(population * proportion)) for population, proportion in
+                                      zip(self.populationCount, self.laneValues['seedProportionProsocial'])],
+                                     dtype=numpy.int64)
+        self.allIndividuals = numpy.vstack([countProsocial, self.populationCount - countProsocial])
+        self._setGroupLayout()
+        self.prosocialCounts = numpy.zeros(len(self.groupLanes), dtype=numpy.int64)
+        self.selfishCounts = numpy.zeros(len(self.groupLanes), dtype=numpy.int64)
+
+    def _dataVecs(self):
+
+        '''returns list of data vectors of every lane, in final representation if _finalizeDataVecs has been
+        called'''
+
+        dataVecs = []
+        for lane in range(self.numLanes):
+            dataVecs += [self.prosocialProportionsVec[lane], self.populationCountsVec[lane], self.groupCountsVec[lane],
+                         self.stdDeviationsVec[lane]]
+        return dataVecs
+
+    def _finalizeDataVecs(self):
+
+        '''prepends row titles and the prefix parameters of its lane to every data vector'''
+
+        for lane, prefix in enumerate(self.prefixParams):
+            (self.prosocialProportionsVec[lane], self.populationCountsVec[lane], self.groupCountsVec[lane],
+             self.stdDeviationsVec[lane]) = finalizedDataVecs(prefix, [(PROPORTIONS, self.prosocialProportionsVec[lane]),
+                                                                       (POPULATIONS, self.populationCountsVec[lane]),
+                                                                       (GROUPS, self.groupCountsVec[lane]),
+                                                                       (STD_DEVIATIONS, self.stdDeviationsVec[lane])])
+
+    def _writeDataVecs(self):
+
+        '''writes column titles if required, then data vectors, to file'''
+
+        writeRows(self.filePath, ([self.columnTitles] if self.toWriteColumnTitles else []) + self._dataVecs())
+
+    def _setGroupLayout(self):
+
+        '''sets laneStarts and groupLanes from self.numGroups'''
+
+        self.laneStarts = numpy.concatenate([[0], numpy.cumsum(self.numGroups)[:-1]]).astype(numpy.int64)
+        self.groupLanes = numpy.repeat(numpy.arange(self.numLanes), self.numGroups)
+
+    def _updatePopulationData(self):
+
+        '''called each round to append data from round to the data vectors of lanes still recording. The
+        standard deviation of prosocial proportions is over a lane's groups with members, each counted once,
+        and is -1 if the lane's population is extinct'''
+
+        prosocialTotals = numpy.bincount(self.groupLanes, self.prosocialCounts, minlength=self.numLanes)
+        selfishTotals = numpy.bincount(self.groupLanes, self.selfishCounts, minlength=self.numLanes)
+        self.populationCount = (prosocialTotals + selfishTotals).astype(numpy.int64)
+        sizes = self.prosocialCounts + self.selfishCounts
+        hasMembers = sizes > 0
+        lanes = self.groupLanes[hasMembers]
+        proportions = self.prosocialCounts[hasMembers] / sizes[hasMembers].astype(float)
+        occupiedGroups = numpy.bincount(lanes, minlength=self.numLanes).astype(float)
+        meanProportions = numpy.bincount(lanes, proportions, minlength=self.numLanes) / numpy.maximum(occupiedGroups, 1)
+        variances = (numpy.bincount(lanes, (proportions - meanProportions[lanes]) ** 2, minlength=self.numLanes) /
+                     numpy.maximum(occupiedGroups, 1))
+
+        for lane in numpy.flatnonzero(self.recording):
+            if self.populationCount[lane] > 0:
+                self.prosocialProportionsVec[lane].append(prosocialTotals[lane] / float(self.populationCount[lane]))
+                self.stdDeviationsVec[lane].append(math.sqrt(variances[lane]))
+            else:
+                # proportion of -.1 indicates that populationCount is 0, thus entire population is extinct
+                self.prosocialProportionsVec[lane].append(-.1)
+                self.stdDeviationsVec[lane].append(-1)
+            self.populationCountsVec[lane].append(int(self.populationCount[lane]))
+            self.groupCountsVec[lane].append(int(self.numGroups[lane]))
+
+    def _dropLanesOverBudget(self):
+
+        '''drops the lanes whose population exceeds populationBudget, removing their groups'''
+
+        populations = numpy.bincount(self.groupLanes, self.prosocialCounts + self.selfishCounts, minlength=self.numLanes)
+        overBudget = self.recording & (populations > self.populationBudget)
+        if not overBudget.any():
+            return
+        self.recording &= ~overBudget
+        self.dropoutRounds[overBudget] = self.currentRound
+        keep = self.recording[self.groupLanes]
+        self.prosocialCounts, self.selfishCounts = self.prosocialCounts[keep], self.selfishCounts[keep]
+        self.numGroups[overBudget] = 0
+        self._setGroupLayout()
+
+    def _runLifeCycle(self):
+
+        '''runs the social game and death and reproduction in every group of every lane, each with its lane's
+        parameters, writing progeny counts over prosocialCounts and selfishCounts'''
+
+        groupValues = dict((name, values[self.groupLanes]) for name, values in self.laneValues.items()
+                           if name not in ('numGroups', 'targetGroupSize', 'seedProportionProsocial', 'mutationRate'))
+        kwargs = dict(self.kwargs, **groupValues)
+        kwargs.pop('mutationRate', None)
+        self.prosocialCounts, self.selfishCounts = lifeCycleVectorized(self.prosocialCounts, self.selfishCounts,
+                                                                       self.prosocialPhenotype,
+                                                                       self.laneValues['mutationRate'][self.groupLanes],
+                                                                       **kwargs)
+
+    def _mergeGroups(self):
+
+        '''pools the groups of every lane, leaving the prosocial and selfish counts of each lane in
+        self.allIndividuals'''
+
+        self.allIndividuals = numpy.vstack([numpy.bincount(self.groupLanes, self.prosocialCounts, minlength=self.numLanes),
+                                            numpy.bincount(self.groupLanes, self.selfishCounts, minlength=self.numLanes)]
+                                           ).astype(numpy.int64)
+
+    def _resetGroupsBeforeReassignment(self):
+
+        '''sets self.numGroups of every lane for next round, as EvolutionSimulator._resetGroupsBeforeReassignment'''
+
+        self.populationCount = self.allIndividuals.sum(axis=0)
+        targetGroupSizes = self.laneValues['targetGroupSize'].astype(numpy.int64)
+        self.numGroups = numpy.where(self.populationCount > 0, numpy.maximum(self.populationCount // targetGroupSizes, 1), 0)
+        self._setGroupLayout()
+
+    def _assignToGroupsRandomly(self, laneTotals):
+
+        '''randomly deals the pooled population of every lane into the lane's groups, whose sizes differ by at
+        most one'''
+
+        groupSizes, remainders = divmod(laneTotals.sum(axis=0), numpy.maximum(self.numGroups, 1))
+        # the first remainder groups of a lane take one extra member
+        positions = numpy.arange(len(self.groupLanes)) - self.laneStarts[self.groupLanes]
+        sizes = groupSizes[self.groupLanes] + (positions < remainders[self.groupLanes])
+        self.prosocialCounts, self.selfishCounts = dealCountsToGroups(laneTotals, sizes, self.laneStarts)
+
+    def _migrationPhase(self):
+
+        '''wrapper method that simply calls the migration function instance variable'''
+
+        self.migrationFunction(self)
+
+    def laneResults(self):
+
+        '''returns list of dictionaries, one per lane, from names of data vectors ('prosocialProportions',
+        'populationCounts', 'groupCounts', 'stdDeviations') to lists with an entry per round recorded, as by
+        simulation.sweep.runTrial. Call after a run with recordData true and toWriteCSV and toPrintDataVecs
+        false, whose data vectors are not finalized'''
+
+        return [{'prosocialProportions': [float(value) for value in self.prosocialProportionsVec[lane]],
+                 'populationCounts': self.populationCountsVec[lane],
+                 'groupCounts': self.groupCountsVec[lane],
+                 'stdDeviations': [float(value) for value in self.stdDeviationsVec[lane]]}
+                for lane in range(self.numLanes)]
+
+    def runEvolutionarySimulation(self):
+
+        '''
+        Description: runs complete evolutionary simulation of every lane. The population of every lane is dealt
+            randomly into its groups, then for each of self.rounds rounds every group of every lane plays the
+            social game and undergoes death and reproduction, followed by the migration phase and the dropping
+            of lanes over budget
+        '''
+
+        self._assignToGroupsRandomly(self.allIndividuals)
+        if self.toUpdateData:
+            self._updatePopulationData()
+
+        for self.currentRound in range(1, self.rounds + 1):
+            self._runLifeCycle()
+            self._migrationPhase()
+            if self.toUpdateData:
+                self._updatePopulationData()
+            if self.populationBudget is not None:
+                self._dropLanesOverBudget()
+
+        if self.toWriteCSV or self.toPrintDataVecs:
+            self._finalizeDataVecs()
+            if self.toPrintDataVecs:
+                printRows([self.columnTitles] + self._dataVecs())
+            if self.toWriteCSV:
+                self._writeDataVecs()
+
+if __name__ == '__main__':
+
+    '''checks the mean prosocial proportion of a few lanes against that of EvolutionSimulator, then times the
+    grid of experiment 6 (21 costs of prosociality by 9 extra reproduction probabilities) as lanes and as an
+    EvolutionSimulator per point, as run by the experiment script, with the same population budget: a
+    simulator stops after the first round its population exceeds it'''
+
+    from evo_simulator import EvolutionSimulator
+    from sweep import gridPoints
+    from time import time
+
+    shared = dict(rounds=5, targetGroupSize=10, seedProportionProsocial=.5, reproduction=ReproductionType.asexual,
+                  baseReproductionChances=1, baseReproductionProbability=.9, typeProsociality=ProsocialityType.strong,
+                  numGroups=20, mutationRate=.01, toPrintDataVecs=False, recordData=True)
+    lanes = [dict(costOfProsociality=.02, extraReproductionProbability=.3),
+             dict(costOfProsociality=.1, extraReproductionProbability=.05, targetGroupSize=6)]
+    trials = 300
+    laneProportions = []
+    for _ in range(trials):
+        simulator = LaneSimulator(lanes, **shared)
+        simulator.runEvolutionarySimulation()
+        laneProportions.append([vec[-1] for vec in simulator.prosocialProportionsVec])
+    laneProportions = numpy.array(laneProportions)
+    for lane, parameters in enumerate(lanes):
+        proportions = []
+        for _ in range(trials):
+            simulator = EvolutionSimulator(threaded=False, **dict(shared, **parameters))
+            simulator.runEvolutionarySimulation()
+            proportions.append(simulator.prosocialProportionsVec[-1])
+        proportions = numpy.array(proportions)
+        zScore = ((laneProportions[:, lane].mean() - proportions.mean()) /
+                  math.sqrt((laneProportions[:, lane].var() + proportions.var()) / trials))
+        print('lane ' + str(lane) + ': mean final proportion ' + str(round(laneProportions[:, lane].mean(), 4)) +
+              ' vs ' + str(round(proportions.mean(), 4)) + ', z = ' + str(round(zScore, 2)))
+
+    experiment6 = dict(migrationFunction=randomRedistribution, prosocialPhenotype=Phenotype.reciprocating, rounds=30,
+                       targetGroupSize=10, seedProportionProsocial=.53, reproduction=ReproductionType.asexual,
+                       baseReproductionChances=1, baseReproductionProbability=1.0, mutationRate=0.0,
+                       typeProsociality=ProsocialityType.strong, toPrintDataVecs=False, recordData=True)
+    populationBudget = 10 ** 4
+    grid = gridPoints({}, [('costOfProsociality', [prob / 100.0 for prob in range(0, 21)]),
+                           ('extraReproductionProbability', [prob / 20.0 for prob in range(0, 9)])])
+    startTime = time()
+    simulator = LaneSimulator(grid, populationBudget=populationBudget, **experiment6)
+    simulator.runEvolutionarySimulation()
+    print(str(len(grid)) + ' lanes: ' + str(round(time() - startTime, 3)) + ' seconds, ' +
+          str((simulator.dropoutRounds >= 0).sum()) + ' lanes over budget')
+    startTime = time()
+    overBudget = 0
+    for point in grid:
+        sequential = EvolutionSimulator(threaded=False, **dict(experiment6, **point))
+        for snapshot in sequential.iterRounds():
+            if snapshot.prosocialCounts.sum() + snapshot.selfishCounts.sum() > populationBudget:
+                overBudget += 1
+                break
+    print(str(len(grid)) + ' EvolutionSimulators: ' + str(round(time() - startTime, 3)) + ' seconds, ' +
+          str(overBudget) + ' over budget')
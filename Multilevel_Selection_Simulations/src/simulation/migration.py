@@ -13,7 +13,11 @@ Course: COSI 210a, Independent study with Professor Jordan Pollack
 '''
 
 from enum import Enum
-from random import shuffle
+from itertools import chain
+from socialunits.group import SocialGroup
+from socialunits import streams
+import math
+import numpy
 
 class MigrationType(Enum):
     
@@ -24,12 +28,21 @@ class MigrationType(Enum):
     to groups such that groups tend to have a preponderance either of prosocial individuals, or a preponderance
     of selfish individuals. With totalIsolation, individuals never migrate from the group in which they are
     initially assigned or born into. The total isolation condition serves as a control to test the effect
-    that migration has on the outcome of an evolutionary simulation.
+    that migration has on the outcome of an evolutionary simulation. With neighbourMigration, groups sit on
+    a 2-D lattice (or a user-supplied sparse graph) and each individual moves to a neighbouring group with
+    probability equal to the simulator's migration rate, so that groups are never rebuilt. With partialMigration,
+    each individual leaves its group with probability equal to the migration rate, and the pooled migrants
+    are randomly dealt back into the vacated places. With fissionFusion, groups persist across rounds,
+    splitting in two when they grow beyond a size threshold and merging when they shrink below another,
+    optionally with a full random redistribution (dispersal) every so many rounds, as in the haystack model.
     '''
     
     totalRandomRedistribution = 0
     phenotypeStratified = 1
     totalIsolation = 2
+    neighbourMigration = 3
+    partialMigration = 4
+    fissionFusion = 5
     
 def randomRedistribution(self):
     
@@ -51,7 +64,7 @@ def biasedRedistribution(self):
         that has a high proportion of individuals of that individual's phenotype'''
         
         # shuffles population of all individuals to randomize order
-        shuffle(individuals)
+        streams.shuffle(individuals)
        
         '''assign individuals to groups. Basic idea is to cycle through groups two at a time, while
         also popping two individuals at a time from list. If one individual is prosocial while
@@ -100,7 +113,11 @@ def biasedRedistribution(self):
         
     self._mergeGroups()
     self._resetGroupsBeforeReassignment()
-    _assignToGroupsBiased(self.allIndividuals)
+    # simulators that represent groups by counts provide their own count-based assignment
+    if hasattr(self, '_assignToGroupsBiased'):
+        self._assignToGroupsBiased(self.allIndividuals)
+    else:
+        _assignToGroupsBiased(self.allIndividuals)
     
 def totalIsolation(self):
     
@@ -108,6 +125,138 @@ def totalIsolation(self):
     
     pass
 
+def neighbourMigration(self):
+    
+    '''executes phase of migration such that each individual leaves its group with probability 
+    self.migrationRate for a neighbouring group. Neighbours are given by self.groupTopology, a list 
+    of neighbour index lists (one per group), or else by a 2-D toroidal lattice over the groups. The
+    number of emigrants per group is a binomial draw, which is then split among the group's edges
+    by a sequence of conditional binomial draws, one per edge. Only emigrants are touched, so the
+    cost scales with the number of migrants and the number of edges rather than the population'''
+    
+    if self.numGroups < 2 or self.migrationRate <= 0:
+        return
+    if self.groupAdjacency is None:
+        self.groupAdjacency = (_adjacencyFromNeighbourLists(self.groupTopology) if self.groupTopology is not None
+                               else _latticeAdjacency(self.numGroups))
+    indptr, indices = self.groupAdjacency
+    degrees = numpy.diff(indptr)
+    
+    groupSizes = numpy.fromiter((group.size() for group in self.groups), dtype=numpy.int64, count=self.numGroups)
+    emigrants = numpy.random.binomial(groupSizes, self.migrationRate)
+    emigrants[degrees == 0] = 0
+    
+    # split each group's emigrants among its edges: edge k of a group of degree d receives a binomial
+    # draw from the emigrants not yet placed, with probability 1/(d-k)
+    edgeFlows = numpy.zeros(len(indices), dtype=numpy.int64)
+    remaining = emigrants.copy()
+    for k in range(degrees.max()):
+        hasEdge = numpy.nonzero(degrees > k)[0]
+        edges = indptr[hasEdge] + k
+        flows = numpy.random.binomial(remaining[hasEdge], 1.0 / (degrees[hasEdge] - k))
+        edgeFlows[edges] = flows
+        remaining[hasEdge] -= flows
+    
+    '''remove all emigrants before placing any, so that an individual migrates at most once per round'''
+    activeEdges = numpy.nonzero(edgeFlows)[0]
+    sources = numpy.searchsorted(indptr, activeEdges, side='right') - 1
+    movers = [self.groups[source].removeRandomMembers(edgeFlows[edge]) for source, edge in zip(sources, activeEdges)]
+    for edge, individuals in zip(activeEdges, movers):
+        self.groups[indices[edge]].addMembers(individuals)
+
+def partialMigration(self):
+    
+    '''executes phase of migration such that each individual leaves its group with probability 
+    self.migrationRate. Emigrants are pooled, shuffled, and dealt back into the places they vacated,
+    so group sizes are unchanged. Only emigrants are extracted, so the cost scales with the number
+    of migrants rather than the population. A migration rate of 1 amounts to random redistribution
+    without resizing groups'''
+    
+    if self.numGroups < 2 or self.migrationRate <= 0:
+        return
+    groupSizes = numpy.fromiter((group.size() for group in self.groups), dtype=numpy.int64, count=self.numGroups)
+    emigrants = numpy.random.binomial(groupSizes, self.migrationRate)
+    departingGroups = numpy.nonzero(emigrants)[0]
+    pool = list(chain(*[self.groups[groupIndex].removeRandomMembers(emigrants[groupIndex]) 
+                        for groupIndex in departingGroups]))
+    streams.shuffle(pool)
+    for groupIndex in departingGroups:
+        for _ in range(emigrants[groupIndex]):
+            self.groups[groupIndex].addMember(pool.pop())
+
+def fissionFusion(self):
+    
+    '''executes a phase of group fission and fusion in place of migration. Every self.dispersalInterval 
+    rounds (if not None), the population instead disperses by random redistribution. Otherwise, each group 
+    larger than self.fissionSize splits into two random halves (repeatedly if need be), and groups smaller 
+    than self.fusionSize merge pairwise in random order, a leftover small group merging into a random other 
+    group. Extinct groups are dropped. Groups are added and removed one at a time and self.numGroups 
+    is updated incrementally, so the groups that neither split nor merge are left untouched'''
+    
+    if self.dispersalInterval and self.currentRound % self.dispersalInterval == 0:
+        randomRedistribution(self)
+        return
+    
+    # fission. Daughter groups are appended, and so are themselves checked later in the loop
+    groupIndex = 0
+    while groupIndex < len(self.groups):
+        group = self.groups[groupIndex]
+        while group.size() > self.fissionSize:
+            daughter = SocialGroup(self.reproduction)
+            daughter.addMembers(group.removeRandomMembers(group.size() // 2))
+            self.groups.append(daughter)
+            self.numGroups += 1
+        groupIndex += 1
+    
+    # fusion
+    smallGroupIndices = [groupIndex for groupIndex, group in enumerate(self.groups) if group.size() < self.fusionSize]
+    toRemove = [groupIndex for groupIndex in smallGroupIndices if self.groups[groupIndex].size() == 0]
+    survivingSmall = [groupIndex for groupIndex in smallGroupIndices if self.groups[groupIndex].size() > 0]
+    streams.shuffle(survivingSmall)
+    for pairIndex in range(0, len(survivingSmall) - 1, 2):
+        self.groups[survivingSmall[pairIndex]].addMembers(self.groups[survivingSmall[pairIndex + 1]].members)
+        toRemove.append(survivingSmall[pairIndex + 1])
+    if len(survivingSmall) % 2 == 1 and len(self.groups) - len(toRemove) > 1:
+        leftoverIndex = survivingSmall[-1]
+        targetIndex = leftoverIndex
+        # a set, since the membership test is repeated until a target is found
+        removed = set(toRemove)
+        while targetIndex == leftoverIndex or targetIndex in removed:
+            targetIndex = streams.randint(0, len(self.groups) - 1)
+        self.groups[targetIndex].addMembers(self.groups[leftoverIndex].members)
+        toRemove.append(leftoverIndex)
+    
+    '''remove groups in descending index order by swapping each with the last group and popping, so that 
+    no removal disturbs the index of a group yet to be removed'''
+    for groupIndex in sorted(toRemove, reverse=True):
+        self.groups[groupIndex] = self.groups[-1]
+        self.groups.pop()
+        self.numGroups -= 1
+
+def _latticeAdjacency(numGroups):
+    
+    '''returns (indptr, indices) adjacency arrays in compressed sparse row form for numGroups groups 
+    laid out on a toroidal lattice with von Neumann neighbourhoods. The lattice has as many rows as
+    the largest divisor of numGroups not exceeding its square root, so that a prime number of groups
+    yields a ring'''
+    
+    rows = max(divisor for divisor in range(1, int(math.sqrt(numGroups)) + 1) if numGroups % divisor == 0)
+    grid = numpy.arange(numGroups).reshape(rows, numGroups // rows)
+    neighbours = numpy.stack([numpy.roll(grid, 1, axis=0), numpy.roll(grid, -1, axis=0),
+                              numpy.roll(grid, 1, axis=1), numpy.roll(grid, -1, axis=1)], axis=-1)
+    return _adjacencyFromNeighbourLists(neighbours.reshape(numGroups, 4).tolist())
+
+def _adjacencyFromNeighbourLists(neighbourLists):
+    
+    '''converts a list of neighbour index lists into (indptr, indices) arrays in compressed sparse row
+    form, dropping self-loops and duplicate edges (which arise on lattices with fewer than 3 rows or columns)'''
+    
+    cleaned = [sorted(set(neighbours) - {groupIndex}) for groupIndex, neighbours in enumerate(neighbourLists)]
+    indptr = numpy.zeros(len(cleaned) + 1, dtype=numpy.int64)
+    indptr[1:] = numpy.cumsum([len(neighbours) for neighbours in cleaned])
+    indices = numpy.fromiter(chain(*cleaned), dtype=numpy.int64, count=indptr[-1])
+    return indptr, indices
+
 def getMigrationFunctionKey(migrationFunction):
     
     '''returns numeric key associated with migration function'''
@@ -118,6 +267,12 @@ def getMigrationFunctionKey(migrationFunction):
         return 1
     elif migrationFunction == totalIsolation:
         return 2
+    elif migrationFunction == neighbourMigration:
+        return 3
+    elif migrationFunction == partialMigration:
+        return 4
+    elif migrationFunction == fissionFusion:
+        return 5
     else:
         raise RuntimeError("migration function not found among options implemented")
          
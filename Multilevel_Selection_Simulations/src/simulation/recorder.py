@@ -0,0 +1,165 @@
+'''
+Module description:
+    defines a single custom class, TrajectoryRecorder, which records the full per-group
+    history of a simulation (e.g. counts of prosocial and selfish individuals in every
+    group, every round) to memory-mapped files on disk. The data vectors of
+    simulation.evo_simulator.EvolutionSimulator keep only population-level aggregates,
+    whereas analyses of between-group vs. within-group selection need every group's
+    composition
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+import numpy
+from os.path import exists
+
+class TrajectoryRecorder:
+
+    '''
+    Description: appends one block of per-group counts per round to a preallocated memory-mapped file.
+        Since the number of groups changes from round to round, blocks are stored back to back in a single
+        counts array of shape (rows, numColumns), one row per group, and a second memory-mapped array of
+        offsets marks where each round's block begins. Both files grow in chunks (doubling in capacity)
+        when full, so recording a round is a slice assignment with no Python lists built. Reading a round
+        returns a view of the memory map rather than a copy.
+
+        File layout: filePath holds the counts as raw int64 values, row-major. filePath + '.offsets' holds
+        int64 values: numColumns, number of rounds recorded, then the starting row of every round followed
+        by the total number of rows
+
+    Instance variables:
+    # filePath: path of counts file
+    # numColumns: number of counts per group (2 for prosocial and selfish counts)
+    # numRounds: number of rounds recorded
+    # counts: numpy.memmap of shape (capacity, numColumns)
+    # header: numpy.memmap of int64 values, laid out as in the offsets file
+
+    Constructor method signature: __init__(self, filePath, numColumns=2, initialRows=4096, initialRounds=256,
+        readOnly=False)
+
+    Public methods:
+    # record(*columns): appends a round, given one array of counts per column, each with one entry per group
+    # roundCounts(roundIndex): returns view of shape (number of groups, numColumns) of counts for a round
+    # offsets(): returns view of starting rows of every round, followed by the total number of rows
+    # flush(): writes pending changes to disk
+    # close(): flushes, trims files to the recorded data, and releases memory maps
+    '''
+
+    def __init__(self, filePath, numColumns=2, initialRows=4096, initialRounds=256, readOnly=False):
+
+        '''
+        Parameters:
+        # filePath: path of counts file. Overwritten unless readOnly is true
+        # numColumns: number of counts per group. Ignored if readOnly is true
+        # initialRows, initialRounds: initial capacity of files, in groups and in rounds
+        # readOnly: if true, opens an existing recording for reading
+
+        Errors:
+        # IOError: raised if readOnly is true and the recording does not exist
+        '''
+
+        self.filePath = filePath
+        self.readOnly = readOnly
+        if readOnly:
+            if not exists(filePath + '.offsets'):
+                raise IOError('no trajectory recorded at ' + filePath)
+            self.header = numpy.memmap(filePath + '.offsets', dtype=numpy.int64, mode='r')
+            self.numColumns = int(self.header[0])
+            self.numRounds = int(self.header[1])
+            totalRows = int(self.header[2 + self.numRounds])
+            self.counts = (numpy.memmap(filePath, dtype=numpy.int64, mode='r', shape=(totalRows, self.numColumns))
+                           if totalRows > 0 else numpy.zeros((0, self.numColumns), dtype=numpy.int64))
+        else:
+            self.numColumns = numColumns
+            self.numRounds = 0
+            self.counts = self._mapFile(filePath, (initialRows, numColumns), create=True)
+            self.header = self._mapFile(filePath + '.offsets', (initialRounds + 3,), create=True)
+            self.header[0] = numColumns
+
+    def _mapFile(self, path, shape, create=False):
+
+        '''sizes file at path to hold an int64 array of given shape, then returns a read-write memory map of it'''
+
+        with open(path, 'wb' if create else 'r+b') as fileHandle:
+            fileHandle.truncate(int(numpy.prod(shape)) * 8)
+        return numpy.memmap(path, dtype=numpy.int64, mode='r+', shape=shape)
+
+    def record(self, *columns):
+
+        '''
+        Description: appends one round of counts
+
+        Parameters:
+        # *columns: numColumns integer arrays of equal length, one entry per group
+
+        Errors:
+        # RuntimeError: raised if recorder is read-only or number of columns is wrong
+        '''
+
+        if self.readOnly:
+            raise RuntimeError('cannot record to a read-only trajectory')
+        if len(columns) != self.numColumns:
+            raise RuntimeError('expected ' + str(self.numColumns) + ' columns of counts')
+        start = int(self.header[2 + self.numRounds])
+        end = start + len(columns[0])
+        if end > len(self.counts):
+            self.counts.flush()
+            self.counts = self._mapFile(self.filePath, (max(end, 2 * len(self.counts)), self.numColumns))
+        if 3 + self.numRounds >= len(self.header):
+            self.header.flush()
+            self.header = self._mapFile(self.filePath + '.offsets', (2 * len(self.header),))
+        for columnIndex, column in enumerate(columns):
+            self.counts[start:end, columnIndex] = column
+        self.numRounds += 1
+        self.header[1] = self.numRounds
+        self.header[2 + self.numRounds] = end
+
+    def roundCounts(self, roundIndex):
+
+        '''returns view of shape (number of groups, numColumns) of counts for round roundIndex, where round 0
+        is the first round recorded'''
+
+        offsets = self.offsets()
+        return self.counts[offsets[roundIndex]:offsets[roundIndex + 1]]
+
+    def offsets(self):
+
+        '''returns view of starting rows of every round, followed by the total number of rows'''
+
+        return self.header[2:3 + self.numRounds]
+
+    def flush(self):
+
+        '''writes pending changes to disk'''
+
+        if not self.readOnly:
+            self.counts.flush()
+            self.header.flush()
+
+    def close(self):
+
+        '''flushes, trims files to the recorded data, and releases memory maps'''
+
+        if not self.readOnly:
+            self.flush()
+            totalRows = int(self.header[2 + self.numRounds])
+            self.counts = None
+            self.header = None
+            with open(self.filePath, 'r+b') as fileHandle:
+                fileHandle.truncate(totalRows * self.numColumns * 8)
+            with open(self.filePath + '.offsets', 'r+b') as fileHandle:
+                fileHandle.truncate((3 + self.numRounds) * 8)
+        else:
+            self.counts = None
+            self.header = None
+
+def loadTrajectory(filePath):
+
+    '''returns a read-only TrajectoryRecorder for the recording at filePath'''
+
+    return TrajectoryRecorder(filePath, readOnly=True)
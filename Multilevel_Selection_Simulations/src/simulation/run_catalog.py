@@ -0,0 +1,608 @@
+'''
+Module description:
+    defines a catalog of simulation runs in a local SQLite database, so that runs can be found
+    and summarized by their parameters without reading the CSV files of every experiment. Each
+    run is a row with a column per main parameter (each indexed), its experiment, seed, code
+    version, engine, host, runtime and status, summary outcomes, and a pointer to its bulk data
+    (a trajectory file of simulation.recorder.TrajectoryRecorder, or a result in the database of
+    a simulation.job_queue.JobQueue, or a trial of a CSV file of simulation.evo_simulator.
+    EvolutionSimulator). Any number of processes may write to the catalog at once
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from sweep import encodeParameters, decodeParameters, parameterKey, runTrial
+from common_random_numbers import survivingFinalProportion
+from data_vectors import PROPORTIONS, POPULATIONS, parametersFromPrefix, readFinalValues
+from socialunits.enums import ReproductionType
+from socket import gethostname
+from os.path import dirname, abspath, join
+from time import time
+import hashlib, json, math, numbers, sqlite3, subprocess, traceback
+
+# parameters given columns of their own, each indexed, with their SQL types. Other parameters are only kept
+# in the JSON text of the parameters column
+PARAMETER_COLUMNS = [('numGroups', 'INTEGER'), ('targetGroupSize', 'INTEGER'), ('rounds', 'INTEGER'),
+                     ('costOfProsociality', 'REAL'), ('extraReproductionProbability', 'REAL'),
+                     ('baseReproductionChances', 'INTEGER'), ('baseReproductionProbability', 'REAL'),
+                     ('seedProportionProsocial', 'REAL'), ('mutationRate', 'REAL'), ('migrationRate', 'REAL'),
+                     ('generationsPerMigration', 'INTEGER'), ('migrationFunction', 'TEXT'), ('reproduction', 'TEXT'),
+                     ('typeProsociality', 'TEXT')]
+
+# further columns of a run, with their SQL types
+RUN_COLUMNS = [('key', 'TEXT'), ('point', 'TEXT'), ('replicate', 'INTEGER'), ('experiment', 'TEXT'), ('seed', 'INTEGER'),
+               ('parameters', 'TEXT'), ('codeVersion', 'TEXT'), ('engine', 'TEXT'), ('host', 'TEXT'),
+               ('started', 'REAL'), ('runtime', 'REAL'), ('status', 'TEXT'), ('error', 'TEXT'),
+               ('finalProportion', 'REAL'), ('finalPopulation', 'INTEGER'), ('trajectory', 'TEXT')]
+
+COLUMNS = [name for name, _ in PARAMETER_COLUMNS + RUN_COLUMNS]
+
+# columns indexed besides the parameter columns
+INDEXED_RUN_COLUMNS = ['key', 'experiment', 'seed', 'codeVersion', 'engine', 'status']
+
+# columns shared by every run of a point, which is identified by the parameters of its runs (save seeds), their
+# experiment, engine and code version
+POINT_COLUMNS = [name for name, _ in PARAMETER_COLUMNS] + ['experiment', 'engine', 'codeVersion']
+
+# columns summarized over the finished runs of every point, and the suffixes of the columns of their summaries
+SUMMARIZED_COLUMNS = ['finalProportion', 'finalPopulation', 'runtime']
+SUMMARIES = ['Count', 'Sum', 'Squares', 'Minimum', 'Maximum']
+
+# catalog of the experiment scripts, beside the CSV files EvolutionSimulator writes
+CATALOG_PATH = join('..', '..', 'simulationdata', 'catalog.sqlite')
+
+_codeVersion = None
+
+# catalogs opened by runCataloged in this process, by path, so that the schema is set up once per process
+_catalogs = {}
+
+def codeVersion():
+
+    '''returns the git commit of the code, suffixed by -modified if the working tree has uncommitted changes,
+    or 'unknown' outside a git repository. Computed once per process'''
+
+    global _codeVersion
+    if _codeVersion is None:
+        directory = dirname(abspath(__file__))
+        try:
+            commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=directory,
+                                             stderr=subprocess.STDOUT).strip().decode('utf-8')
+            modified = subprocess.call(['git', 'diff', '--quiet', 'HEAD'], cwd=directory) != 0
+            _codeVersion = commit + ('-modified' if modified else '')
+        except (OSError, subprocess.CalledProcessError):
+            _codeVersion = 'unknown'
+    return _codeVersion
+
+def engineName(parameters):
+
+    '''returns the name of the engine simulation.evo_simulator.EvolutionSimulator runs a parameter point on:
+    'individuals', 'arrays' (group counts, see socialunits.vectorized), or 'normal' (arrays with the normal
+    approximation)'''
+
+    encoded = encodeParameters(decodeParameters(parameters))
+    if encoded.get('normalApproximationThreshold') is not None:
+        return 'normal'
+    if (encoded.get('generationsPerMigration', 1) > 1 or encoded.get('reproduction') == ReproductionType.sexual.name
+            or encoded.get('payoffKernel') is not None):
+        return 'arrays'
+    return 'individuals'
+
+def _encodeValue(name, value):
+
+    '''returns a value of a column as stored: enums and migration functions are replaced by their names'''
+
+    return value if isinstance(value, basestring) else encodeParameters({name: value})[name]
+
+def _finalProportion(result):
+
+    '''returns the final prosocial proportion of a result as stored: None if the population went extinct, so
+    that the -.1 recorded upon extinction is left out of summaries'''
+
+    proportion = survivingFinalProportion(result)
+    return None if math.isnan(proportion) else proportion
+
+class RunCatalog:
+
+    '''
+    Description: SQLite catalog of simulation runs. As with simulation.job_queue.JobQueue, every method opens
+        its own short transaction, so instances may be used from any number of processes at once. The
+        database is in write-ahead-log mode, in which readers do not wait for writers; since that mode needs
+        shared memory, the database must be on a local filesystem. Runs are in one of three states:
+        running (begun and not yet finished), done, or failed. Runs whose population went extinct have no
+        final proportion. Queries select runs by conditions on columns,
+        given as keyword arguments:
+        # name=value: the column equals value (enums and migration functions may be given as themselves or by
+            name; None selects runs without a value)
+        # name=(low, high): the column is between low and high inclusive
+        # name=[values]: the column equals one of values
+
+    Parameters/instance variables:
+    # path: path of database file, created if missing
+
+    Constructor method signature: __init__(self, path)
+
+    Public methods:
+    # begin(parameters, replicate=0, experiment=None, engine=None, trajectory=None): records a running run.
+        Returns its id
+    # finish(runId, result, runtime): records the result of a run begun by begin
+    # fail(runId, error, runtime=None): records the error of a run begun by begin
+    # record(parameters, result=None, **kwargs): records a finished run. Returns its id
+    # recordMany(runs): records finished runs in a single transaction. Returns number recorded
+    # importQueue(queuePath, experiment=None): records the results of a job queue not recorded already
+    # importSweep(csvPath, experiment=None): records the trials of a CSV file not recorded already
+    # query(columns=None, orderBy='id', limit=None, **conditions): returns list of dictionaries of runs
+    # count(**conditions): returns number of runs
+    # aggregate(column='finalProportion', groupBy=(), **conditions): returns summaries of a column per group
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        connection = self._connect()
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, ' +
+                               ', '.join(name + ' ' + sqlType for name, sqlType in PARAMETER_COLUMNS + RUN_COLUMNS) + ')')
+            for name in [name for name, _ in PARAMETER_COLUMNS] + INDEXED_RUN_COLUMNS:
+                connection.execute('CREATE INDEX IF NOT EXISTS runsBy' + name[0].upper() + name[1:] +
+                                   ' ON runs (' + name + ')')
+            types = dict(PARAMETER_COLUMNS + RUN_COLUMNS)
+            connection.execute('CREATE TABLE IF NOT EXISTS points (point TEXT PRIMARY KEY, ' +
+                               ''.join(name + ' ' + types[name] + ', ' for name in POINT_COLUMNS) +
+                               'recorded INTEGER, runs INTEGER, ' +
+                               ', '.join(name + 'Count INTEGER, ' + name + 'Sum REAL, ' + name + 'Squares REAL, ' +
+                                         name + 'Minimum REAL, ' + name + 'Maximum REAL' for name in SUMMARIZED_COLUMNS) + ')')
+            # triggers count every run in its point as it is recorded, and add it to the summaries of its point
+            # once done, within the same transaction, so that counts and aggregations read one row per point
+            # rather than one per run
+            addPoint = ('INSERT OR IGNORE INTO points (point, ' + ''.join(name + ', ' for name in POINT_COLUMNS) +
+                        'recorded, runs, ' + ', '.join(name + suffix for name in SUMMARIZED_COLUMNS for suffix in SUMMARIES) +
+                        ') VALUES (NEW.point, ' + ''.join('NEW.' + name + ', ' for name in POINT_COLUMNS) + '0, 0' +
+                        ', 0, 0, 0, NULL, NULL' * len(SUMMARIZED_COLUMNS) + '); ')
+            connection.execute('''CREATE TRIGGER IF NOT EXISTS countRecordedRun AFTER INSERT ON runs BEGIN ''' + addPoint +
+                               'UPDATE points SET recorded = recorded + 1 WHERE point = NEW.point; END')
+            summarize = (addPoint + 'UPDATE points SET runs = runs + 1, ' +
+                         ', '.join('{0}Count = {0}Count + (NEW.{0} IS NOT NULL), {0}Sum = {0}Sum + COALESCE(NEW.{0}, 0), '
+                                   '{0}Squares = {0}Squares + COALESCE(NEW.{0} * NEW.{0}, 0), '
+                                   '{0}Minimum = COALESCE(MIN({0}Minimum, NEW.{0}), {0}Minimum, NEW.{0}), '
+                                   '{0}Maximum = COALESCE(MAX({0}Maximum, NEW.{0}), {0}Maximum, NEW.{0})'.format(name)
+                                   for name in SUMMARIZED_COLUMNS) + ' WHERE point = NEW.point; END')
+            connection.execute('''CREATE TRIGGER IF NOT EXISTS summarizeRecordedRun AFTER INSERT ON runs
+                                  WHEN NEW.status = 'done' BEGIN ''' + summarize)
+            connection.execute('''CREATE TRIGGER IF NOT EXISTS summarizeFinishedRun AFTER UPDATE OF status ON runs
+                                  WHEN NEW.status = 'done' AND OLD.status <> 'done' BEGIN ''' + summarize)
+        finally:
+            connection.close()
+
+    def _connect(self):
+
+        '''returns a new connection in autocommit mode, which waits for locks held by other processes'''
+
+        return sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+
+    def _row(self, parameters, replicate=0, experiment=None, engine=None, trajectory=None, result=None,
+             runtime=None, status='done', error=None, started=None, host=None):
+
+        '''returns the values of the columns of a run, in the order of COLUMNS'''
+
+        parameters = decodeParameters(parameters)
+        encoded = encodeParameters(parameters)
+        engine = engine if engine is not None else engineName(parameters)
+        unseeded = dict((name, value) for name, value in encoded.items() if name != 'seed')
+        point = json.dumps([unseeded, experiment, engine, codeVersion()], sort_keys=True)
+        values = {'key': parameterKey(parameters, replicate), 'point': hashlib.sha1(point.encode('utf-8')).hexdigest(),
+                  'replicate': replicate, 'experiment': experiment, 'seed': encoded.get('seed'),
+                  'parameters': json.dumps(encoded, sort_keys=True), 'codeVersion': codeVersion(), 'engine': engine,
+                  'host': host if host is not None else gethostname(),
+                  'started': started if started is not None else time(), 'runtime': runtime, 'status': status,
+                  'error': error, 'trajectory': trajectory}
+        for name, _ in PARAMETER_COLUMNS:
+            value = encoded.get(name)
+            # values that are not scalars (e.g. per-group mutation rates) are left to the parameters column
+            values[name] = value if isinstance(value, (numbers.Number, basestring)) else None
+        if result is not None:
+            values['finalProportion'] = _finalProportion(result)
+            values['finalPopulation'] = result['populationCounts'][-1]
+        return [values.get(name) for name in COLUMNS]
+
+    def _insert(self, rows):
+
+        '''inserts rows of column values in a single transaction, and returns the id of the last'''
+
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            cursor = connection.executemany('INSERT INTO runs (' + ', '.join(COLUMNS) + ') VALUES (' +
+                                            ', '.join('?' * len(COLUMNS)) + ')', rows)
+            lastId = connection.execute('SELECT last_insert_rowid()').fetchone()[0]
+            connection.execute('COMMIT')
+            return lastId
+        finally:
+            connection.close()
+
+    def _update(self, runId, assignments):
+
+        '''sets columns of a run from a dictionary of column values'''
+
+        connection = self._connect()
+        try:
+            connection.execute('UPDATE runs SET ' + ', '.join(name + ' = ?' for name in assignments) + ' WHERE id = ?',
+                               list(assignments.values()) + [runId])
+        finally:
+            connection.close()
+
+    def begin(self, parameters, replicate=0, experiment=None, engine=None, trajectory=None):
+
+        '''
+        Description: records a run that has started
+
+        Parameters:
+        # parameters: parameter point of the run, encoded or not (an entry 'seed' is recorded as its seed)
+        # replicate: replicate of the point
+        # experiment: name of the experiment the run belongs to
+        # engine: name of the engine that runs it, by default that given by engineName
+        # trajectory: pointer to its bulk data, e.g. the path of its trajectory file
+
+        Returns: id of the run
+        '''
+
+        return self._insert([self._row(parameters, replicate, experiment, engine, trajectory, status='running')])
+
+    def finish(self, runId, result, runtime):
+
+        '''records the result (dictionary of data vectors, as returned by simulation.sweep.runTrial) and runtime
+        in seconds of a run begun by begin, and marks it done'''
+
+        self._update(runId, {'status': 'done', 'runtime': runtime, 'finalProportion': _finalProportion(result),
+                             'finalPopulation': result['populationCounts'][-1]})
+
+    def fail(self, runId, error, runtime=None):
+
+        '''records the error (e.g. a traceback) of a run begun by begin, and marks it failed'''
+
+        self._update(runId, {'status': 'failed', 'error': error, 'runtime': runtime})
+
+    def record(self, parameters, result=None, **kwargs):
+
+        '''
+        Description: records a run that has finished
+
+        Parameters:
+        # parameters: parameter point of the run, encoded or not
+        # result: dictionary of data vectors of the run, as returned by simulation.sweep.runTrial
+
+        Keyword args:
+        # replicate, experiment, engine, trajectory: as for begin
+        # runtime: seconds taken by the run
+        # status: 'done' by default, or 'failed'
+        # error: error of a failed run
+        # started: time the run started, by default the current time
+        # host: host that ran it, by default this host
+
+        Returns: id of the run
+        '''
+
+        return self._insert([self._row(parameters, result=result, **kwargs)])
+
+    def recordMany(self, runs):
+
+        '''
+        Description: records finished runs in a single transaction, which is much faster than recording them
+            one at a time
+
+        Parameters:
+        # runs: list of dictionaries of the arguments of record for each run
+
+        Returns: number of runs recorded
+        '''
+
+        rows = [self._row(**run) for run in runs]
+        if rows:
+            self._insert(rows)
+        return len(rows)
+
+    def importQueue(self, queuePath, experiment=None):
+
+        '''
+        Description: records the results of the job queue at queuePath (see simulation.job_queue.JobQueue) as
+            finished runs, skipping results already imported. The trajectory of every run points to its result,
+            as queuePath + '#' + its key in the queue
+
+        Parameters:
+        # queuePath: path of queue database
+        # experiment: name of the experiment of the runs
+
+        Returns: number of runs recorded
+        '''
+
+        connection = sqlite3.connect(queuePath, timeout=60.0)
+        try:
+            rows = connection.execute('SELECT key, parameters, replicate, result, worker, finished FROM results').fetchall()
+        finally:
+            connection.close()
+        imported = set(run['trajectory'] for run in self.query(columns=['trajectory'], orderBy=None,
+                                                               trajectory=[queuePath + '#' + row[0] for row in rows]))
+        runs = []
+        for key, parameters, replicate, result, worker, finished in rows:
+            if queuePath + '#' + key in imported:
+                continue
+            parameters = json.loads(parameters)
+            if 'seed' in parameters:
+                # as when the job was claimed
+                parameters['seed'] += replicate
+            runs.append(dict(parameters=parameters, result=json.loads(result), replicate=replicate,
+                             experiment=experiment, trajectory=queuePath + '#' + key, started=finished,
+                             host=worker.rsplit(':', 1)[0] if worker else None))
+        return self.recordMany(runs)
+
+    def importSweep(self, csvPath, experiment=None):
+
+        '''
+        Description: records the trials of a CSV file written by EvolutionSimulator (see simulation.data_vectors.
+            readFinalValues) as finished runs, skipping trials already imported, so that a file appended to by
+            later runs of an experiment may be imported again. Trials of a parameter point are numbered as its
+            replicates in the order of the file, and the trajectory of every run points to its trial, as
+            csvPath + '#' + its index in the file. The files record no seeds or runtimes
+
+        Parameters:
+        # csvPath: path of CSV file
+        # experiment: name of the experiment of the runs
+
+        Returns: number of runs recorded
+        '''
+
+        parameterTitles, trials = readFinalValues(csvPath, [PROPORTIONS, POPULATIONS])
+        pointers = [csvPath + '#' + str(index) for index in range(len(trials))]
+        imported = set(run['trajectory'] for run in self.query(columns=['trajectory'], orderBy=None, trajectory=pointers))
+        replicates, runs = {}, []
+        for index, (parameterValues, finalValues) in enumerate(trials):
+            parameters = parametersFromPrefix(parameterTitles, parameterValues)
+            key = parameterKey(decodeParameters(parameters))
+            replicates[key] = replicates.get(key, -1) + 1
+            if pointers[index] in imported:
+                continue
+            runs.append(dict(parameters=parameters, replicate=replicates[key], experiment=experiment,
+                             trajectory=pointers[index],
+                             result={'prosocialProportions': [finalValues[PROPORTIONS]],
+                                     'populationCounts': [int(finalValues[POPULATIONS])]}))
+        return self.recordMany(runs)
+
+    def _where(self, conditions):
+
+        '''returns (SQL where clause, list of its arguments) for conditions given as keyword arguments of query'''
+
+        clauses, arguments = [], []
+        for name, value in sorted(conditions.items()):
+            if name not in COLUMNS and name != 'id':
+                raise RuntimeError('runs have no column ' + name)
+            if isinstance(value, tuple):
+                clauses.append(name + ' BETWEEN ? AND ?')
+                arguments += [_encodeValue(name, bound) for bound in value]
+            elif isinstance(value, list):
+                # matching long lists against a temporary table would be faster, but lists of a few
+                # thousand values are well within SQLite's limits on arguments
+                clauses.append(name + ' IN (' + ', '.join('?' * len(value)) + ')')
+                arguments += [_encodeValue(name, element) for element in value]
+            elif value is None:
+                clauses.append(name + ' IS NULL')
+            else:
+                clauses.append(name + ' = ?')
+                arguments.append(_encodeValue(name, value))
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), arguments
+
+    def _select(self, sql, arguments):
+
+        '''returns the rows of a select statement'''
+
+        connection = self._connect()
+        try:
+            return connection.execute(sql, arguments).fetchall()
+        finally:
+            connection.close()
+
+    def query(self, columns=None, orderBy='id', limit=None, **conditions):
+
+        '''
+        Description: returns runs meeting conditions (see class description)
+
+        Parameters:
+        # columns: names of columns to return, by default all of them and id
+        # orderBy: name of column by which runs are sorted, or None for no order
+        # limit: largest number of runs returned, or None for all of them
+
+        Returns: list of dictionaries from column names to values, one per run
+
+        Errors:
+        # RuntimeError: raised if a column does not exist
+        '''
+
+        columns = list(columns) if columns is not None else ['id'] + COLUMNS
+        for name in columns + ([orderBy] if orderBy is not None else []):
+            if name not in COLUMNS and name != 'id':
+                raise RuntimeError('runs have no column ' + name)
+        where, arguments = self._where(conditions)
+        sql = 'SELECT ' + ', '.join(columns) + ' FROM runs' + where
+        if orderBy is not None:
+            sql += ' ORDER BY ' + orderBy
+        if limit is not None:
+            sql += ' LIMIT ' + str(int(limit))
+        return [dict(zip(columns, row)) for row in self._select(sql, arguments)]
+
+    def count(self, **conditions):
+
+        '''returns the number of runs meeting conditions (see class description). If conditions only name
+        columns of POINT_COLUMNS, besides status='done', runs are counted from the counts kept per point'''
+
+        pointConditions = dict((name, value) for name, value in conditions.items() if name != 'status')
+        if all(name in POINT_COLUMNS for name in pointConditions) and conditions.get('status', 'done') == 'done':
+            where, arguments = self._where(pointConditions)
+            counted = 'runs' if 'status' in conditions else 'recorded'
+            return self._select('SELECT COALESCE(SUM(' + counted + '), 0) FROM points' + where, arguments)[0][0]
+        where, arguments = self._where(conditions)
+        return self._select('SELECT COUNT(*) FROM runs' + where, arguments)[0][0]
+
+    def aggregate(self, column='finalProportion', groupBy=(), **conditions):
+
+        '''
+        Description: summarizes a column over the finished (done) runs meeting conditions (see class
+            description), separately for every combination of values of the columns groupBy. Runs without a
+            value of the column are counted, but left out of its summaries. If conditions and groupBy only name
+            columns of POINT_COLUMNS, the summaries are read from those kept per point, whose number does not
+            grow with replicates; otherwise runs are read one by one
+
+        Parameters:
+        # column: name of column summarized, one of SUMMARIZED_COLUMNS
+        # groupBy: names of columns by which runs are grouped
+
+        Returns: list of dictionaries, one per group in order of the values of groupBy, with entries for the
+            columns groupBy, and runs (number of runs), mean, standardDeviation, minimum, maximum (of column;
+            None if no run has a value)
+
+        Errors:
+        # RuntimeError: raised if a column does not exist or column is not summarized
+        '''
+
+        groupBy = list(groupBy)
+        if column not in SUMMARIZED_COLUMNS:
+            raise RuntimeError('only columns ' + ', '.join(SUMMARIZED_COLUMNS) + ' are aggregated')
+        for name in groupBy + list(conditions):
+            if name not in COLUMNS:
+                raise RuntimeError('runs have no column ' + name)
+        if all(name in POINT_COLUMNS for name in groupBy + list(conditions)):
+            where, arguments = self._where(conditions)
+            sql = ('SELECT ' + ''.join(name + ', ' for name in groupBy) + 'SUM(runs), SUM({0}Count), SUM({0}Sum), '
+                   'SUM({0}Squares), MIN({0}Minimum), MAX({0}Maximum) FROM points'.format(column) + where)
+        else:
+            where, arguments = self._where(dict(conditions, status='done'))
+            sql = ('SELECT ' + ''.join(name + ', ' for name in groupBy) + 'COUNT(*), COUNT({0}), SUM({0}), '
+                   'SUM({0} * {0}), MIN({0}), MAX({0}) FROM runs'.format(column) + where)
+        if groupBy:
+            sql += ' GROUP BY ' + ', '.join(groupBy) + ' ORDER BY ' + ', '.join(groupBy)
+        summaries = []
+        for row in self._select(sql, arguments):
+            runs, values, total, squares, minimum, maximum = row[len(groupBy):]
+            if not runs:
+                continue
+            summary = dict(zip(groupBy, row), runs=runs, minimum=minimum, maximum=maximum, mean=None,
+                           standardDeviation=None)
+            if values:
+                summary['mean'] = total / float(values)
+                summary['standardDeviation'] = math.sqrt(max(squares / float(values) - summary['mean'] ** 2, 0.0))
+            summaries.append(summary)
+        return summaries
+
+def runCataloged(catalogPath, parameters, replicate=0, experiment=None, trajectoryDirectory=None, trajectory=None):
+
+    '''
+    Description: runs one simulation for a parameter point (see simulation.sweep.runTrial) and records it in the
+        catalog at catalogPath: as running before it starts, then as done or failed
+
+    Parameters:
+    # catalogPath: path of catalog database
+    # parameters: parameter point, encoded or not
+    # replicate, experiment: as for RunCatalog.begin
+    # trajectoryDirectory: if not None, directory in which the run's per-group counts are recorded (see
+        simulation.recorder.TrajectoryRecorder), in a file named by the key of the run
+    # trajectory: pointer to the run's bulk data if trajectoryDirectory is None, e.g. to the result of its job
+        if it runs as a job of a queue (see RunCatalog.importQueue)
+
+    Returns: dictionary of data vectors, as returned by simulation.sweep.runTrial
+
+    Errors: errors raised by the simulation are raised again once the run is recorded as failed
+    '''
+
+    if catalogPath not in _catalogs:
+        _catalogs[catalogPath] = RunCatalog(catalogPath)
+    catalog = _catalogs[catalogPath]
+    if trajectoryDirectory is not None:
+        trajectory = join(abspath(trajectoryDirectory), parameterKey(parameters, replicate) + '.counts')
+        parameters = dict(parameters, trajectoryFile=trajectory)
+    runId = catalog.begin(dict((name, value) for name, value in parameters.items() if name != 'trajectoryFile'),
+                          replicate, experiment, trajectory=trajectory)
+    startTime = time()
+    try:
+        result = runTrial(parameters)
+    except Exception:
+        catalog.fail(runId, traceback.format_exc(), time() - startTime)
+        raise
+    catalog.finish(runId, result, time() - startTime)
+    return result
+
+if __name__ == '__main__':
+
+    '''fills a catalog with 300000 synthetic runs and times queries and aggregations over them, imports the
+    CSV files of the experiments, then records real runs from a pool of processes writing at once'''
+
+    from socialunits.enums import ProsocialityType
+    from migration import randomRedistribution, biasedRedistribution
+    from multiprocessing import Pool
+    from tempfile import mkdtemp
+    import os, random
+
+    directory = mkdtemp()
+    path = os.path.join(directory, 'catalog.sqlite')
+    catalog = RunCatalog(path)
+    base = dict(numGroups=20, rounds=100, seedProportionProsocial=.5, reproduction=ReproductionType.asexual,
+                baseReproductionChances=1, mutationRate=0.0, typeProsociality=ProsocialityType.strong)
+    startTime = time()
+    random.seed(0)
+    for batch in range(30):
+        runs = []
+        for index in range(10000):
+            point = dict(base, targetGroupSize=random.choice([4, 8, 12, 16]),
+                         costOfProsociality=random.choice([0.0, .01, .02, .05, .1]),
+                         extraReproductionProbability=random.choice([.1, .2, .3]),
+                         baseReproductionProbability=random.choice([.8, .9, 1.0]),
+                         migrationFunction=random.choice([randomRedistribution, biasedRedistribution]),
+                         seed=batch * 10000 + index)
+            runs.append(dict(parameters=point, result={'prosocialProportions': [random.random()],
+                                                       'populationCounts': [random.randint(0, 400)]},
+                             experiment='synthetic' + str(batch % 6 + 1), runtime=random.random(), engine='individuals'))
+        catalog.recordMany(runs)
+    print('recorded ' + str(catalog.count()) + ' runs in ' + str(round(time() - startTime, 1)) + ' seconds')
+
+    for description, function in [
+            ('count of cost .05 under biased redistribution',
+             lambda: catalog.count(costOfProsociality=.05, migrationFunction=biasedRedistribution)),
+            ('first 100 runs of cost .05 under biased redistribution',
+             lambda: catalog.query(limit=100, costOfProsociality=.05, migrationFunction=biasedRedistribution)),
+            ('mean final proportion by group size at cost .05 under biased redistribution',
+             lambda: catalog.aggregate(groupBy=['targetGroupSize'], costOfProsociality=.05,
+                                       migrationFunction=biasedRedistribution)),
+            ('mean final proportion by migration function of experiment synthetic3, group sizes 8 to 12',
+             lambda: catalog.aggregate(groupBy=['migrationFunction'], experiment='synthetic3', targetGroupSize=(8, 12))),
+            ('run of a seed', lambda: catalog.query(seed=123456))]:
+        function()
+        startTime = time()
+        for _ in range(10):
+            answer = function()
+        print(description + ': ' + str(round((time() - startTime) / 10 * 1000, 2)) + ' milliseconds')
+    print(answer[0]['parameters'])
+
+    dataDirectory = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'simulation_data')
+    startTime = time()
+    for fileName in sorted(os.listdir(dataDirectory)):
+        if fileName.endswith('.csv'):
+            experiment = fileName.split('_')[0]
+            imported = catalog.importSweep(os.path.join(dataDirectory, fileName), experiment)
+            print('imported ' + str(imported) + ' trials of ' + fileName + ', then ' +
+                  str(catalog.importSweep(os.path.join(dataDirectory, fileName), experiment)) + ' when imported again')
+    print('imported in ' + str(round(time() - startTime, 1)) + ' seconds')
+    for summary in catalog.aggregate(groupBy=['experiment'], experiment=['experiment' + str(number) for number in range(1, 7)]):
+        print(summary)
+
+    pool = Pool(4)
+    real = dict(base, rounds=10, targetGroupSize=8, costOfProsociality=.02, extraReproductionProbability=.3,
+                baseReproductionProbability=.9, migrationFunction=randomRedistribution)
+    results = [pool.apply_async(runCataloged, (path, dict(real, seed=seed), 0, 'pool', directory)) for seed in range(16)]
+    for result in results:
+        result.get()
+    pool.close()
+    pool.join()
+    print(str(catalog.count(experiment='pool', status='done')) + ' pool runs done')
+    print(catalog.aggregate(groupBy=['engine', 'codeVersion'], experiment='pool'))
+    print(catalog.query(columns=['seed', 'runtime', 'trajectory'], limit=2, experiment='pool'))
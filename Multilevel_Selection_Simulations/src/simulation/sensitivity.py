@@ -0,0 +1,254 @@
+'''
+Module description:
+    global sensitivity analysis of the outcome of simulation.evo_simulator.EvolutionSimulator
+    over ranges of its parameters, by Sobol indices. A Saltelli design of quasi-random Sobol
+    points is scaled to the ranges, its points are run as jobs of a simulation.job_queue.JobQueue
+    by worker processes, and first-order and total-effect indices are estimated from the responses,
+    with bootstrap confidence intervals. The queue doubles as a cache: design points that repeat
+    (e.g. of integer or categorical parameters) or were run by an earlier analysis with the same
+    queue are not run again
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from sweep import parameterKey, decodeParameters
+from job_queue import JobQueue, runLocalWorkers
+from common_random_numbers import survivingFinalProportion
+from multiprocessing import cpu_count
+import numpy
+
+# (degree s, coefficient a, initial direction numbers m) of the primitive polynomials of dimensions 2 to 32 of
+# the Sobol sequence, from the direction numbers of Joe and Kuo (2008). Dimension 1 has all m equal to 1
+SOBOL_DIRECTIONS = [(1, 0, [1]), (2, 1, [1, 3]), (3, 1, [1, 3, 1]), (3, 2, [1, 1, 1]), (4, 1, [1, 1, 3, 3]),
+                    (4, 4, [1, 3, 5, 13]), (5, 2, [1, 1, 5, 5, 17]), (5, 4, [1, 1, 5, 5, 5]), (5, 7, [1, 1, 7, 11, 19]),
+                    (5, 11, [1, 1, 5, 1, 1]), (5, 13, [1, 1, 1, 3, 11]), (5, 14, [1, 3, 5, 5, 31]),
+                    (6, 1, [1, 3, 3, 9, 7, 49]), (6, 13, [1, 1, 1, 15, 21, 21]), (6, 16, [1, 3, 1, 13, 27, 49]),
+                    (6, 19, [1, 1, 1, 15, 7, 5]), (6, 22, [1, 3, 1, 15, 13, 25]), (6, 25, [1, 1, 5, 5, 19, 61]),
+                    (7, 1, [1, 3, 7, 11, 23, 15, 103]), (7, 4, [1, 3, 7, 13, 13, 15, 69]),
+                    (7, 7, [1, 1, 3, 13, 7, 35, 63]), (7, 8, [1, 3, 5, 9, 1, 25, 53]), (7, 14, [1, 3, 1, 13, 9, 35, 107]),
+                    (7, 19, [1, 3, 1, 5, 27, 61, 31]), (7, 21, [1, 1, 5, 11, 19, 41, 61]),
+                    (7, 28, [1, 3, 5, 3, 3, 13, 69]), (7, 31, [1, 1, 7, 13, 1, 19, 1]), (7, 32, [1, 3, 7, 5, 13, 19, 59]),
+                    (7, 37, [1, 1, 3, 9, 25, 29, 41]), (7, 41, [1, 3, 5, 13, 23, 1, 55]),
+                    (7, 42, [1, 3, 7, 3, 13, 59, 17])]
+
+BITS = 32
+
+def _directionNumbers(dimension):
+
+    '''returns array of the BITS direction numbers of a dimension (counted from 0), scaled by 2 ** BITS'''
+
+    if dimension == 0:
+        initial, degree, coefficient = [1] * BITS, BITS, 0
+    else:
+        degree, coefficient, initial = SOBOL_DIRECTIONS[dimension - 1]
+    directions = [0] * BITS
+    for bit in range(min(degree, BITS)):
+        directions[bit] = initial[bit] << (BITS - 1 - bit)
+    for bit in range(degree, BITS):
+        direction = directions[bit - degree] ^ (directions[bit - degree] >> degree)
+        for term in range(1, degree):
+            if (coefficient >> (degree - 1 - term)) & 1:
+                direction ^= directions[bit - term]
+        directions[bit] = direction
+    return numpy.array(directions, dtype=numpy.uint64)
+
+def sobolSequence(count, dimensions):
+
+    '''
+    Description: returns the points 1 to count of the Sobol sequence (the point 0, at the origin, is skipped)
+
+    Parameters:
+    # count: number of points, less than 2 ** 32
+    # dimensions: number of dimensions, at most len(SOBOL_DIRECTIONS) + 1
+
+    Returns: float array of shape (count, dimensions) of points in [0, 1)
+
+    Errors:
+    # RuntimeError: raised if dimensions is too large
+    '''
+
+    if dimensions > len(SOBOL_DIRECTIONS) + 1:
+        raise RuntimeError('Sobol points are available in at most ' + str(len(SOBOL_DIRECTIONS) + 1) + ' dimensions')
+    indices = numpy.arange(1, count + 1, dtype=numpy.uint64)
+    # the point of index n is the XOR of the direction numbers of the bits of the Gray code of n
+    grayCodes = indices ^ (indices >> numpy.uint64(1))
+    points = numpy.zeros((count, dimensions), dtype=numpy.uint64)
+    for dimension in range(dimensions):
+        directions = _directionNumbers(dimension)
+        for bit in range(BITS):
+            hasBit = ((grayCodes >> numpy.uint64(bit)) & numpy.uint64(1)).astype(bool)
+            points[hasBit, dimension] ^= directions[bit]
+    return points / float(2 ** BITS)
+
+def saltelliDesign(samples, numParameters):
+
+    '''
+    Description: returns the unit design of Saltelli et al. (2010) for Sobol indices of numParameters
+        parameters: matrices A and B, the first and last numParameters dimensions of samples Sobol points, and
+        for every parameter i the matrix AB[i], equal to A with column i taken from B
+
+    Returns: tuple of float arrays (A, B, AB), of shapes (samples, numParameters) and
+        (numParameters, samples, numParameters)
+    '''
+
+    points = sobolSequence(samples, 2 * numParameters)
+    a, b = points[:, :numParameters], points[:, numParameters:]
+    ab = numpy.repeat(a[numpy.newaxis], numParameters, axis=0)
+    for parameter in range(numParameters):
+        ab[parameter, :, parameter] = b[:, parameter]
+    return a, b, ab
+
+def scalePoint(unitPoint, names, ranges):
+
+    '''
+    Description: returns dictionary of parameter values of a point of the unit cube
+
+    Parameters:
+    # unitPoint: coordinates in [0, 1), one per name
+    # names: names of parameters
+    # ranges: dictionary from name to range: a list of values, chosen among uniformly; a pair of integers
+        (low, high), for integers from low to high inclusive; or a pair (low, high), for numbers from low to high
+    '''
+
+    point = {}
+    for name, coordinate in zip(names, unitPoint):
+        valueRange = ranges[name]
+        if isinstance(valueRange, list):
+            point[name] = valueRange[int(coordinate * len(valueRange))]
+        elif all(isinstance(bound, int) for bound in valueRange):
+            point[name] = valueRange[0] + int(coordinate * (valueRange[1] - valueRange[0] + 1))
+        else:
+            point[name] = valueRange[0] + coordinate * (valueRange[1] - valueRange[0])
+    return point
+
+def sobolIndices(responsesA, responsesB, responsesAB, bootstrap=1000, confidence=.95):
+
+    '''
+    Description: estimates first-order indices by the estimator of Saltelli et al. (2010), and total-effect
+        indices by that of Jansen (1999), from the responses of a Saltelli design, with percentile bootstrap
+        confidence intervals over resampled rows of the design
+
+    Parameters:
+    # responsesA, responsesB: arrays of responses of the rows of A and B
+    # responsesAB: array of shape (number of parameters, samples) of responses of the rows of every AB[i]
+    # bootstrap: number of bootstrap resamples
+    # confidence: level of the confidence intervals
+
+    Returns: dictionary with entries firstOrder, totalEffect (arrays of indices per parameter), and
+        firstOrderInterval, totalEffectInterval (arrays of shape (number of parameters, 2) of lower and upper
+        bounds)
+    '''
+
+    def estimate(rows):
+        a, b, ab = responsesA[rows], responsesB[rows], responsesAB[:, rows]
+        variance = numpy.concatenate([a, b]).var()
+        if variance == 0:
+            return numpy.zeros(len(ab)), numpy.zeros(len(ab))
+        firstOrder = (b * (ab - a)).mean(axis=1) / variance
+        totalEffect = .5 * ((a - ab) ** 2).mean(axis=1) / variance
+        return firstOrder, totalEffect
+
+    samples = len(responsesA)
+    firstOrder, totalEffect = estimate(numpy.arange(samples))
+    resampled = [estimate(numpy.random.randint(0, samples, samples)) for _ in range(bootstrap)]
+    tails = [50 * (1 - confidence), 50 * (1 + confidence)]
+    return {'firstOrder': firstOrder, 'totalEffect': totalEffect,
+            'firstOrderInterval': numpy.percentile([first for first, _ in resampled], tails, axis=0).T,
+            'totalEffectInterval': numpy.percentile([total for _, total in resampled], tails, axis=0).T}
+
+def sensitivityAnalysis(baseParameters, ranges, samples, path, numWorkers=None, response=survivingFinalProportion,
+                        bootstrap=1000, confidence=.95):
+
+    '''
+    Description: runs a Saltelli design over ranges of parameters of simulation.evo_simulator.EvolutionSimulator
+        as jobs of the queue at path, on numWorkers local worker processes, and estimates Sobol indices of the
+        response of its trials (see sobolIndices). Jobs already in the queue, from repeated points of the design
+        or from earlier analyses, are not run again. To run on several hosts instead, start
+        simulation.job_queue's workers against path on each and call this function once they finish
+
+    Parameters:
+    # baseParameters: parameter point of the parameters that are not varied (an entry 'seed' seeds every trial)
+    # ranges: dictionary from name of each varied parameter to its range, as for scalePoint
+    # samples: number of rows of the design; trials run number samples * (len(ranges) + 2) points
+    # path: path of queue database
+    # numWorkers: number of worker processes, by default the number of cores
+    # response, bootstrap, confidence: function from the result of a trial to the number analysed, and as for
+        sobolIndices. By default the final prosocial proportion, NaN for trials whose population went extinct.
+        A row of the design with a NaN response in any of its points is left out of the estimates, which are
+        then of the response given survival
+
+    Returns: dictionary returned by sobolIndices, with the further entries names (sorted names of varied
+        parameters, in the order of the indices), points (number of distinct points of the design),
+        simulations (number of trials run, the rest having been found in the queue), and maskedRows (number
+        of rows of the design left out for NaN responses)
+
+    Errors:
+    # RuntimeError: raised if a point of the design failed (see simulation.job_queue.runWorker), or if every row
+        of the design has a NaN response
+    '''
+
+    names = sorted(ranges)
+    a, b, ab = saltelliDesign(samples, len(names))
+    unitPoints = numpy.vstack([a, b] + list(ab))
+    points = [dict(baseParameters, **scalePoint(unitPoint, names, ranges)) for unitPoint in unitPoints]
+    keys = [parameterKey(point) for point in points]
+
+    queue = JobQueue(path)
+    simulations = queue.submit(dict((key, point) for key, point in zip(keys, points)).values())
+    if not queue.isFinished():
+        runLocalWorkers(path, numWorkers if numWorkers is not None else cpu_count())
+    results = dict((parameterKey(decodeParameters(parameters), replicate), result)
+                   for parameters, replicate, result in queue.results())
+    missing = set(keys) - set(results)
+    if missing:
+        raise RuntimeError(str(len(missing)) + ' points of the design have no result; see the failed jobs of the queue')
+    responses = numpy.array([response(results[key]) for key in keys], dtype=float)
+    responsesA, responsesB = responses[:samples], responses[samples:2 * samples]
+    responsesAB = responses[2 * samples:].reshape(len(names), samples)
+    complete = ~(numpy.isnan(responsesA) | numpy.isnan(responsesB) | numpy.isnan(responsesAB).any(axis=0))
+    if not complete.any():
+        raise RuntimeError('every row of the design has a NaN response')
+    indices = sobolIndices(responsesA[complete], responsesB[complete], responsesAB[:, complete], bootstrap, confidence)
+    indices.update(names=names, points=len(set(keys)), simulations=simulations, maskedRows=int((~complete).sum()))
+    return indices
+
+if __name__ == '__main__':
+
+    '''checks the estimators on the Ishigami function, whose indices are known, then analyses the sensitivity of
+    the final prosocial proportion to six parameters, and repeats the analysis to show that every trial is then
+    found in the queue'''
+
+    from socialunits.enums import ReproductionType, ProsocialityType
+    from migration import randomRedistribution, biasedRedistribution
+    from tempfile import mkdtemp
+    from time import time
+    import os
+
+    a, b, ab = [numpy.pi * (2 * unit - 1) for unit in saltelliDesign(2 ** 13, 3)]
+    ishigami = lambda x: numpy.sin(x[..., 0]) + 7 * numpy.sin(x[..., 1]) ** 2 + .1 * x[..., 2] ** 4 * numpy.sin(x[..., 0])
+    indices = sobolIndices(ishigami(a), ishigami(b), ishigami(ab), bootstrap=200)
+    print('Ishigami first order ' + str(numpy.round(indices['firstOrder'], 3)) + ' (exact [0.314 0.442 0.]), total ' +
+          str(numpy.round(indices['totalEffect'], 3)) + ' (exact [0.558 0.442 0.244])')
+
+    base = dict(numGroups=10, migrationFunction=randomRedistribution, rounds=10, seedProportionProsocial=.5,
+                reproduction=ReproductionType.asexual, baseReproductionChances=1, mutationRate=0.0,
+                typeProsociality=ProsocialityType.strong, threaded=False, seed=1)
+    ranges = {'costOfProsociality': (0.0, .2), 'extraReproductionProbability': (0.0, .5), 'targetGroupSize': (4, 16),
+              'baseReproductionProbability': (.7, 1.0), 'migrationFunction': [randomRedistribution, biasedRedistribution],
+              'typeProsociality': [ProsocialityType.weak, ProsocialityType.strong]}
+    path = os.path.join(mkdtemp(), 'sensitivity.sqlite')
+    for _ in range(2):
+        startTime = time()
+        analysis = sensitivityAnalysis(base, ranges, 256, path, bootstrap=500)
+        print(str(analysis['points']) + ' distinct points, ' + str(analysis['simulations']) + ' trials run, ' +
+              str(analysis['maskedRows']) + ' rows left out for extinction, in ' +
+              str(round(time() - startTime, 1)) + ' seconds')
+    for index, name in enumerate(analysis['names']):
+        print(name + ': first order ' + str(round(analysis['firstOrder'][index], 3)) + ' ' +
+              str(numpy.round(analysis['firstOrderInterval'][index], 3)) + ', total ' +
+              str(round(analysis['totalEffect'][index], 3)) + ' ' + str(numpy.round(analysis['totalEffectInterval'][index], 3)))
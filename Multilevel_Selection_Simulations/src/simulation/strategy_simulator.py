@@ -0,0 +1,373 @@
+'''
+Module description:
+    defines a single custom class, StrategySimulator, which generalizes
+    simulation.evo_simulator.EvolutionSimulator from a binary prosocial vs. selfish
+    population to any number of strategies, e.g. a mix of altruists, reciprocators,
+    and selfish individuals, or bins of a continuous level of altruism
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from socialunits.enums import Phenotype, ProsocialityType
+from socialunits.vectorized import lifeCycleStrategiesVectorized
+from socialunits.jit import dealCounts, biasedRedistributionCounts
+from socialunits.kernels import PairwiseKernel
+from recorder import TrajectoryRecorder
+from migration import randomRedistribution, biasedRedistribution, totalIsolation, getMigrationFunctionKey
+import csv
+from os.path import join
+import numpy
+
+# help matrix reproducing the default social game, with strategies ordered as the values of
+# socialunits.enums.Phenotype: altruists help anyone, reciprocators help only reciprocators
+phenotypeHelpMatrix = [[1, 1, 1],
+                       [0, 0, 0],
+                       [0, 0, 1]]
+
+class StrategySimulator:
+
+    '''
+    Description:
+        runs evolutionary simulations like simulation.evo_simulator.EvolutionSimulator, but for a
+        population of any number K of strategies. Each group is represented only by its vector of counts
+        per strategy, held as a column of the (K, numGroups) array strategyCounts, and each round's social
+        game, death and reproduction, and migration are each a handful of numpy operations over all groups
+        at once (see socialunits.vectorized.lifeCycleStrategiesVectorized). The social game is given by a
+        payoff kernel (see socialunits.kernels), by default a matrix of help probabilities between strategies,
+        so that pairwise games such as that of socialunits.group.SocialGroup can be mixed freely. The
+        migration functions simulation.migration.randomRedistribution and totalIsolation are supported,
+        through count-based versions of the methods of EvolutionSimulator that they call, as is
+        simulation.migration.biasedRedistribution for two strategies ordered (prosocial, selfish). Random
+        and biased assignment to groups run on the compiled kernels of socialunits.jit if numba is installed.
+
+        Huge populations: since no individuals are represented, memory is bounded by the count arrays
+        rather than by the population size. Given chunkSize, the life cycle and the dealing of migrants
+        into groups stream through chunks of chunkSize groups, so that temporary arrays are bounded by
+        the chunk rather than by the number of groups. Memory is then at most about
+        16 * K * numGroups + 80 * K * chunkSize bytes: strategyCounts and the array it is rebuilt into
+        at migration, plus the per-chunk buffers of the life cycle. E.g. 10^7 individuals in groups of 10
+        with K = 2 take about 32 MB of counts. See simulation/benchmark_huge_population.py.
+
+    Non-instance variable parameters:
+    # fileName: name of CSV file to write/append, including extension
+
+    Parameters/instance variables:
+    # numGroups: number of groups--initially has value of parameter numGroups
+    # migrationFunction: simulation.migration.randomRedistribution or simulation.migration.totalIsolation, or
+        simulation.migration.biasedRedistribution if there are two strategies
+    # strategyNames: list of K names of strategies, used in row titles of data vectors. Defaults to the
+        names of members of socialunits.enums.Phenotype
+    # helpMatrix: K by K array_like, entry [i][j] the probability that an individual of strategy i helps a
+        groupmate of strategy j that it picks. Defaults to phenotypeHelpMatrix. Ignored if payoffKernel is given
+    # payoffKernel: instance of a subclass of socialunits.kernels.PayoffKernel that plays the social game.
+        Defaults to socialunits.kernels.PairwiseKernel(helpMatrix)
+    # mutationMatrix: K by K array_like whose rows sum to 1, entry [i][j] the probability that offspring of
+        strategy i are of strategy j. If None, built from mutationRate: offspring keep their parent's strategy
+        with probability 1 - mutationRate, and otherwise take one of the other strategies uniformly at random
+    # mutationRate: see mutationMatrix
+    # toWriteCSV: boolean, whether to record data to CSV file
+    # toWriteColumnTitles: boolean, whether to write column titles to CSV file
+    # toPrintDataVecs: boolean, whether to print vectors of data at end of simulation
+
+    Keyword args/instance variables:
+    # baseReproductionChances, baseReproductionProbability, costOfProsociality, extraReproductionProbability,
+        typeProsociality, targetGroupSize, rounds: as for EvolutionSimulator
+    # seedProportions: list of K proportions of strategies in the starting population. Counts are rounded
+        down, with the remainder going to the first strategies
+    # trajectoryFile: optional, default None. If not None, path to which the counts of every strategy in every
+        group are recorded each round by simulation.recorder.TrajectoryRecorder
+    # chunkSize: optional, default None. If not None, number of groups processed at a time by the life cycle
+        and by random assignment to groups (see description). Payoff kernels that keep population-level state,
+        such as socialunits.kernels.ReciprocityWithMemoryKernel, update it once per chunk
+
+    Other instance variables:
+    # populationCount: count of population at large--initially assigned numGroups*targetGroupSize
+    # strategyCounts: integer array of shape (K, numGroups), counts of each strategy in each group
+    # allIndividuals: integer array of shape (K,), counts of each strategy in the population while pooled for
+        migration (named for compatibility with the migration functions of simulation.migration)
+    # kwargs: reference to key word args, passed to functions of socialunits.vectorized
+    # groupCountsVec: list of counts of groups
+    # populationCountsVec: list of counts of total population
+    # strategyFrequenciesVecs: list of K lists, the proportion of each strategy in the population each round
+        (-.1 if the population is extinct)
+    # prefixParams, columnTitles, filePath, toUpdateData, trajectoryRecorder: as for EvolutionSimulator
+
+    Constructor method signature: __init__(self, numGroups=10, migrationFunction=randomRedistribution,
+        strategyNames=None, helpMatrix=phenotypeHelpMatrix, payoffKernel=None, mutationMatrix=None,
+        mutationRate=0, toWriteCSV=False, fileName=None, toWriteColumnTitles=True, toPrintDataVecs=True, **kwargs)
+
+    Public methods:
+    # runEvolutionarySimulation(self): runs complete evolutionary simulation given parameters specified
+        in constructor
+    '''
+
+    def __init__(self, numGroups=10, migrationFunction=randomRedistribution, strategyNames=None,
+                 helpMatrix=phenotypeHelpMatrix, payoffKernel=None, mutationMatrix=None, mutationRate=0,
+                 toWriteCSV=False, fileName=None, toWriteColumnTitles=True, toPrintDataVecs=True, **kwargs):
+
+        '''
+        --See class's docstring for description of constructor's parameters--
+
+        Errors:
+        # TypeError: raised if typeProsociality not of type socialunits.enums.ProsocialityType
+        # RuntimeError: raised if migrationFunction is not supported, or if the sizes of strategyNames,
+            helpMatrix, mutationMatrix, and seedProportions disagree
+       '''
+
+        self.numGroups = numGroups
+        if migrationFunction not in (randomRedistribution, biasedRedistribution, totalIsolation):
+            raise RuntimeError('StrategySimulator supports only randomRedistribution, biasedRedistribution, and '
+                               'totalIsolation migration')
+        if migrationFunction == biasedRedistribution and len(kwargs['seedProportions']) != 2:
+            raise RuntimeError('biasedRedistribution requires two strategies, ordered (prosocial, selfish)')
+        self.migrationFunction = migrationFunction
+        self.helpMatrix = numpy.asarray(helpMatrix, dtype=float)
+        self.payoffKernel = payoffKernel if payoffKernel is not None else PairwiseKernel(self.helpMatrix)
+        numStrategies = len(kwargs['seedProportions'])
+        self.strategyNames = (strategyNames if strategyNames is not None
+                              else [phenotype.name for phenotype in Phenotype][:numStrategies])
+        self.mutationRate = mutationRate
+        if mutationMatrix is None:
+            mutationMatrix = numpy.full((numStrategies, numStrategies), mutationRate / max(numStrategies - 1.0, 1.0))
+            numpy.fill_diagonal(mutationMatrix, 1 - mutationRate if numStrategies > 1 else 1)
+        self.mutationMatrix = numpy.asarray(mutationMatrix, dtype=float)
+        self.toWriteCSV = toWriteCSV
+        self.toWriteColumnTitles = toWriteColumnTitles
+        self.toPrintDataVecs = toPrintDataVecs
+
+        #keyword args:
+        self.baseReproductionChances = kwargs['baseReproductionChances']
+        self.baseReproductionProbability = kwargs['baseReproductionProbability']
+        self.costOfProsociality = kwargs['costOfProsociality']
+        self.extraReproductionProbability = kwargs['extraReproductionProbability']
+        self.typeProsociality = kwargs['typeProsociality']
+        if not isinstance(self.typeProsociality, ProsocialityType):
+            raise TypeError('typeProsociality must of type socialunits.enums.ProsocialityType')
+        self.targetGroupSize = kwargs['targetGroupSize']
+        self.seedProportions = kwargs['seedProportions']
+        self.rounds = kwargs['rounds']
+        self.trajectoryFile = kwargs.get('trajectoryFile')
+        self.chunkSize = kwargs.get('chunkSize')
+        if not (len(self.strategyNames) == len(self.mutationMatrix) == numStrategies and
+                (payoffKernel is not None or self.helpMatrix.shape == (numStrategies, numStrategies))):
+            raise RuntimeError('strategyNames, helpMatrix, mutationMatrix, and seedProportions must agree in size')
+
+        #other instance vars:
+        self.populationCount = self.numGroups * self.targetGroupSize
+        self.kwargs = kwargs
+        self.groupCountsVec = []
+        self.populationCountsVec = []
+        self.strategyFrequenciesVecs = [[] for _ in range(numStrategies)]
+        self.toUpdateData = toWriteCSV or toPrintDataVecs or self.trajectoryFile is not None
+        self.trajectoryRecorder = None
+        if toWriteCSV or self.toPrintDataVecs:
+            self.prefixParams = self._prefixParams()
+            self.columnTitles = self._columnTitles()
+            if toWriteCSV:
+                self.filePath = join('..', '..', 'simulationdata', fileName)
+
+        # initialize strategy counts of the pooled population
+        self.allIndividuals = numpy.array([int(self.populationCount * proportion) for proportion in self.seedProportions],
+                                          dtype=numpy.int64)
+        self.allIndividuals[:self.populationCount - self.allIndividuals.sum()] += 1
+        self.strategyCounts = numpy.zeros((numStrategies, self.numGroups), dtype=numpy.int64)
+
+    def _prefixParams(self):
+
+        '''returns a vector of numeric values representing the parameters of the simulation, in the manner
+        of EvolutionSimulator._prefixParams, with the number of strategies in place of reproduction type
+        and prosocial phenotype'''
+
+        return [self.targetGroupSize, self.extraReproductionProbability, self.costOfProsociality,
+                len(self.strategyNames), self.rounds, self.baseReproductionChances, self.baseReproductionProbability,
+                self.typeProsociality.value, getMigrationFunctionKey(self.migrationFunction), self.mutationRate]
+
+    def _columnTitles(self):
+
+        '''returns column titles for data vectors'''
+
+        roundTitles = ['starting state'] + ['Round ' + str(i+1) for i in range(self.rounds)]
+        return ['dependent vars', 'target group size', 'extra reproduction probability', 'cost of prosociality',
+                'number of strategies', 'number of rounds', 'base reproduction rate', 'base reproduction probability',
+                'prosociality type', 'migration type', 'mutation rate'] + roundTitles
+
+    def _dataVecs(self):
+
+        '''returns list of data vectors, in final representation if _finalizeDataVecs has been called'''
+
+        return self.strategyFrequenciesVecs + [self.populationCountsVec, self.groupCountsVec]
+
+    def _finalizeDataVecs(self):
+
+        '''prepends row titles and prefix parameters to data vectors'''
+
+        self.strategyFrequenciesVecs = [['frequency of ' + name + ':'] + self.prefixParams + frequencies
+                                        for name, frequencies in zip(self.strategyNames, self.strategyFrequenciesVecs)]
+        self.populationCountsVec = ['population counts:'] + self.prefixParams + self.populationCountsVec
+        self.groupCountsVec = ['groups counts:'] + self.prefixParams + self.groupCountsVec
+
+    def _writeDataVecs(self):
+
+        '''writes column titles if required, then data vectors, to file'''
+
+        with open(self.filePath, 'ab') as csvFile:
+            csvWriter = csv.writer(csvFile)
+            if self.toWriteColumnTitles:
+                csvWriter.writerow(self.columnTitles)
+            for dataVec in self._dataVecs():
+                csvWriter.writerow(dataVec)
+
+    def _printDataVecs(self):
+
+        '''prints data vectors'''
+
+        print(self.columnTitles)
+        for dataVec in self._dataVecs():
+            print(dataVec)
+
+    def _updatePopulationData(self):
+
+        '''called each round to append data from round to data vectors, and to record counts to the
+        trajectory if there is one'''
+
+        if self.trajectoryRecorder is not None:
+            self.trajectoryRecorder.record(*self.strategyCounts)
+        strategyTotals = self.strategyCounts.sum(axis=1)
+        self.populationCount = int(strategyTotals.sum())
+        for frequencies, total in zip(self.strategyFrequenciesVecs, strategyTotals):
+            # frequency of -.1 indicates that populationCount is 0, thus entire population is extinct
+            frequencies.append(total / float(self.populationCount) if self.populationCount > 0 else -.1)
+        self.populationCountsVec.append(self.populationCount)
+        self.groupCountsVec.append(self.numGroups)
+
+    def _mergeGroups(self):
+
+        '''pools all groups, leaving counts of each strategy in the population in self.allIndividuals'''
+
+        self.allIndividuals = self.strategyCounts.sum(axis=1)
+
+    def _resetGroupsBeforeReassignment(self):
+
+        '''sets self.numGroups for next round, as EvolutionSimulator._resetGroupsBeforeReassignment'''
+
+        self.populationCount = int(self.allIndividuals.sum())
+        self.numGroups = max(self.populationCount // self.targetGroupSize, 1) if self.populationCount > 0 else 0
+
+    def _assignToGroupsRandomly(self, strategyTotals):
+
+        '''randomly deals the pooled population into self.numGroups groups whose sizes differ by at most one.
+        Given chunkSize, the population is first dealt to chunks of groups, then each chunk to its groups'''
+
+        groupSize, remainder = divmod(self.populationCount, max(self.numGroups, 1))
+        if self.chunkSize is None or self.numGroups <= self.chunkSize:
+            groupSizes = numpy.full(self.numGroups, groupSize, dtype=numpy.int64)
+            groupSizes[:remainder] += 1
+            self.strategyCounts = dealCounts(strategyTotals, groupSizes)
+            return
+        # the first remainder groups take one extra member
+        chunkStarts = numpy.arange(0, self.numGroups, self.chunkSize)
+        chunkEnds = numpy.minimum(chunkStarts + self.chunkSize, self.numGroups)
+        chunkSizes = (chunkEnds - chunkStarts) * groupSize + (numpy.minimum(chunkEnds, remainder) -
+                                                              numpy.minimum(chunkStarts, remainder))
+        chunkTotals = dealCounts(strategyTotals, chunkSizes)
+        self.strategyCounts = numpy.empty((len(strategyTotals), self.numGroups), dtype=numpy.int64)
+        for chunkIndex, (start, end) in enumerate(zip(chunkStarts, chunkEnds)):
+            groupSizes = numpy.full(end - start, groupSize, dtype=numpy.int64)
+            groupSizes[:max(remainder - start, 0)] += 1
+            self.strategyCounts[:, start:end] = dealCounts(chunkTotals[:, chunkIndex], groupSizes)
+
+    def _assignToGroupsBiased(self, strategyTotals):
+
+        '''assigns the pooled population of two strategies, (prosocial, selfish), to self.numGroups groups as by
+        simulation.migration.biasedRedistribution'''
+
+        self.strategyCounts = numpy.vstack(biasedRedistributionCounts(strategyTotals[0], strategyTotals[1], self.numGroups))
+
+    def _runLifeCycle(self):
+
+        '''runs the social game and death and reproduction in every group, a chunk of groups at a time if
+        chunkSize is given, writing progeny counts over strategyCounts'''
+
+        chunkSize = self.chunkSize if self.chunkSize is not None else max(self.numGroups, 1)
+        for start in range(0, self.numGroups, chunkSize):
+            self.strategyCounts[:, start:start + chunkSize] = lifeCycleStrategiesVectorized(
+                self.strategyCounts[:, start:start + chunkSize], self.payoffKernel, self.mutationMatrix, **self.kwargs)
+
+    def _migrationPhase(self):
+
+        '''wrapper method that simply calls the migration function instance variable'''
+
+        self.migrationFunction(self)
+
+    def runEvolutionarySimulation(self):
+
+        '''
+        Description: runs complete evolutionary simulation. The population is dealt randomly into groups,
+            then for each of self.rounds rounds every group plays the social game and undergoes death and
+            reproduction, followed by the migration phase
+        '''
+
+        self._assignToGroupsRandomly(self.allIndividuals)
+
+        if self.trajectoryFile is not None:
+            self.trajectoryRecorder = TrajectoryRecorder(self.trajectoryFile, numColumns=len(self.strategyNames))
+        if self.toUpdateData:
+            self._updatePopulationData()
+
+        for _ in range(self.rounds):
+            self._runLifeCycle()
+            self._migrationPhase()
+            if self.toUpdateData:
+                self._updatePopulationData()
+
+        if self.trajectoryRecorder is not None:
+            self.trajectoryRecorder.close()
+            self.trajectoryRecorder = None
+
+        if self.toWriteCSV or self.toPrintDataVecs:
+            self._finalizeDataVecs()
+            if self.toPrintDataVecs:
+                self._printDataVecs()
+            if self.toWriteCSV:
+                self._writeDataVecs()
+
+def continuousAltruismMatrices(altruismLevels, mutationRate=0.0):
+
+    '''
+    Description: returns (helpMatrix, mutationMatrix) for a population whose strategies are bins of a
+        continuous level of altruism, e.g. numpy.linspace(0, 1, 11). An individual of level x helps any
+        groupmate it picks with probability x. Mutation moves offspring to an adjacent bin, with probability
+        mutationRate split evenly between the two neighbours (or given entirely to the only neighbour of an
+        end bin)
+
+    Parameters:
+    # altruismLevels: list of K levels of altruism in range [0,1]
+    # mutationRate: probability that offspring are in a bin adjacent to their parent's
+    '''
+
+    numLevels = len(altruismLevels)
+    helpMatrix = numpy.repeat(numpy.asarray(altruismLevels, dtype=float).reshape(numLevels, 1), numLevels, axis=1)
+    mutationMatrix = numpy.eye(numLevels) * (1 - mutationRate)
+    for level in range(numLevels):
+        neighbours = [neighbour for neighbour in (level - 1, level + 1) if 0 <= neighbour < numLevels]
+        for neighbour in neighbours:
+            mutationMatrix[level, neighbour] += mutationRate / len(neighbours)
+    if numLevels == 1:
+        mutationMatrix[0, 0] = 1.0
+    return helpMatrix, mutationMatrix
+
+if __name__ == '__main__':
+
+    '''use main for testing/debugging, modifying parameters as desired'''
+
+    simulator = StrategySimulator(numGroups=100, migrationFunction=randomRedistribution,
+                                  rounds=30, targetGroupSize=10, seedProportions=[.3, .4, .3],
+                                  costOfProsociality=0.02, extraReproductionProbability=.5,
+                                  baseReproductionChances=1, baseReproductionProbability=.85, mutationRate=0.0,
+                                  typeProsociality=ProsocialityType.strong, toPrintDataVecs=True)
+    simulator.runEvolutionarySimulation()
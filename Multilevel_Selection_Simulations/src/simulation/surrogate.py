@@ -0,0 +1,309 @@
+'''
+Module description:
+    defines a surrogate model of the outcome surface of simulation.evo_simulator.EvolutionSimulator,
+    trained on the results of sweeps (see simulation.sweep and simulation.job_queue) or on the data files
+    of the experiments (see sweepObservations), which answers
+    queries for the outcome at parameter values between those simulated without running new
+    simulations. The surrogate is a Gaussian-process emulator over the numeric inputs, fitted
+    separately for every combination of the non-numeric inputs (e.g. each migration type), whose
+    predictions come with a standard deviation. Queries too far from the data, or too uncertain,
+    fall back on real simulations, whose results are added to the data before the model is refitted
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from sweep import encodeParameters, decodeParameters, parameterKey, runTrial
+from common_random_numbers import survivingFinalProportion
+from data_vectors import PROPORTIONS, POPULATIONS, parametersFromPrefix
+import numbers
+import numpy
+
+# inputs of the surrogate by default
+DEFAULT_INPUTS = ['targetGroupSize', 'costOfProsociality', 'extraReproductionProbability', 'migrationFunction']
+
+# length scales (in units of each numeric input's range in the data) and noise variances (as fractions of the
+# variance of the response) among which the model with the highest marginal likelihood is chosen
+LENGTH_SCALES = [.1, .2, .4, .8, 1.6]
+NOISE_FRACTIONS = [.01, .05, .2, .5]
+
+class SurrogateModel:
+
+    '''
+    Description: Gaussian-process emulator of a response of trials (by default the final prosocial proportion)
+        as a function of some of their parameters. Every combination of values of the non-numeric inputs has
+        its own Gaussian process over the numeric inputs, each scaled to the range of its values in the data,
+        with a squared exponential kernel, a constant mean, and independent noise for the variation between
+        trials of the same point. The length scale and noise are chosen by marginal likelihood. Fitting inverts
+        the kernel matrix once, after which a prediction costs a few array operations over the data. A query
+        is too far from the data if its combination of non-numeric inputs was never simulated, if its nearest
+        simulated point is farther than maxDistance in scaled units, or if the standard deviation of its
+        predicted mean exceeds maxStandardDeviation. Trials whose response is NaN, such as trials whose
+        population went extinct under the default response, are left out of the data, so that the model is
+        of the response given survival
+
+    Parameters/instance variables:
+    # observations: list of (parameters, replicate, result) of trials, as returned by
+        simulation.job_queue.JobQueue.results or sweepObservations. Parameter points may be encoded or not
+    # inputs: names of the parameters the response is modelled as a function of
+    # response: function from the result of a trial to the number modelled, NaN for trials to leave out.
+        By default the final prosocial proportion of trials whose population survives
+    # maxDistance: largest distance, in scaled units, from a query to its nearest simulated point for which the
+        query is answered by the model
+    # maxStandardDeviation: largest standard deviation of the predicted mean for which a query is answered by
+        the model
+    # replicates: number of trials run for a query too far from the data
+
+    Other instance variables:
+    # ranges: dictionary from numeric input to (minimum, width) of its values in the data, by which it is scaled
+    # processes: dictionary from tuple of values of non-numeric inputs to the fitted Gaussian process, a
+        dictionary with entries points, mean, variance, lengthScale, noise, inverse, weights
+
+    Constructor method signature: __init__(self, observations, inputs=DEFAULT_INPUTS, response=survivingFinalProportion,
+        maxDistance=.25, maxStandardDeviation=.05, replicates=3)
+
+    Public methods:
+    # predict(parameters): returns the model's prediction at a parameter point
+    # query(parameters): returns the prediction at a parameter point, simulating it first if it is too far
+        from the data
+    # addObservations(observations): adds results of trials and refits the model
+    '''
+
+    def __init__(self, observations, inputs=DEFAULT_INPUTS, response=survivingFinalProportion, maxDistance=.25,
+                 maxStandardDeviation=.05, replicates=3):
+        self.observations = []
+        self.inputs = list(inputs)
+        self.response = response
+        self.maxDistance = maxDistance
+        self.maxStandardDeviation = maxStandardDeviation
+        self.replicates = replicates
+        self.ranges = {}
+        self.processes = {}
+        self.addObservations(observations)
+
+    def _split(self, parameters):
+
+        '''returns (category, numeric values) of a parameter point: the tuple of its values of non-numeric inputs,
+        and the list of its values of numeric inputs in the order of self.inputs'''
+
+        encoded = encodeParameters(decodeParameters(parameters))
+        category, values = [], []
+        for name in self.inputs:
+            value = encoded[name]
+            if isinstance(value, numbers.Number) and not isinstance(value, bool):
+                values.append((name, float(value)))
+            else:
+                category.append(value)
+        return tuple(category), values
+
+    def _scale(self, values):
+
+        '''returns array of numeric values scaled by the ranges of the data'''
+
+        return numpy.array([(value - self.ranges[name][0]) / self.ranges[name][1] for name, value in values])
+
+    def addObservations(self, observations):
+
+        '''
+        Description: adds results of trials to the data, leaving out those whose response is NaN, and refits the 
+            Gaussian process of every combination of non-numeric inputs
+
+        Parameters:
+        # observations: list of (parameters, replicate, result), as for the constructor
+        '''
+
+        responses = [(parameters, self.response(result)) for parameters, _, result in observations]
+        self.observations += [(parameters, response) for parameters, response in responses if not numpy.isnan(response)]
+        splits = [self._split(parameters) for parameters, _ in self.observations]
+        self.ranges = {}
+        for _, values in splits:
+            for name, value in values:
+                low, high = self.ranges.get(name, (value, value))
+                self.ranges[name] = (min(low, value), max(high, value))
+        # inputs with a single value in the data have a negligible width, so that any other value is far from it
+        self.ranges = dict((name, (low, max(high - low, 1e-9))) for name, (low, high) in self.ranges.items())
+
+        byCategory = {}
+        for (category, values), (_, response) in zip(splits, self.observations):
+            byCategory.setdefault(category, ([], []))
+            byCategory[category][0].append(self._scale(values))
+            byCategory[category][1].append(response)
+        self.processes = dict((category, self._fit(numpy.array(points), numpy.array(responses, dtype=float)))
+                              for category, (points, responses) in byCategory.items())
+
+    def _fit(self, points, responses):
+
+        '''returns the Gaussian process of greatest marginal likelihood for the given scaled points and responses'''
+
+        mean = responses.mean()
+        centered = responses - mean
+        variance = max(centered.var(), 1e-6)
+        squaredDistances = ((points[:, numpy.newaxis, :] - points[numpy.newaxis, :, :]) ** 2).sum(axis=2)
+        best = None
+        for lengthScale in LENGTH_SCALES:
+            correlations = numpy.exp(-squaredDistances / (2 * lengthScale ** 2))
+            for noiseFraction in NOISE_FRACTIONS:
+                covariance = variance * (correlations + noiseFraction * numpy.eye(len(points)))
+                cholesky = numpy.linalg.cholesky(covariance)
+                solved = numpy.linalg.solve(cholesky, centered)
+                logLikelihood = -.5 * solved.dot(solved) - numpy.log(numpy.diag(cholesky)).sum()
+                if best is None or logLikelihood > best[0]:
+                    best = (logLikelihood, lengthScale, noiseFraction * variance, covariance)
+        _, lengthScale, noise, covariance = best
+        inverse = numpy.linalg.inv(covariance)
+        return {'points': points, 'mean': mean, 'variance': variance, 'lengthScale': lengthScale, 'noise': noise,
+                'inverse': inverse, 'weights': inverse.dot(centered)}
+
+    def predict(self, parameters):
+
+        '''
+        Description: predicts the response at a parameter point
+
+        Parameters:
+        # parameters: parameter point, encoded or not, giving every input
+
+        Returns: dictionary with entries
+        # mean: predicted mean response, or None if no point with the same non-numeric inputs was simulated
+        # standardDeviation: standard deviation of mean (inf if mean is None)
+        # trialStandardDeviation: standard deviation of the response of a single trial at the point
+        # distance: distance in scaled units to the nearest simulated point (inf if mean is None)
+        # tooFar: whether the query is too far from the data (see class description)
+        '''
+
+        category, values = self._split(parameters)
+        process = self.processes.get(category)
+        if process is None:
+            return {'mean': None, 'standardDeviation': float('inf'), 'trialStandardDeviation': float('inf'),
+                    'distance': float('inf'), 'tooFar': True}
+        point = self._scale(values)
+        squaredDistances = ((process['points'] - point) ** 2).sum(axis=1)
+        covariances = process['variance'] * numpy.exp(-squaredDistances / (2 * process['lengthScale'] ** 2))
+        variance = max(process['variance'] - covariances.dot(process['inverse']).dot(covariances), 0.0)
+        standardDeviation = float(numpy.sqrt(variance))
+        distance = float(numpy.sqrt(squaredDistances.min()))
+        return {'mean': float(process['mean'] + covariances.dot(process['weights'])),
+                'standardDeviation': standardDeviation,
+                'trialStandardDeviation': float(numpy.sqrt(variance + process['noise'])),
+                'distance': distance,
+                'tooFar': distance > self.maxDistance or standardDeviation > self.maxStandardDeviation}
+
+    def query(self, parameters):
+
+        '''
+        Description: predicts the response at a parameter point. If the point is too far from the data, first
+            runs self.replicates trials of it (see simulation.sweep.runTrial; an entry 'seed' is increased by
+            the replicate) and refits the model with their results
+
+        Parameters:
+        # parameters: complete parameter point, encoded or not
+
+        Returns: dictionary as returned by predict, with the further entry
+        # simulated: whether trials were run to answer the query
+        '''
+
+        prediction = self.predict(parameters)
+        if not prediction['tooFar']:
+            prediction['simulated'] = False
+            return prediction
+        observations = []
+        for replicate in range(self.replicates):
+            point = dict(parameters)
+            if 'seed' in point:
+                point['seed'] += replicate
+            observations.append((point, replicate, runTrial(point)))
+        self.addObservations(observations)
+        prediction = self.predict(parameters)
+        prediction['simulated'] = True
+        return prediction
+
+def sweepObservations(results, baseParameters=None):
+
+    '''
+    Description: returns the trials of a data file of the experiments as observations for SurrogateModel. The
+        parameter point of every trial is read from its prefix parameters (see
+        simulation.data_vectors.parametersFromPrefix), over baseParameters for parameters the file does not
+        record, and its result has the data vectors of prosocial proportions and population counts, as by
+        simulation.sweep.runTrial. Trials of the same point are numbered as replicates in the order of the file
+
+    Parameters:
+    # results: analysis.sweeps.SweepResults of the data file
+    # baseParameters: optional dictionary of parameters not recorded in the file, e.g. numGroups (10 in the
+        experiment scripts)
+
+    Returns: list of (parameters, replicate, result)
+    '''
+
+    proportions, populations = results.dataVec(PROPORTIONS), results.dataVec(POPULATIONS)
+    observations = []
+    replicates = {}
+    for trialIndex in range(results.numTrials):
+        parameters = dict(baseParameters or {}, **parametersFromPrefix(results.parameterTitles, results.parameters[trialIndex]))
+        key = parameterKey(decodeParameters(parameters))
+        replicates[key] = replicates.get(key, -1) + 1
+        recorded = ~numpy.isnan(proportions[trialIndex])
+        observations.append((parameters, replicates[key],
+                             {'prosocialProportions': list(proportions[trialIndex][recorded]),
+                              'populationCounts': [int(count) for count in populations[trialIndex][recorded]]}))
+    return observations
+
+if __name__ == '__main__':
+
+    '''trains a surrogate on a small sweep of costs of prosociality and extra reproduction probabilities under
+    random redistribution, then times queries inside the sweep and shows the fallback on a query outside it.
+    Finally trains a surrogate on the stored data of experiment 6 and checks it against the trials there'''
+
+    from socialunits.enums import ReproductionType, ProsocialityType
+    from migration import randomRedistribution
+    from sweep import gridPoints
+    from analysis.sweeps import loadSweep
+    from os.path import join, dirname, abspath
+    from time import time
+
+    base = dict(numGroups=20, migrationFunction=randomRedistribution, rounds=10, targetGroupSize=10,
+                seedProportionProsocial=.5, reproduction=ReproductionType.asexual, baseReproductionChances=1,
+                baseReproductionProbability=.9, mutationRate=0.0, typeProsociality=ProsocialityType.strong,
+                generationsPerMigration=2)
+    observations = []
+    for point in gridPoints(base, [('costOfProsociality', [0.0, .05, .1, .15, .2]),
+                                   ('extraReproductionProbability', [0.0, .1, .2, .3, .4])]):
+        for replicate in range(4):
+            observations.append((point, replicate, runTrial(point)))
+    startTime = time()
+    model = SurrogateModel(observations)
+    print('fitted to ' + str(len(observations)) + ' trials in ' + str(round(time() - startTime, 3)) + ' seconds')
+
+    query = dict(base, costOfProsociality=.07, extraReproductionProbability=.25)
+    startTime = time()
+    for _ in range(1000):
+        prediction = model.predict(query)
+    print('prediction at cost .07, extra .25: ' + str(round(prediction['mean'], 4)) + ' +/- ' +
+          str(round(prediction['standardDeviation'], 4)) + ' (trials +/- ' +
+          str(round(prediction['trialStandardDeviation'], 4)) + ') in ' +
+          str(round((time() - startTime) / 1000 * 10 ** 6, 1)) + ' microseconds')
+    simulated = numpy.nanmean([survivingFinalProportion(runTrial(query)) for _ in range(20)])
+    print('mean of 20 simulations there: ' + str(round(simulated, 4)))
+
+    for outside in [dict(base, costOfProsociality=.07, extraReproductionProbability=.25, targetGroupSize=20),
+                    dict(base, costOfProsociality=.07, extraReproductionProbability=.25, targetGroupSize=20)]:
+        prediction = model.query(outside)
+        print('target group size 20: ' + str(round(prediction['mean'], 4)) + ' +/- ' +
+              str(round(prediction['standardDeviation'], 4)) + ', simulated ' + str(prediction['simulated']))
+
+    results = loadSweep(join(dirname(abspath(__file__)), '..', '..', '..', 'simulation_data', 'experiment6_reciprocity.csv'))
+    observations = sweepObservations(results, {'numGroups': 10})
+    startTime = time()
+    model = SurrogateModel(observations, inputs=['costOfProsociality', 'extraReproductionProbability'])
+    extinct = sum(numpy.isnan(survivingFinalProportion(result)) for _, _, result in observations)
+    print('experiment 6: fitted to ' + str(len(model.observations)) + ' of ' + str(len(observations)) + ' trials (' +
+          str(extinct) + ' extinct left out) in ' + str(round(time() - startTime, 3)) + ' seconds')
+    for cost, extra in [(.02, .2), (.1, .35)]:
+        prediction = model.predict({'costOfProsociality': cost, 'extraReproductionProbability': extra})
+        stored = [response for parameters, response in model.observations 
+                  if parameters['costOfProsociality'] == cost and parameters['extraReproductionProbability'] == extra]
+        print('cost ' + str(cost) + ', extra ' + str(extra) + ': ' + str(round(prediction['mean'], 4)) + ' +/- ' +
+              str(round(prediction['standardDeviation'], 4)) + ', mean of ' + str(len(stored)) + ' stored trials ' +
+              str(round(numpy.mean(stored), 4)))
@@ -0,0 +1,122 @@
+'''
+Module description:
+    the sweep layer over simulation.evo_simulator.EvolutionSimulator. A sweep is a list of
+    parameter points, each a dictionary of the simulator's constructor arguments, such as the
+    grids of parameter values looped over by the experiment scripts. Parameter points are
+    encoded as plain JSON-compatible dictionaries (enums and migration functions by name), so
+    that they can be stored, compared, and shipped to other processes or hosts, and every
+    point runs as one trial whose data vectors are returned rather than written to file
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from evo_simulator import EvolutionSimulator
+from socialunits.enums import ReproductionType, ProsocialityType, Phenotype
+from socialunits import jit
+import migration
+from itertools import product
+import hashlib, json, random
+
+# parameters holding enums, by the enum class of their values
+ENUM_PARAMETERS = {'reproduction': ReproductionType, 'typeProsociality': ProsocialityType,
+                   'prosocialPhenotype': Phenotype}
+
+def gridPoints(baseParameters, sweptParameters):
+
+    '''
+    Description: returns the list of parameter points of a grid sweep, in the order of nested loops over
+        the swept parameters (the first swept parameter is the outer loop), as in the experiment scripts
+
+    Parameters:
+    # baseParameters: dictionary of parameters shared by every point
+    # sweptParameters: list of (name, list of values) pairs
+    '''
+
+    names = [name for name, _ in sweptParameters]
+    points = []
+    for values in product(*[values for _, values in sweptParameters]):
+        point = dict(baseParameters)
+        point.update(zip(names, values))
+        points.append(point)
+    return points
+
+def encodeParameters(parameters):
+
+    '''returns copy of a parameter point with enums and the migration function replaced by their names'''
+
+    encoded = {}
+    for name, value in parameters.items():
+        if name in ENUM_PARAMETERS:
+            encoded[name] = value.name
+        elif name == 'migrationFunction':
+            encoded[name] = value.__name__
+        else:
+            encoded[name] = value
+    return encoded
+
+def decodeParameters(encoded):
+
+    '''inverse of encodeParameters. Names are accepted wherever encodeParameters would produce them, and
+    parameters that are already decoded are left as they are'''
+
+    parameters = {}
+    for name, value in encoded.items():
+        if name in ENUM_PARAMETERS and not isinstance(value, ENUM_PARAMETERS[name]):
+            parameters[str(name)] = ENUM_PARAMETERS[name][value]
+        elif name == 'migrationFunction' and not callable(value):
+            parameters[str(name)] = getattr(migration, value)
+        else:
+            parameters[str(name)] = value
+    return parameters
+
+def parameterKey(parameters, replicate=0):
+
+    '''returns a string identifying a parameter point and replicate, the same for equal points on any host'''
+
+    canonical = json.dumps([encodeParameters(parameters), replicate], sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+def runTrial(parameters):
+
+    '''
+    Description: runs one simulation for a parameter point and returns its data vectors
+
+    Parameters:
+    # parameters: parameter point, encoded or not. An optional entry 'seed' seeds the random number
+        generators of random, numpy.random, and compiled kernels before the simulator is constructed, and
+        turns off threading, so that runs with equal seeds are equal
+
+    Returns: dictionary from names of data vectors ('prosocialProportions', 'populationCounts',
+        'groupCounts', 'stdDeviations', and if recorded 'betweenGroupSelection', 'withinGroupSelection',
+        'groupCompetitionSeconds', 'groupCompetitionEffect', and the names of additional statistics) to lists with an entry per round, beginning with the
+        starting state
+    '''
+
+    parameters = decodeParameters(parameters)
+    seed = parameters.pop('seed', None)
+    if seed is not None:
+        random.seed(seed)
+        jit.seed(seed)
+        # threads would interleave their draws from the seeded generators in an order that varies from run to run
+        parameters['threaded'] = False
+    parameters.update(toWriteCSV=False, toPrintDataVecs=False, recordData=True)
+    simulator = EvolutionSimulator(**parameters)
+    simulator.runEvolutionarySimulation()
+    result = {'prosocialProportions': simulator.prosocialProportionsVec,
+              'populationCounts': simulator.populationCountsVec,
+              'groupCounts': simulator.groupCountsVec,
+              'stdDeviations': [float(value) for value in simulator.stdDeviationsVec]}
+    if simulator.recordPriceEquation:
+        result['betweenGroupSelection'] = simulator.betweenGroupSelectionVec
+        result['withinGroupSelection'] = simulator.withinGroupSelectionVec
+    if simulator.groupCompetitionRate > 0:
+        result['groupCompetitionSeconds'] = simulator.groupCompetitionSecondsVec
+        result['groupCompetitionEffect'] = [float(value) for value in simulator.groupCompetitionEffectVec]
+    for name, statisticsVec in zip(simulator.statistics, simulator.statisticsVecs):
+        result[name] = [float(value) for value in statisticsVec]
+    return result
@@ -6,6 +6,22 @@ Modules:
 # individual.py:
     # classes: Individual
     # group.py: SocialGroup
+# vectorized.py:
+    # functions: playSocialGameVectorized, deathAndReproductionVectorized, lifeCycleVectorized,
+        playSocialGameSexualVectorized, deathAndReproductionSexualVectorized, lifeCycleSexualVectorized,
+        playSocialGameStrategiesVectorized, deathAndReproductionStrategiesVectorized,
+        lifeCycleStrategiesVectorized, multinomialSplit, dealCountsToGroups, priceDecomposition,
+        binomialDraws, normalApproximationBound
+# kernels.py:
+    # classes: PayoffKernel, SoberWilsonKernel, PairwiseKernel, PublicGoodsKernel, ReciprocityWithMemoryKernel
+    # functions: helpMatrixFromRules
+# jit.py:
+    # functions: seed, lifeCycleCounts, dealCounts, biasedRedistributionCounts, aliasTable
+# streams.py:
+    # classes: SynchronizedRandom, AntitheticRandom
+    # functions: random, randint, choice, shuffle, useGenerator, useDefaultGenerator, deriveSeed
+# compositions.py:
+    # functions: offspringDistribution, lifeCycleHistogram, dealHistogram, histogramCounts
     
 Created: Spring 2017
 
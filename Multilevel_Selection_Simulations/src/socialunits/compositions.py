@@ -0,0 +1,194 @@
+'''
+Module description:
+    defines functions that run the default life cycle of socialunits.group.SocialGroup,
+    and random redistribution, on a histogram of groups by composition rather than on the
+    groups themselves. A histogram is an integer array whose entry [p, s] is the number of
+    groups with p prosocial and s selfish members. Groups of equal composition have
+    identically distributed progeny, so the exact distribution of the progeny of one group
+    of each composition is computed once (and cached by the caller), after which the
+    progeny compositions of all groups of a class are a single multinomial draw. Since
+    groups of a target size take only a few dozen compositions, the cost of a round
+    depends on the number of distinct compositions rather than on the numbers of groups
+    or individuals
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from enums import Phenotype, ProsocialityType
+import math
+import numpy
+
+def _binomialPmf(n, probability):
+
+    '''returns array of length n + 1 of the probabilities of 0 to n successes in n trials'''
+
+    if probability <= 0.0 or n == 0:
+        return numpy.eye(1, n + 1, 0)[0]
+    if probability >= 1.0:
+        return numpy.eye(1, n + 1, n)[0]
+    successes = numpy.arange(n + 1)
+    logCoefficients = numpy.array([math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1) for k in successes])
+    return numpy.exp(logCoefficients + successes * math.log(probability) + (n - successes) * math.log(1 - probability))
+
+def _sumPmf(*pmfs):
+
+    '''returns the distribution of the sum of independent counts with the given distributions'''
+
+    result = numpy.ones(1)
+    for pmf in pmfs:
+        result = numpy.convolve(result, pmf)
+    return result
+
+def offspringDistribution(prosocialCount, selfishCount, prosocialPhenotype, mutationRate=0.0, **kwargs):
+
+    '''
+    Description: computes the exact joint distribution of the counts of prosocial and selfish progeny of a
+        group of given composition under the default social game and death and reproduction of
+        socialunits.group.SocialGroup, as sampled by socialunits.vectorized.lifeCycleVectorized. Given the
+        number of prosocial individuals' picks that land on prosocial groupmates, the progeny of the two
+        phenotypes are independent sums of binomial counts, and mutation then exchanges binomial numbers of
+        progeny between them
+
+    Parameters:
+    # prosocialCount, selfishCount: composition of group
+    # prosocialPhenotype: socialunits.enums.Phenotype.altruistic or reciprocating
+    # mutationRate: probability that an offspring has the opposite phenotype of its parent
+
+    Keyword args: typeProsociality, baseReproductionChances, baseReproductionProbability, costOfProsociality,
+        extraReproductionProbability, as for socialunits.vectorized.lifeCycleVectorized
+
+    Returns: float array pmf whose entry [p, s] is the probability that the progeny number p prosocial and s
+        selfish individuals
+
+    Errors:
+    # TypeError: raised if typeProsociality not of type socialunits.enums.ProsocialityType
+    '''
+
+    typeProsociality = kwargs['typeProsociality']
+    if not isinstance(typeProsociality, ProsocialityType):
+        raise TypeError('typeProsociality must of type socialunits.enums.ProsocialityType')
+    baseChances = kwargs['baseReproductionChances']
+    baseProbability = min(max(kwargs['baseReproductionProbability'], 0.0), 1.0)
+    costlyProbability = min(max(kwargs['baseReproductionProbability'] - kwargs['costOfProsociality'], 0.0), 1.0)
+    extraProbability = kwargs['extraReproductionProbability']
+
+    size = prosocialCount + selfishCount
+    players = prosocialCount if size > 1 else 0
+    if typeProsociality == ProsocialityType.strong:
+        probProsocialPick = (prosocialCount - 1) / float(max(size - 1, 1))
+    else:
+        probProsocialPick = prosocialCount / float(max(size, 1))
+    maxProsocial = prosocialCount * baseChances + players
+    maxSelfish = selfishCount * baseChances + players
+    pmf = numpy.zeros((maxProsocial + 1, maxSelfish + 1))
+    for prosocialPicks, pickProbability in enumerate(_binomialPmf(players, min(max(probProsocialPick, 0.0), 1.0))):
+        if pickProbability == 0.0:
+            continue
+        if prosocialPhenotype == Phenotype.reciprocating:
+            costPayers, extraChancesProsocial, extraChancesSelfish = prosocialPicks, prosocialPicks, 0
+        else:
+            costPayers, extraChancesProsocial, extraChancesSelfish = players, prosocialPicks, players - prosocialPicks
+        prosocialProgeny = _sumPmf(_binomialPmf(costPayers * baseChances, costlyProbability),
+                                   _binomialPmf((prosocialCount - costPayers) * baseChances, baseProbability),
+                                   _binomialPmf(extraChancesProsocial, extraProbability))
+        selfishProgeny = _sumPmf(_binomialPmf(selfishCount * baseChances, baseProbability),
+                                 _binomialPmf(extraChancesSelfish, extraProbability))
+        pmf[:len(prosocialProgeny), :len(selfishProgeny)] += pickProbability * numpy.outer(prosocialProgeny, selfishProgeny)
+
+    if mutationRate > 0:
+        mutated = numpy.zeros((maxProsocial + maxSelfish + 1, maxProsocial + maxSelfish + 1))
+        for prosocialProgeny, selfishProgeny in zip(*numpy.nonzero(pmf)):
+            # distribution of prosocial progeny after mutation: prosocial non-mutants plus selfish mutants
+            prosocialAfter = _sumPmf(_binomialPmf(prosocialProgeny, 1 - mutationRate), _binomialPmf(selfishProgeny, mutationRate))
+            total = prosocialProgeny + selfishProgeny
+            mutated[numpy.arange(total + 1), total - numpy.arange(total + 1)] += pmf[prosocialProgeny, selfishProgeny] * prosocialAfter
+        pmf = mutated
+    return pmf
+
+def lifeCycleHistogram(histogram, distributions):
+
+    '''
+    Description: runs the life cycle of every group of a histogram, drawing the progeny compositions of the
+        groups of each composition class as one multinomial over the class's offspring distribution
+
+    Parameters:
+    # histogram: integer array, entry [p, s] the number of groups of p prosocial and s selfish members
+    # distributions: function from (prosocialCount, selfishCount) to the offspring distribution of a group
+        of that composition (see offspringDistribution), typically cached
+
+    Returns: integer histogram of the compositions of the progeny of every group
+    '''
+
+    classes = zip(*numpy.nonzero(histogram))
+    pmfs = [distributions(prosocialCount, selfishCount) for prosocialCount, selfishCount in classes]
+    progenyHistogram = numpy.zeros((max([pmf.shape[0] for pmf in pmfs] + [1]), max([pmf.shape[1] for pmf in pmfs] + [1])),
+                                   dtype=numpy.int64)
+    for (prosocialCount, selfishCount), pmf in zip(classes, pmfs):
+        probabilities = pmf.ravel() / pmf.sum()
+        outcomes = numpy.random.multinomial(histogram[prosocialCount, selfishCount], probabilities).reshape(pmf.shape)
+        progenyHistogram[:pmf.shape[0], :pmf.shape[1]] += outcomes
+    return progenyHistogram
+
+def _dealEqualGroups(prosocialTotal, numGroups, groupSize):
+
+    '''returns array of numbers of groups with 0 to groupSize prosocial members, when prosocialTotal prosocial
+    individuals are dealt uniformly at random, with the rest of the population, into numGroups groups of
+    groupSize members'''
+
+    if numGroups == 0 or groupSize == 0:
+        return numpy.eye(1, groupSize + 1, 0)[0].astype(numpy.int64) * numGroups
+    proportion = prosocialTotal / float(numGroups * groupSize)
+    pmf = _binomialPmf(groupSize, proportion)
+    if proportion in (0.0, 1.0):
+        return (pmf * numGroups).astype(numpy.int64)
+    '''the groups' prosocial counts are exchangeable, and distributed as independent binomial counts conditioned
+    on their sum, so the histogram is a multinomial draw over the binomial distribution conditioned on its
+    total. Draws are made in batches of about the reciprocal of the probability of hitting the total'''
+    batchSize = int(3 * math.sqrt(2 * math.pi * numGroups * groupSize * proportion * (1 - proportion))) + 1
+    prosocialCounts = numpy.arange(groupSize + 1)
+    while True:
+        draws = numpy.random.multinomial(numGroups, pmf / pmf.sum(), size=batchSize)
+        accepted = numpy.nonzero(draws.dot(prosocialCounts) == prosocialTotal)[0]
+        if len(accepted) > 0:
+            return draws[accepted[0]]
+
+def dealHistogram(prosocialTotal, selfishTotal, numGroups):
+
+    '''
+    Description: randomly deals a pooled population into numGroups groups whose sizes differ by at most one,
+        as simulation.evo_simulator.EvolutionSimulator's random assignment to groups, and returns the histogram
+        of the groups' compositions. The population is split between the larger and the smaller groups by a
+        hypergeometric draw, and the histogram of each size by a conditioned multinomial draw, so the cost grows
+        only with the square root of the number of groups
+
+    Parameters:
+    # prosocialTotal, selfishTotal: counts of the pooled population
+    # numGroups: number of groups
+
+    Returns: integer histogram, entry [p, s] the number of groups of p prosocial and s selfish members
+    '''
+
+    populationCount = prosocialTotal + selfishTotal
+    groupSize, remainder = divmod(populationCount, max(numGroups, 1))
+    histogram = numpy.zeros((groupSize + 2, groupSize + 2), dtype=numpy.int64)
+    prosocialLarge = (numpy.random.hypergeometric(prosocialTotal, selfishTotal, remainder * (groupSize + 1))
+                      if remainder > 0 and prosocialTotal > 0 and selfishTotal > 0 else
+                      remainder * (groupSize + 1) if selfishTotal == 0 else 0)
+    for size, count, prosocial in [(groupSize + 1, remainder, prosocialLarge),
+                                   (groupSize, numGroups - remainder, prosocialTotal - prosocialLarge)]:
+        prosocialCounts = numpy.arange(size + 1)
+        histogram[prosocialCounts, size - prosocialCounts] += _dealEqualGroups(prosocial, count, size)
+    return histogram
+
+def histogramCounts(histogram):
+
+    '''returns tuple of arrays (prosocialCounts, selfishCounts, groupCounts) of the composition classes present
+    in a histogram and the numbers of groups in them'''
+
+    prosocialCounts, selfishCounts = numpy.nonzero(histogram)
+    return prosocialCounts, selfishCounts, histogram[prosocialCounts, selfishCounts]
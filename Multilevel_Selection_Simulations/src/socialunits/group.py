@@ -9,7 +9,7 @@ Course: COSI 210a, Independent study with Professor Jordan Pollack
 '''
 
 from enums import Phenotype, ReproductionType, ProsocialityType
-from random import randint, choice
+import streams
 from individual import Individual
 
 class SocialGroup():
@@ -34,6 +34,7 @@ class SocialGroup():
     # size(): returns number of individuals in group
     # addMember(member): adds new individual to group
     # addMember(member): adds iterable of new individuals to group
+    # removeRandomMembers(count): removes and returns count randomly chosen individuals
     # proportionProsocial(): returns proportion of prosocial individuals in group, a real value 
         in range [0,1]
     # playSocialGame(**kwargs): executes a social game in which group members interact
@@ -114,7 +115,34 @@ class SocialGroup():
         
         for member in newMembers:
             self.addMember(member)
-    
+
+    def removeRandomMembers(self, count):
+
+        '''
+        Description: removes count randomly chosen individuals from group and returns them
+            as a list. Each removal swaps a random member with the last member and pops it, so
+            cost is proportional to count rather than to group size. Decrements counts of
+            prosocial and selfish individuals accordingly
+
+        Parameters:
+        # count: number of individuals to remove. Values greater than group size remove
+            every member
+
+        Returns: list of removed instances of socialunits.individual.Individual
+        '''
+
+        removed = []
+        for _ in range(min(count, self.size())):
+            randomIndex = streams.randint(0, self.size() - 1)
+            self.members[randomIndex], self.members[-1] = self.members[-1], self.members[randomIndex]
+            member = self.members.pop()
+            if member.phenotype == Phenotype.selfish:
+                self.countSelfish -= 1
+            else:
+                self.countProsocial -= 1
+            removed.append(member)
+        return removed
+
     def proportionProsocial(self):
         
         '''
@@ -159,7 +187,8 @@ class SocialGroup():
             Unselfish Behavior" by Elliott Sober and David Sloan Wilson, London: Harvard University Press, 1998, pg 19-21.
             
         Description, default implementation of _playGameSexual:
-            --not yet implemented--
+            Identical to that of _playGameAsexual, since the game depends only on phenotypes (genotypes AA 
+            and Aa are altruistic, aa selfish)
         
         Parameters, generally:
             # **kwargs: key words args are used to provide maximum flexibility
@@ -173,7 +202,7 @@ class SocialGroup():
                 reproduction phase
                 
         Keyword args, default implementation of _playGameSexual:
-            --not yet implemented--
+            same as for _playGameAsexual
         
         Errors:
         # TypeError: raised if prosocialityType not of type socialunits.enums.ProsocialityType 
@@ -196,7 +225,7 @@ class SocialGroup():
             for memberIndex, member in enumerate(self.members):
                 if member.phenotype == Phenotype.altruistic:                
                     beneficiary = (self._randomOther(memberIndex) if typeProsociality == ProsocialityType.strong
-                                   else choice(self.members))
+                                   else streams.choice(self.members))
                     beneficiary.extraReproductionChances += 1                    
                     member.prosocialCostIncurred += kwargs['costOfProsociality']
                 # selfish members do not act in this game
@@ -204,7 +233,7 @@ class SocialGroup():
                     pass
                 elif member.phenotype == Phenotype.reciprocating:
                     beneficiary = (self._randomOther(memberIndex) if typeProsociality == ProsocialityType.strong
-                                  else choice(self.members)) 
+                                  else streams.choice(self.members)) 
                     if beneficiary.phenotype == Phenotype.reciprocating:
                         beneficiary.extraReproductionChances += 1
                         member.prosocialCostIncurred += kwargs['costOfProsociality']
@@ -214,17 +243,18 @@ class SocialGroup():
         '''selects and returns a random individual from members excluding individual at memberIndex'''
         
         # randomIndex gets the index of a randomly selected groupmate
-        randomIndex = randint(0, self.size() - 2)
+        randomIndex = streams.randint(0, self.size() - 2)
         # index adjusted to disallow selection of one's own index
         if randomIndex >= memberIndex:
             randomIndex += 1
         return self.members[randomIndex]
 
-    def _playGameSexual(self):
+    def _playGameSexual(self, **kwargs):
         
         '''subsidiary method of playSocialGame. Called for sexually reproducing group'''
         
-        raise RuntimeError('sexual reproduction not yet implemented')
+        # the game depends only on phenotypes, which are determined by genotype
+        self._playGameAsexual(**kwargs)
     
     def deathAndReproduction(self, **kwargs):
         
@@ -247,10 +277,12 @@ class SocialGroup():
             prosocialCostIncurred probability, and then member.extraReproductionChances to produce
             +1 offspring at the probability of extraReproductionProbability each time. ALl produced progeny
             are collected into a list, and then entirely supplant the parent generation. Thus all parents
-            perish in this default implementation.
+            perish in this default implementation, unless generations overlap (see keyword args).
             
-        Description, default implementation of _playGameSexual:
-            --not yet implemented--
+        Description, default implementation of _deathAndReproductionSexual:
+            As for _deathAndReproductionAsexual, except that each attempt at reproduction pairs the member 
+            with a randomly selected other member of the group as mate, and the offspring inherits one 
+            allele from each parent. Members of a group with less than 2 members cannot reproduce
         
         Parameters, generally:
             # **kwargs: key words args are used to provide maximum flexibility
@@ -264,9 +296,14 @@ class SocialGroup():
                 types)
             # extraReproductionProbability: probability of producing +1 offspring for each chance to 
                 reproduce in instance variable extraReproductionChances of Individual class.
+            # prosocialSurvivalProbability, selfishSurvivalProbability: optional, default 0. Probability that 
+                a parent of the phenotype survives to the next round, making generations overlap. Either may 
+                instead be a list of probabilities by age class, entry a the probability that an individual of 
+                age a survives, with individuals older than the list always perishing. Survivors keep their 
+                places in self.members (see _replaceParents)
                 
         Keyword args, default implementation of _deathAndReproductionSexual:
-            --not yet implemented--
+            same as for _deathAndReproductionAsexual
         '''
         
         if self.reproduction == ReproductionType.asexual:
@@ -290,8 +327,47 @@ class SocialGroup():
                     allProgeny.addMember(newProgeny)
         
         '''copy all essential instance variables from allProgeny to self. In this way the 
-           death of the entire parent generation is implicit'''
-        self._supplantGroup(allProgeny)
+           death of the entire parent generation is implicit, unless generations overlap'''
+        self._replaceParents(allProgeny, **kwargs)
+        
+    def _replaceParents(self, progeny, **kwargs):
+        
+        '''
+        Description: replaces the parent generation with progeny, a SocialGroup of the new offspring. If 
+            generations do not overlap (the default), progeny supplants the group. Otherwise each parent 
+            survives with the survival probability of its phenotype and age, and survivors are compacted 
+            in place to the front of self.members, aged by one round and with the outcome of the round's 
+            social game cleared, before the offspring are appended. The members list is thus reused rather 
+            than rebuilt, so long-lived populations pay only for their dead and their newborn
+        
+        Keyword args: prosocialSurvivalProbability, selfishSurvivalProbability, as for deathAndReproduction
+        '''
+        
+        prosocialSurvival = kwargs.get('prosocialSurvivalProbability', 0.0)
+        selfishSurvival = kwargs.get('selfishSurvivalProbability', 0.0)
+        if not (prosocialSurvival or selfishSurvival):
+            self._supplantGroup(progeny)
+            return
+        
+        survivors = 0
+        for member in self.members:
+            survival = selfishSurvival if member.phenotype == Phenotype.selfish else prosocialSurvival
+            if isinstance(survival, (list, tuple)):
+                survival = survival[member.age] if member.age < len(survival) else 0.0
+            if streams.random() < survival:
+                member.age += 1
+                member.prosocialCostIncurred = 0.0
+                member.extraReproductionChances = 0
+                self.members[survivors] = member
+                survivors += 1
+            elif member.phenotype == Phenotype.selfish:
+                self.countSelfish -= 1
+            else:
+                self.countProsocial -= 1
+        del self.members[survivors:]
+        self.members.extend(progeny.members)
+        self.countProsocial += progeny.countProsocial
+        self.countSelfish += progeny.countSelfish
         
     def _supplantGroup(self, supplantingGroup):
         
@@ -318,7 +394,20 @@ class SocialGroup():
         self.countProsocial = supplantingGroup.countProsocial
         self.countSelfish = supplantingGroup.countSelfish
         
-    def _deathAndReproductionSexual(self):
+    def _deathAndReproductionSexual(self, **kwargs):
         
         '''subsidiary method of deathAndReproduction. Called for sexually reproducing group'''
-        raise RuntimeError('Sexual Reproduction not yet implemented')
+        
+        allProgeny = SocialGroup(self.reproduction)
+        if self.size() > 1:
+            for memberIndex, member in enumerate(self.members):
+                for _ in range(kwargs['baseReproductionChances']):
+                    newProgeny = member.attemptReproduction(kwargs['baseReproductionProbability'] - member.prosocialCostIncurred,
+                                                            self._randomOther(memberIndex))
+                    if not newProgeny == None:
+                        allProgeny.addMember(newProgeny)
+                for _ in range(member.extraReproductionChances):
+                    newProgeny = member.attemptReproduction(kwargs['extraReproductionProbability'], self._randomOther(memberIndex))
+                    if not newProgeny == None:
+                        allProgeny.addMember(newProgeny)
+        self._replaceParents(allProgeny, **kwargs)
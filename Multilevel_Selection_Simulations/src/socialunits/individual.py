@@ -9,7 +9,7 @@ Course: COSI 210a, Independent study with Professor Jordan Pollack
 '''
 
 from enums import ReproductionType, Phenotype, Genotype
-from random import random
+import streams
     
 class Individual:
    
@@ -28,6 +28,8 @@ class Individual:
     # self.extraReproductionChances: number of reproduction opportunities gained beyond 
         base number of reproduction opportunities (comes into play for methods 
         playSocialGame and deathAndReproduction of class simulation.group.SocialGroup)
+    # self.age: number of rounds of death and reproduction the individual has survived (nonzero
+        only with overlapping generations, see socialunits.group.SocialGroup.deathAndReproduction)
     # self.oppositeGenotype: initialized only for asexually reproducing individuals. Represents 
         the only other asexual genotype in play for the population (used for reproduction 
         when mutation rate is positive)
@@ -67,6 +69,7 @@ class Individual:
         self.mutationRate=mutationRate
         self.prosocialCostIncurred = 0.0
         self.extraReproductionChances = 0
+        self.age = 0
         
         # self.phenotype, self.oppositeGenotype, set via private methods
         if reproduction == ReproductionType.asexual:
@@ -90,7 +93,14 @@ class Individual:
                                'for asexual individuals')  
         
     def _setInstanceVarsSexual(self, genotype):
-        raise RuntimeError('sexual reproduction not implemented yet')
+        if genotype == Genotype.AA or genotype == Genotype.Aa:
+            self.phenotype = Phenotype.altruistic
+        elif genotype == Genotype.aa:
+            self.phenotype = Phenotype.selfish
+        else:
+            raise RuntimeError('genotype must be socialunits.enums.Genotype.AA, '
+                               'socialunits.enums.Genotype.Aa, or socialunits.enums.Genotype.aa '
+                               'for sexual individuals')
     
     def attemptReproduction(self, reproductionProbability=1.0, mate=None):
         
@@ -113,7 +123,7 @@ class Individual:
         if (not mate == None) and self.reproduction == ReproductionType.asexual:
             raise Warning('A mate was inputted as a sexual partner for an asexually reproducing individual') 
         
-        if random() < reproductionProbability:
+        if streams.random() < reproductionProbability:
             return (self._reproduceAsexual() if self.reproduction == ReproductionType.asexual
                     else self._reproduceSexual(mate))
         else:
@@ -127,8 +137,31 @@ class Individual:
         opposite genotype
         '''
         
-        return (Individual(self.genotype, self.reproduction, self.mutationRate) if random() < (1.0-self.mutationRate)
+        return (Individual(self.genotype, self.reproduction, self.mutationRate) if streams.random() < (1.0-self.mutationRate)
                 else Individual(self.oppositeGenotype, self.reproduction, self.mutationRate))
         
     def _reproduceSexual(self, mate):
-        raise RuntimeError('Sexual Reproduction not implemented yet')
\ No newline at end of file
+        
+        '''
+        returns new instance of individual whose genotype is inherited in Mendelian fashion, one allele 
+        transmitted at random from each parent. Each transmitted allele is flipped with probability 
+        self.mutationRate
+        '''
+        
+        if mate == None or not mate.reproduction == ReproductionType.sexual:
+            raise RuntimeError('sexual reproduction requires a sexually reproducing mate')
+        dominantAlleles = self._transmitAllele() + mate._transmitAllele()
+        return Individual(genotypeFromDominantAlleles[dominantAlleles], self.reproduction, self.mutationRate)
+    
+    def _transmitAllele(self):
+        
+        '''returns 1 if a randomly chosen allele, after mutation, is the dominant allele A and 0 otherwise'''
+        
+        dominant = streams.random() < dominantAlleleCounts[self.genotype] / 2.0
+        if streams.random() < self.mutationRate:
+            dominant = not dominant
+        return int(dominant)
+
+# number of dominant alleles (A) carried by each sexual genotype, and the inverse mapping
+dominantAlleleCounts = {Genotype.AA: 2, Genotype.Aa: 1, Genotype.aa: 0}
+genotypeFromDominantAlleles = {2: Genotype.AA, 1: Genotype.Aa, 0: Genotype.aa}
\ No newline at end of file
@@ -0,0 +1,351 @@
+'''
+Module description:
+    defines JIT-compiled kernels for the life cycle and for migration on arrays of group
+    counts, compiled with numba if it is installed. Unlike the functions of
+    socialunits.vectorized, the kernels are plain loops over groups and over the members
+    counted in them, so games that are not expressible as array operations can be written
+    the same way, without the cost of Python loops over instances of
+    socialunits.individual.Individual. The public functions of this module select the
+    compiled kernels automatically when numba is installed, and otherwise fall back to the
+    equivalent numpy functions of socialunits.vectorized (or, for biased redistribution,
+    which has no array form, to the same kernel run as pure Python). numba is an optional
+    dependency. tests.test_jit checks that each kernel matches its counterpart in
+    distribution
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from enums import Phenotype, ReproductionType, ProsocialityType
+from vectorized import lifeCycleVectorized, dealCountsToGroups
+import numpy
+
+try:
+    import numba
+    JIT_AVAILABLE = True
+    jit = numba.njit(cache=True)
+except ImportError:
+    JIT_AVAILABLE = False
+    jit = lambda function: function
+
+@jit
+def _seedKernel(seed):
+    numpy.random.seed(seed)
+
+@jit
+def _lifeCycleKernel(prosocialCounts, selfishCounts, altruistic, strong, baseChances, baseProbability,
+                     costlyProbability, extraProbability, mutationRate):
+
+    '''runs one generation of the default social game and death and reproduction of
+    socialunits.group.SocialGroup member by member, in every group. Within a group, prosocial members
+    are taken to occupy the first positions, so a pick is prosocial if its position is below the count
+    of prosocial members'''
+
+    numGroups = len(prosocialCounts)
+    prosocialProgeny = numpy.zeros(numGroups, dtype=numpy.int64)
+    selfishProgeny = numpy.zeros(numGroups, dtype=numpy.int64)
+    for groupIndex in range(numGroups):
+        prosocial = prosocialCounts[groupIndex]
+        selfish = selfishCounts[groupIndex]
+        size = prosocial + selfish
+
+        # social game: every prosocial member picks a groupmate, if the group has at least 2 members
+        costPayers = 0
+        extraChancesProsocial = 0
+        extraChancesSelfish = 0
+        if size > 1:
+            for memberIndex in range(prosocial):
+                if strong:
+                    pick = numpy.random.randint(0, size - 1)
+                    if pick >= memberIndex:
+                        pick += 1
+                else:
+                    pick = numpy.random.randint(0, size)
+                if pick < prosocial:
+                    costPayers += 1
+                    extraChancesProsocial += 1
+                elif altruistic:
+                    costPayers += 1
+                    extraChancesSelfish += 1
+
+        # death and reproduction: every chance of reproduction succeeds independently
+        offspringProsocial = 0
+        for _ in range(costPayers * baseChances):
+            if numpy.random.random() < costlyProbability:
+                offspringProsocial += 1
+        for _ in range((prosocial - costPayers) * baseChances):
+            if numpy.random.random() < baseProbability:
+                offspringProsocial += 1
+        for _ in range(extraChancesProsocial):
+            if numpy.random.random() < extraProbability:
+                offspringProsocial += 1
+        offspringSelfish = 0
+        for _ in range(selfish * baseChances):
+            if numpy.random.random() < baseProbability:
+                offspringSelfish += 1
+        for _ in range(extraChancesSelfish):
+            if numpy.random.random() < extraProbability:
+                offspringSelfish += 1
+
+        # mutation flips the phenotype of an offspring
+        prosocialMutants = 0
+        selfishMutants = 0
+        if mutationRate > 0:
+            for _ in range(offspringProsocial):
+                if numpy.random.random() < mutationRate:
+                    prosocialMutants += 1
+            for _ in range(offspringSelfish):
+                if numpy.random.random() < mutationRate:
+                    selfishMutants += 1
+        prosocialProgeny[groupIndex] = offspringProsocial - prosocialMutants + selfishMutants
+        selfishProgeny[groupIndex] = offspringSelfish - selfishMutants + prosocialMutants
+    return prosocialProgeny, selfishProgeny
+
+@jit
+def _dealCountsKernel(classTotals, groupSizes):
+
+    '''deals pooled counts per class into groups of given sizes, group by group, with a sequence of
+    hypergeometric draws per group'''
+
+    numClasses = len(classTotals)
+    dealt = numpy.zeros((numClasses, len(groupSizes)), dtype=numpy.int64)
+    remaining = classTotals.copy()
+    for groupIndex in range(len(groupSizes)):
+        draws = groupSizes[groupIndex]
+        # each class is drawn from the pool of itself and the classes after it
+        pool = remaining.sum()
+        for classIndex in range(numClasses - 1):
+            pool -= remaining[classIndex]
+            count = 0
+            if draws > 0 and remaining[classIndex] > 0:
+                count = numpy.random.hypergeometric(remaining[classIndex], pool, draws) if pool > 0 else draws
+            dealt[classIndex, groupIndex] = count
+            remaining[classIndex] -= count
+            draws -= count
+        dealt[numClasses - 1, groupIndex] = draws
+        remaining[numClasses - 1] -= draws
+    return dealt
+
+@jit
+def _biasedRedistributionKernel(prosocialTotal, selfishTotal, numGroups):
+
+    '''assigns a pooled population to numGroups groups as by the assignment of
+    simulation.migration.biasedRedistribution, individual by individual. Popping an individual from the
+    shuffled population is drawing a prosocial individual with probability equal to the proportion of
+    prosocial individuals remaining'''
+
+    prosocialCounts = numpy.zeros(numGroups, dtype=numpy.int64)
+    sizes = numpy.zeros(numGroups, dtype=numpy.int64)
+    remainingProsocial = prosocialTotal
+    remainingSelfish = selfishTotal
+    while remainingProsocial + remainingSelfish > 0:
+        if numGroups > 1:
+            for groupIndex in range(0, numGroups - 1, 2):
+                remaining = remainingProsocial + remainingSelfish
+                if remaining > 1:
+                    group1 = groupIndex
+                    group2 = groupIndex + 1
+                    individ1Prosocial = numpy.random.randint(0, remaining) < remainingProsocial
+                    if individ1Prosocial:
+                        remainingProsocial -= 1
+                    else:
+                        remainingSelfish -= 1
+                    individ2Prosocial = numpy.random.randint(0, remaining - 1) < remainingProsocial
+                    if individ2Prosocial:
+                        remainingProsocial -= 1
+                    else:
+                        remainingSelfish -= 1
+                    if individ1Prosocial and individ2Prosocial:
+                        prosocialCounts[group1] += 1
+                        prosocialCounts[group2] += 1
+                    elif individ1Prosocial or individ2Prosocial:
+                        # the prosocial individual joins the group with the greater prosocial proportion, or
+                        # if either group is empty, the group that has prosocial members
+                        if sizes[group1] == 0 or sizes[group2] == 0:
+                            toGroup1 = prosocialCounts[group1] != 0
+                        else:
+                            toGroup1 = prosocialCounts[group1] * sizes[group2] > prosocialCounts[group2] * sizes[group1]
+                        prosocialCounts[group1 if toGroup1 else group2] += 1
+                    sizes[group1] += 1
+                    sizes[group2] += 1
+                elif remaining == 1:
+                    if remainingProsocial > 0:
+                        remainingProsocial -= 1
+                        prosocialCounts[groupIndex] += 1
+                    else:
+                        remainingSelfish -= 1
+                    sizes[groupIndex] += 1
+        else:
+            prosocialCounts[0] += remainingProsocial
+            sizes[0] += remainingProsocial + remainingSelfish
+            remainingProsocial = 0
+            remainingSelfish = 0
+    return prosocialCounts, sizes - prosocialCounts
+
+@jit
+def _aliasTableKernel(scaledWeights):
+
+    '''builds the acceptance probabilities and aliases of Vose's alias method from weights scaled to
+    average 1. Entries below 1 are topped up from entries above 1, which then take the leftover'''
+
+    numEntries = len(scaledWeights)
+    remaining = scaledWeights.copy()
+    acceptance = numpy.ones(numEntries)
+    alias = numpy.arange(numEntries)
+    small = numpy.empty(numEntries, dtype=numpy.int64)
+    large = numpy.empty(numEntries, dtype=numpy.int64)
+    numSmall = 0
+    numLarge = 0
+    for index in range(numEntries):
+        if remaining[index] < 1.0:
+            small[numSmall] = index
+            numSmall += 1
+        else:
+            large[numLarge] = index
+            numLarge += 1
+    while numSmall > 0 and numLarge > 0:
+        numSmall -= 1
+        smallIndex = small[numSmall]
+        largeIndex = large[numLarge - 1]
+        acceptance[smallIndex] = remaining[smallIndex]
+        alias[smallIndex] = largeIndex
+        remaining[largeIndex] += remaining[smallIndex] - 1.0
+        if remaining[largeIndex] < 1.0:
+            numLarge -= 1
+            small[numSmall] = largeIndex
+            numSmall += 1
+    # entries left over in either list have weight 1 up to rounding error
+    return acceptance, alias
+
+def _useJit(useJit):
+    return JIT_AVAILABLE if useJit is None else useJit and JIT_AVAILABLE
+
+def seed(seedValue):
+
+    '''seeds numpy.random and, if numba is installed, the separate random number generator of compiled
+    kernels'''
+
+    numpy.random.seed(seedValue)
+    if JIT_AVAILABLE:
+        _seedKernel(seedValue)
+
+def lifeCycleCounts(prosocialCounts, selfishCounts, prosocialPhenotype, mutationRate=0.0, generations=1,
+                    onGeneration=None, useJit=None, **kwargs):
+
+    '''
+    Description: as socialunits.vectorized.lifeCycleVectorized, with the same parameters and return value,
+        run by the compiled kernel if numba is installed and useJit is not false
+
+    Keyword args: useJit, default None. If None, the compiled kernel is used if and only if numba is
+        installed. Otherwise as for lifeCycleVectorized. Given a normalApproximationThreshold, lifeCycleVectorized
+        is always used, since its approximate draws already take constant time per group
+
+    Errors:
+    # RuntimeError: raised if reproduction is sexual
+    # TypeError: raised if typeProsociality not of type socialunits.enums.ProsocialityType
+    '''
+
+    if not _useJit(useJit) or kwargs.get('normalApproximationThreshold') is not None:
+        return lifeCycleVectorized(prosocialCounts, selfishCounts, prosocialPhenotype, mutationRate, generations,
+                                   onGeneration, **kwargs)
+    if kwargs['reproduction'] == ReproductionType.sexual:
+        raise RuntimeError('sexually reproducing groups are represented by genotype counts; use lifeCycleSexualVectorized')
+    if not isinstance(kwargs['typeProsociality'], ProsocialityType):
+        raise TypeError('typeProsociality must of type socialunits.enums.ProsocialityType')
+    baseProbability = kwargs['baseReproductionProbability']
+    costlyProbability = min(max(baseProbability - kwargs['costOfProsociality'], 0.0), 1.0)
+    prosocialCounts = numpy.asarray(prosocialCounts, dtype=numpy.int64)
+    selfishCounts = numpy.asarray(selfishCounts, dtype=numpy.int64)
+    for generation in range(generations):
+        prosocialCounts, selfishCounts = _lifeCycleKernel(
+            prosocialCounts, selfishCounts, prosocialPhenotype == Phenotype.altruistic,
+            kwargs['typeProsociality'] == ProsocialityType.strong, int(kwargs['baseReproductionChances']),
+            min(max(baseProbability, 0.0), 1.0), costlyProbability, float(kwargs['extraReproductionProbability']),
+            float(mutationRate))
+        if onGeneration is not None and generation < generations - 1:
+            onGeneration(prosocialCounts, selfishCounts)
+    return prosocialCounts, selfishCounts
+
+def dealCounts(classTotals, groupSizes, useJit=None):
+
+    '''as socialunits.vectorized.dealCountsToGroups, run by the compiled kernel if numba is installed and
+    useJit is not false'''
+
+    if not _useJit(useJit):
+        return dealCountsToGroups(classTotals, groupSizes)
+    return _dealCountsKernel(numpy.asarray(classTotals, dtype=numpy.int64), numpy.asarray(groupSizes, dtype=numpy.int64))
+
+def biasedRedistributionCounts(prosocialTotal, selfishTotal, numGroups, useJit=None):
+
+    '''
+    Description: assigns a pooled population of prosocial and selfish individuals to numGroups groups,
+        equal in distribution to the assignment of simulation.migration.biasedRedistribution. As there, if
+        numGroups is odd, the last group receives at most the one individual left over from a pass over
+        the pairs of groups. Run compiled if numba is installed and useJit is not false, and otherwise as
+        pure Python, which is still much faster than assigning instances of Individual
+
+    Returns: tuple of integer arrays (prosocialCounts, selfishCounts), one entry per group
+    '''
+
+    kernel = _biasedRedistributionKernel
+    if JIT_AVAILABLE and not _useJit(useJit):
+        kernel = kernel.py_func
+    return kernel(int(prosocialTotal), int(selfishTotal), int(numGroups))
+
+def aliasTable(weights, useJit=None):
+
+    '''
+    Description: builds the table of Vose's alias method for sampling indices with probability proportional
+        to weights, in time linear in the number of weights. Run compiled if numba is installed and useJit is
+        not false, and otherwise as pure Python. Indices are then sampled in constant time each, e.g. by
+        simulation.group_competition.sampleAliasTable
+
+    Parameters:
+    # weights: array_like of nonnegative weights, not all zero
+
+    Returns: tuple of arrays (acceptance, alias): index i, drawn uniformly, is kept with probability
+        acceptance[i] and otherwise replaced by alias[i]
+    '''
+
+    weights = numpy.asarray(weights, dtype=float)
+    kernel = _aliasTableKernel
+    if JIT_AVAILABLE and not _useJit(useJit):
+        kernel = kernel.py_func
+    return kernel(weights * (len(weights) / weights.sum()))
+
+if __name__ == '__main__':
+
+    '''use main for testing/debugging. Times the compiled kernels against their numpy and pure
+    Python counterparts; tests.test_jit checks that they are equal in distribution'''
+
+    from time import time
+
+    print('numba installed: ' + str(JIT_AVAILABLE))
+    seed(1)
+
+    kwargs = dict(reproduction=ReproductionType.asexual, typeProsociality=ProsocialityType.strong, costOfProsociality=.1,
+                  baseReproductionChances=1, baseReproductionProbability=.8, extraReproductionProbability=.5)
+
+    # benchmarks, after compiling the kernels on a small input
+    lifeCycleCounts(numpy.array([6]), numpy.array([4]), Phenotype.altruistic, useJit=True, **kwargs)
+    dealCounts([2, 1], numpy.array([1, 2]), useJit=True)
+    biasedRedistributionCounts(2, 1, 2, useJit=True)
+    prosocialCounts = numpy.random.binomial(10, .5, 10 ** 6)
+    selfishCounts = 10 - prosocialCounts
+    for useJit in (False, True):
+        startTime = time()
+        lifeCycleCounts(prosocialCounts, selfishCounts, Phenotype.altruistic, useJit=useJit, **kwargs)
+        lifeCycleTime = time() - startTime
+        startTime = time()
+        dealCounts([prosocialCounts.sum(), selfishCounts.sum()], numpy.full(10 ** 6, 10), useJit=useJit)
+        dealTime = time() - startTime
+        startTime = time()
+        biasedRedistributionCounts(prosocialCounts.sum() // 10, selfishCounts.sum() // 10, 10 ** 5, useJit=useJit)
+        biasedTime = time() - startTime
+        print(('compiled' if useJit else 'numpy/pure Python') + ', 10^6 groups of 10: life cycle ' + str(round(lifeCycleTime, 3)) +
+              's, dealing ' + str(round(dealTime, 3)) + 's; biased redistribution of 10^6 individuals ' +
+              str(round(biasedTime, 3)) + 's')
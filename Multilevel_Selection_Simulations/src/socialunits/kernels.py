@@ -0,0 +1,161 @@
+'''
+Module description:
+    defines payoff kernels, which play a social game in every group at once on a
+    (K, number of groups) array of strategy counts (see socialunits.vectorized). A game
+    is declared by per-strategy rules of who benefits whom and at what cost, which the
+    kernel's constructor compiles into arrays, so that playing the game is a few numpy
+    operations over all groups rather than a loop over members. Every kernel's play
+    method returns (costPayers, extraChances), the input expected by
+    socialunits.vectorized.deathAndReproductionStrategiesVectorized. SoberWilsonKernel
+    is the reference kernel, equal in distribution to the default game of
+    socialunits.group.SocialGroup, which tests.test_kernels checks
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from enums import Phenotype, ProsocialityType
+from vectorized import playSocialGameVectorized, playSocialGameStrategiesVectorized, multinomialSplit
+import numpy
+
+class PayoffKernel:
+
+    '''
+    Description: base class of payoff kernels. Subclasses implement play
+
+    Public methods:
+    # play(strategyCounts, **kwargs): plays the game in every group. strategyCounts is an integer array
+        of shape (K, number of groups). Returns tuple of integer arrays (costPayers, extraChances), each of
+        shape (K, number of groups): the number of individuals of each strategy per group who incurred the
+        cost of prosociality, and the number of extra reproduction chances granted to each strategy per group
+    '''
+
+    def play(self, strategyCounts, **kwargs):
+        raise RuntimeError('play must be implemented by subclasses of PayoffKernel')
+
+class SoberWilsonKernel(PayoffKernel):
+
+    '''
+    Description: reference kernel, the default game of socialunits.group.SocialGroup (see
+        SocialGroup.playSocialGame) for two strategies ordered (prosocial, selfish)
+
+    Constructor method signature: __init__(self, prosocialPhenotype=Phenotype.altruistic)
+    '''
+
+    def __init__(self, prosocialPhenotype=Phenotype.altruistic):
+        self.prosocialPhenotype = prosocialPhenotype
+
+    def play(self, strategyCounts, **kwargs):
+        costPayers, extraChancesProsocial, extraChancesSelfish = playSocialGameVectorized(
+            strategyCounts[0], strategyCounts[1], self.prosocialPhenotype, **kwargs)
+        return (numpy.vstack([costPayers, numpy.zeros_like(costPayers)]),
+                numpy.vstack([extraChancesProsocial, extraChancesSelfish]))
+
+class PairwiseKernel(PayoffKernel):
+
+    '''
+    Description: each individual picks a random groupmate (excluding itself if prosociality is strong) and
+        helps it with a probability set by the pair of strategies, as in
+        socialunits.vectorized.playSocialGameStrategiesVectorized. With cooperators helping everyone this
+        is the donation-game form of the prisoner's dilemma
+
+    Constructor method signature: __init__(self, helpMatrix)
+    # helpMatrix: K by K array_like, entry [i][j] the probability that strategy i helps strategy j. See
+        helpMatrixFromRules for declaring it by strategy names
+    '''
+
+    def __init__(self, helpMatrix):
+        self.helpMatrix = numpy.asarray(helpMatrix, dtype=float)
+
+    def play(self, strategyCounts, **kwargs):
+        return playSocialGameStrategiesVectorized(strategyCounts, self.helpMatrix, **kwargs)
+
+class PublicGoodsKernel(PayoffKernel):
+
+    '''
+    Description: public goods game. In every group of at least 2 members, each contributor pays the cost of
+        prosociality with probability given by its strategy's contribution probability. The group's
+        contributions, multiplied by multiplier and rounded down, become extra reproduction chances that
+        are each granted to a random member of the group, so they are shared by contributors and
+        non-contributors alike
+
+    Constructor method signature: __init__(self, contributionProbabilities, multiplier=1.0)
+    # contributionProbabilities: list of K probabilities of contributing, one per strategy
+    # multiplier: number of extra reproduction chances produced per contribution
+    '''
+
+    def __init__(self, contributionProbabilities, multiplier=1.0):
+        self.contributionProbabilities = numpy.asarray(contributionProbabilities, dtype=float).reshape(-1, 1)
+        self.multiplier = multiplier
+
+    def play(self, strategyCounts, **kwargs):
+        sizes = strategyCounts.sum(axis=0)
+        players = numpy.where(sizes > 1, strategyCounts, 0)
+        costPayers = numpy.random.binomial(players, self.contributionProbabilities)
+        pooledChances = (costPayers.sum(axis=0) * self.multiplier).astype(numpy.int64)
+        extraChances = multinomialSplit(pooledChances, strategyCounts / numpy.maximum(sizes, 1).astype(float))
+        return costPayers, extraChances
+
+class ReciprocityWithMemoryKernel(PayoffKernel):
+
+    '''
+    Description: pairwise game in which reciprocating strategies remember how often each strategy helped
+        in the previous generation. A reciprocator helps a picked groupmate of strategy j with probability
+        equal to the proportion of strategy j's individuals that helped in the previous generation (1 in the
+        first generation, so reciprocators begin by cooperating). Other strategies help as given by
+        helpMatrix. The memory is held per strategy across the whole population, so it survives migration
+
+    Constructor method signature: __init__(self, helpMatrix, reciprocators)
+    # helpMatrix: K by K array_like of help probabilities for the strategies that are not reciprocators
+    # reciprocators: list of indices of reciprocating strategies
+
+    Instance variables:
+    # helpingRates: array of shape (K,), the proportion of each strategy's individuals that helped in the
+        previous generation
+    '''
+
+    def __init__(self, helpMatrix, reciprocators):
+        self.helpMatrix = numpy.asarray(helpMatrix, dtype=float)
+        self.reciprocators = list(reciprocators)
+        self.helpingRates = numpy.ones(len(self.helpMatrix))
+
+    def play(self, strategyCounts, **kwargs):
+        helpMatrix = self.helpMatrix.copy()
+        helpMatrix[self.reciprocators] = self.helpingRates
+        costPayers, extraChances = playSocialGameStrategiesVectorized(strategyCounts, helpMatrix, **kwargs)
+        strategyTotals = strategyCounts.sum(axis=1)
+        occupied = strategyTotals > 0
+        self.helpingRates[occupied] = costPayers.sum(axis=1)[occupied] / strategyTotals[occupied].astype(float)
+        return costPayers, extraChances
+
+def helpMatrixFromRules(strategyNames, rules):
+
+    '''
+    Description: compiles per-strategy help rules into a help matrix for PairwiseKernel or
+        ReciprocityWithMemoryKernel
+
+    Parameters:
+    # strategyNames: list of K names of strategies
+    # rules: dictionary from the name of a helping strategy to either a probability of helping any
+        groupmate, or a dictionary from names of helped strategies to probabilities. Strategies not in
+        rules never help
+
+    Returns: array of shape (K, K)
+
+    Example: helpMatrixFromRules(['altruistic', 'selfish', 'reciprocating'],
+        {'altruistic': 1.0, 'reciprocating': {'reciprocating': 1.0}}) returns the matrix of the default game
+    '''
+
+    strategyIndices = dict((name, index) for index, name in enumerate(strategyNames))
+    helpMatrix = numpy.zeros((len(strategyNames), len(strategyNames)))
+    for actor, rule in rules.items():
+        if isinstance(rule, dict):
+            for recipient, probability in rule.items():
+                helpMatrix[strategyIndices[actor], strategyIndices[recipient]] = probability
+        else:
+            helpMatrix[strategyIndices[actor]] = rule
+    return helpMatrix
@@ -0,0 +1,102 @@
+'''
+Module description:
+    defines the source of the random draws made by socialunits.individual.Individual,
+    socialunits.group.SocialGroup, and the migration functions of simulation.migration.
+    The module-level functions random, randint, choice, and shuffle are those of the
+    random module by default, and are rebound by useGenerator to the methods of another
+    generator, such as a SynchronizedRandom, reseeded at fixed points of a simulation so that
+    runs of different parameter points draw from synchronized streams (common random
+    numbers), or an AntitheticRandom, which also reflects every uniform draw
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+import hashlib
+import random as _random
+
+class SynchronizedRandom(_random.Random):
+
+    '''
+    Description: random number generator whose shuffles stay aligned between runs whose sequences differ
+        in a few items. random.Random.shuffle swaps items by position, so one extra item changes the
+        whole permutation. Instead, the items of every class (e.g. phenotype) draw uniform keys, in order,
+        from a stream of their own seeded by the generator's seed and the class, and the sequence is
+        sorted by key. Any sequence ordered alike yields a uniformly random permutation either way
+
+    Parameters/instance variables:
+    # classOf: optional, default None. Function from an item to the label of its class. If None, all
+        items are of one class
+    '''
+
+    def __init__(self, classOf=None):
+        _random.Random.__init__(self)
+        self.classOf = classOf
+
+    def seed(self, a=None):
+        _random.Random.seed(self, a)
+        self.shuffleSeed = a
+
+    def _keyStream(self, label):
+        return _random.Random(deriveSeed(self.shuffleSeed, 'shuffle', label))
+
+    def shuffle(self, x, random=None):
+        keyStreams = {}
+        keys = []
+        for item in x:
+            label = self.classOf(item) if self.classOf is not None else None
+            if label not in keyStreams:
+                keyStreams[label] = self._keyStream(label)
+            keys.append(keyStreams[label].random())
+        x[:] = [item for _, _, item in sorted(zip(keys, range(len(x)), x))]
+
+class AntitheticRandom(SynchronizedRandom):
+
+    '''
+    Description: synchronized random number generator whose uniform draws, including the keys of
+        shuffles, are 1 - u for the draws u of a SynchronizedRandom with the same seed. Python 2's
+        randint and choice draw through random(), so a run using this generator is the antithetic
+        counterpart of a run with the same seed using SynchronizedRandom: every event that was likely
+        in one is unlikely in the other, and shuffles are reversed
+    '''
+
+    def random(self):
+        draw = _random.Random.random(self)
+        # 1 - 0 would index past the end of a sequence
+        return 1.0 - draw if draw else 0.0
+
+    def _keyStream(self, label):
+        keyStream = AntitheticRandom()
+        keyStream.seed(deriveSeed(self.shuffleSeed, 'shuffle', label))
+        return keyStream
+
+def useGenerator(generator):
+
+    '''rebinds the module-level functions random, randint, choice, and shuffle to the methods of
+    generator (an instance of random.Random or a subclass)'''
+
+    global random, randint, choice, shuffle
+    random = generator.random
+    randint = generator.randint
+    choice = generator.choice
+    shuffle = generator.shuffle
+
+def useDefaultGenerator():
+
+    '''rebinds the module-level functions to those of the random module, so that random.seed seeds them'''
+
+    useGenerator(_random._inst)
+
+def deriveSeed(*labels):
+
+    '''returns a seed in [0, 2**32) for the stream identified by labels (e.g. a base seed, a round, and
+    the name of a phase of the round), unrelated to the seeds of streams with other labels'''
+
+    key = '/'.join(str(label) for label in labels)
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16)
+
+useDefaultGenerator()
@@ -0,0 +1,543 @@
+'''
+Module description:
+    defines functions that run the default life cycle of socialunits.group.SocialGroup
+    on many groups at once. Each group is represented only by its count of prosocial and
+    its count of selfish individuals, held in parallel numpy arrays (one entry per group),
+    and every step is a single binomial draw over all groups. Outcomes are equal in
+    distribution to those of SocialGroup's default _playGameAsexual and
+    _deathAndReproductionAsexual, but no instances of socialunits.individual.Individual
+    are created. Sexually reproducing groups are represented by a 2-D array of genotype
+    counts, one row each for AA, Aa, and aa, and one column per group, from which the
+    counts of alleles per group follow. Populations of any number K of strategies are
+    likewise represented by a (K, number of groups) array of strategy counts, with the
+    social game given by a matrix of help probabilities between strategies
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from enums import Phenotype, ReproductionType, ProsocialityType
+import numpy
+
+# constant of the Berry-Esseen bound on the distance between the distribution functions of a sum of
+# independent, identically distributed trials and of the normal distribution of equal mean and variance
+BERRY_ESSEEN_CONSTANT = 0.4748
+
+def binomialDraws(trials, probability, normalThreshold=None):
+
+    '''
+    Description: draws binomial counts of successes, as numpy.random.binomial. If normalThreshold is not None,
+        the counts whose expected numbers of successes and of failures are both at least normalThreshold are
+        instead drawn from the normal distribution of equal mean and variance, rounded to the nearest count
+        and clipped to [0, trials], whose cost does not grow with the number of trials. Smaller counts are
+        drawn exactly. The distribution function of every approximated count is within
+        normalApproximationBound(normalThreshold) of that of the exact binomial count
+
+    Parameters:
+    # trials: integer array of numbers of trials
+    # probability: probability of success, a number or an array of the shape of trials
+    # normalThreshold: optional, default None. See description
+
+    Returns: integer array of counts of successes
+    '''
+
+    if normalThreshold is None:
+        return numpy.random.binomial(trials, probability)
+    trials = numpy.asarray(trials, dtype=numpy.int64)
+    probability = numpy.broadcast_to(numpy.asarray(probability, dtype=float), trials.shape)
+    means = trials * probability
+    approximated = (means >= normalThreshold) & (trials - means >= normalThreshold)
+    draws = numpy.empty(trials.shape, dtype=numpy.int64)
+    draws[~approximated] = numpy.random.binomial(trials[~approximated], probability[~approximated])
+    means = means[approximated]
+    deviations = numpy.sqrt(means * (1 - probability[approximated]))
+    normalDraws = numpy.rint(means + deviations * numpy.random.standard_normal(len(means)))
+    draws[approximated] = numpy.clip(normalDraws, 0, trials[approximated])
+    return draws
+
+def normalApproximationBound(normalThreshold):
+
+    '''returns the Berry-Esseen bound on the distance between the distribution functions of a binomial count
+    and of the normal distribution that approximates it in binomialDraws, given normalThreshold. Expected numbers
+    of successes and failures of at least normalThreshold imply a variance of at least normalThreshold / 2'''
+
+    return BERRY_ESSEEN_CONSTANT / numpy.sqrt(normalThreshold / 2.0)
+
+def playSocialGameVectorized(prosocialCounts, selfishCounts, prosocialPhenotype, **kwargs):
+
+    '''
+    Description: plays the default social game of socialunits.group.SocialGroup in every group.
+        Each prosocial individual picks a random groupmate (excluding itself if prosociality is
+        strong), so the number of picks landing on prosocial groupmates is binomial. Altruists
+        always benefit the pick and always pay the cost; reciprocators benefit, and pay, only
+        when the pick is also a reciprocator. Groups with fewer than 2 members do not play
+
+    Parameters:
+    # prosocialCounts, selfishCounts: integer arrays of counts per group
+    # prosocialPhenotype: socialunits.enums.Phenotype.altruistic or reciprocating
+
+    Keyword args: typeProsociality, as for SocialGroup.playSocialGame. normalApproximationThreshold, 
+        optional, default None: normalThreshold of binomialDraws, by which large counts are approximated
+
+    Returns: tuple of integer arrays (costPayers, extraChancesProsocial, extraChancesSelfish),
+        respectively the number of prosocial individuals per group who incurred the cost of
+        prosociality, and the number of extra reproduction chances granted per group to
+        prosocial and to selfish individuals
+
+    Errors:
+    # TypeError: raised if typeProsociality not of type socialunits.enums.ProsocialityType
+    '''
+
+    typeProsociality = kwargs['typeProsociality']
+    if not isinstance(typeProsociality, ProsocialityType):
+        raise TypeError('typeProsociality must of type socialunits.enums.ProsocialityType')
+
+    sizes = prosocialCounts + selfishCounts
+    players = numpy.where(sizes > 1, prosocialCounts, 0)
+    # probability that a prosocial individual's pick is itself prosocial
+    if typeProsociality == ProsocialityType.strong:
+        probProsocialPick = (prosocialCounts - 1) / numpy.maximum(sizes - 1, 1).astype(float)
+    else:
+        probProsocialPick = prosocialCounts / numpy.maximum(sizes, 1).astype(float)
+    prosocialPicks = binomialDraws(players, numpy.clip(probProsocialPick, 0.0, 1.0), kwargs.get('normalApproximationThreshold'))
+
+    if prosocialPhenotype == Phenotype.reciprocating:
+        return prosocialPicks, prosocialPicks, numpy.zeros_like(players)
+    return players, prosocialPicks, players - prosocialPicks
+
+def deathAndReproductionVectorized(prosocialCounts, selfishCounts, gameOutcome, mutationRate=0.0, **kwargs):
+
+    '''
+    Description: runs the default death and reproduction phase of socialunits.group.SocialGroup in
+        every group. Offspring from base and extra reproduction chances are binomial draws, mutants
+        among offspring are binomial draws, and all parents perish
+
+    Parameters:
+    # prosocialCounts, selfishCounts: integer arrays of counts per group
+    # gameOutcome: tuple returned by playSocialGameVectorized for the same counts
+    # mutationRate: probability that an offspring has the opposite phenotype of its parent
+
+    Keyword args: baseReproductionChances, baseReproductionProbability, costOfProsociality,
+        extraReproductionProbability, as for SocialGroup.deathAndReproduction and
+        SocialGroup.playSocialGame. These, and mutationRate, may also be arrays of values per group,
+        so that groups simulated under different parameters advance together. normalApproximationThreshold, 
+        optional, default None: normalThreshold of binomialDraws, by which large counts are approximated
+
+    Returns: tuple of integer arrays (prosocialCounts, selfishCounts) of the progeny per group
+    '''
+
+    costPayers, extraChancesProsocial, extraChancesSelfish = gameOutcome
+    baseChances = kwargs['baseReproductionChances']
+    baseProbability = kwargs['baseReproductionProbability']
+    costlyProbability = numpy.clip(baseProbability - kwargs['costOfProsociality'], 0.0, 1.0)
+    baseProbability = numpy.clip(baseProbability, 0.0, 1.0)
+    extraProbability = kwargs['extraReproductionProbability']
+
+    threshold = kwargs.get('normalApproximationThreshold')
+
+    prosocialProgeny = (binomialDraws(costPayers * baseChances, costlyProbability, threshold) +
+                        binomialDraws((prosocialCounts - costPayers) * baseChances, baseProbability, threshold) +
+                        binomialDraws(extraChancesProsocial, extraProbability, threshold))
+    selfishProgeny = (binomialDraws(selfishCounts * baseChances, baseProbability, threshold) +
+                      binomialDraws(extraChancesSelfish, extraProbability, threshold))
+
+    if numpy.any(numpy.asarray(mutationRate) > 0):
+        prosocialMutants = binomialDraws(prosocialProgeny, mutationRate, threshold)
+        selfishMutants = binomialDraws(selfishProgeny, mutationRate, threshold)
+        prosocialProgeny, selfishProgeny = (prosocialProgeny - prosocialMutants + selfishMutants,
+                                            selfishProgeny - selfishMutants + prosocialMutants)
+    return prosocialProgeny, selfishProgeny
+
+def lifeCycleVectorized(prosocialCounts, selfishCounts, prosocialPhenotype, mutationRate=0.0,
+                        generations=1, onGeneration=None, **kwargs):
+
+    '''
+    Description: runs generations consecutive rounds of social game followed by death and
+        reproduction in every group, with no migration in between
+
+    Parameters:
+    # prosocialCounts, selfishCounts: integer arrays of counts per group
+    # prosocialPhenotype: socialunits.enums.Phenotype.altruistic or reciprocating
+    # mutationRate: probability that an offspring has the opposite phenotype of its parent
+    # generations: number of generations to run
+    # onGeneration: optional callable taking (prosocialCounts, selfishCounts), called after
+        every generation but the last (e.g. to record data between migration events)
+
+    Keyword args: reproduction (member of socialunits.enums.ReproductionType), and as for
+        playSocialGameVectorized and deathAndReproductionVectorized
+
+    Returns: tuple of integer arrays (prosocialCounts, selfishCounts) after the final generation
+
+    Errors:
+    # RuntimeError: raised if reproduction is sexual (see lifeCycleSexualVectorized)
+    '''
+
+    if kwargs['reproduction'] == ReproductionType.sexual:
+        raise RuntimeError('sexually reproducing groups are represented by genotype counts; use lifeCycleSexualVectorized')
+    for generation in range(generations):
+        gameOutcome = playSocialGameVectorized(prosocialCounts, selfishCounts, prosocialPhenotype, **kwargs)
+        prosocialCounts, selfishCounts = deathAndReproductionVectorized(prosocialCounts, selfishCounts, gameOutcome,
+                                                                        mutationRate, **kwargs)
+        if onGeneration is not None and generation < generations - 1:
+            onGeneration(prosocialCounts, selfishCounts)
+    return prosocialCounts, selfishCounts
+
+def playSocialGameSexualVectorized(genotypeCounts, **kwargs):
+
+    '''
+    Description: plays the default social game of socialunits.group.SocialGroup in every sexually
+        reproducing group, where genotypes AA and Aa are altruistic and aa is selfish. As in
+        playSocialGameVectorized, except that the picks of altruists of each genotype are split among
+        the three genotypes by conditional binomial draws (i.e. a multinomial draw per group)
+
+    Parameters:
+    # genotypeCounts: integer array of shape (3, number of groups), rows counting AA, Aa, and aa
+
+    Keyword args: typeProsociality, as for SocialGroup.playSocialGame
+
+    Returns: tuple of integer arrays (costPayers, extraChances), each of shape (3, number of groups),
+        respectively the number of individuals of each genotype per group who incurred the cost of
+        prosociality, and the number of extra reproduction chances granted to each genotype per group
+    '''
+
+    typeProsociality = kwargs['typeProsociality']
+    if not isinstance(typeProsociality, ProsocialityType):
+        raise TypeError('typeProsociality must of type socialunits.enums.ProsocialityType')
+
+    sizes = genotypeCounts.sum(axis=0)
+    costPayers = numpy.zeros_like(genotypeCounts)
+    costPayers[:2] = numpy.where(sizes > 1, genotypeCounts[:2], 0)
+    extraChances = numpy.zeros_like(genotypeCounts)
+    for actor in range(2):
+        # candidate beneficiaries of an actor of this genotype, excluding itself if prosociality is strong
+        candidates = genotypeCounts.astype(float)
+        if typeProsociality == ProsocialityType.strong:
+            candidates[actor] -= 1
+        candidates = numpy.maximum(candidates, 0)
+        remainingPicks = costPayers[actor]
+        remainingCandidates = candidates.sum(axis=0)
+        for target in range(2):
+            picks = numpy.random.binomial(remainingPicks, numpy.clip(candidates[target] / numpy.maximum(remainingCandidates, 1),
+                                                                     0.0, 1.0))
+            extraChances[target] += picks
+            remainingPicks = remainingPicks - picks
+            remainingCandidates = remainingCandidates - candidates[target]
+        extraChances[2] += remainingPicks
+    return costPayers, extraChances
+
+def deathAndReproductionSexualVectorized(genotypeCounts, gameOutcome, mutationRate=0.0, **kwargs):
+
+    '''
+    Description: runs the default death and reproduction phase of socialunits.group.SocialGroup in
+        every sexually reproducing group. The number of successful reproduction attempts by parents of
+        each genotype is binomial as in deathAndReproductionVectorized. Each attempt pairs the parent
+        with a random other member of its group, so the mate's allele is dominant with probability equal
+        to the frequency of the dominant allele among groupmates. Offspring genotypes for the parents
+        of each genotype are then a multinomial draw over AA, Aa, and aa with Mendelian probabilities,
+        after each transmitted allele mutates with probability mutationRate. Groups with less than 2
+        members do not reproduce, and all parents perish
+
+    Parameters:
+    # genotypeCounts: integer array of shape (3, number of groups), rows counting AA, Aa, and aa
+    # gameOutcome: tuple returned by playSocialGameSexualVectorized for the same counts
+    # mutationRate: probability that a transmitted allele is flipped
+
+    Keyword args: as for deathAndReproductionVectorized
+
+    Returns: integer array of shape (3, number of groups) of the genotype counts of progeny per group
+    '''
+
+    costPayers, extraChances = gameOutcome
+    baseChances = kwargs['baseReproductionChances']
+    baseProbability = kwargs['baseReproductionProbability']
+    costlyProbability = min(max(baseProbability - kwargs['costOfProsociality'], 0.0), 1.0)
+    baseProbability = min(max(baseProbability, 0.0), 1.0)
+    extraProbability = kwargs['extraReproductionProbability']
+
+    sizes = genotypeCounts.sum(axis=0)
+    births = (numpy.random.binomial(costPayers * baseChances, costlyProbability) +
+              numpy.random.binomial((genotypeCounts - costPayers) * baseChances, baseProbability) +
+              numpy.random.binomial(extraChances, extraProbability))
+    births[:, sizes < 2] = 0
+
+    dominantAlleles = 2 * genotypeCounts[0] + genotypeCounts[1]
+    progeny = numpy.zeros_like(genotypeCounts)
+    for parent, parentDominantAlleles in enumerate([2, 1, 0]):
+        # probability that the allele transmitted by the parent, and by its mate, is dominant
+        parentAllele = parentDominantAlleles / 2.0
+        mateAllele = (dominantAlleles - parentDominantAlleles) / (2.0 * numpy.maximum(sizes - 1, 1))
+        parentAllele = parentAllele * (1 - mutationRate) + (1 - parentAllele) * mutationRate
+        mateAllele = numpy.clip(mateAllele * (1 - mutationRate) + (1 - mateAllele) * mutationRate, 0.0, 1.0)
+        probAA = parentAllele * mateAllele
+        probAa = parentAllele * (1 - mateAllele) + (1 - parentAllele) * mateAllele
+        countAA = numpy.random.binomial(births[parent], probAA)
+        countAa = numpy.random.binomial(births[parent] - countAA, numpy.clip(probAa / numpy.maximum(1 - probAA, 1e-12), 0.0, 1.0))
+        progeny[0] += countAA
+        progeny[1] += countAa
+        progeny[2] += births[parent] - countAA - countAa
+    return progeny
+
+def lifeCycleSexualVectorized(genotypeCounts, mutationRate=0.0, generations=1, onGeneration=None, **kwargs):
+
+    '''
+    Description: as lifeCycleVectorized, for sexually reproducing groups
+
+    Parameters:
+    # genotypeCounts: integer array of shape (3, number of groups), rows counting AA, Aa, and aa
+    # mutationRate: probability that a transmitted allele is flipped
+    # generations: number of generations to run
+    # onGeneration: optional callable taking (prosocialCounts, selfishCounts), called after
+        every generation but the last
+
+    Keyword args: as for playSocialGameSexualVectorized and deathAndReproductionSexualVectorized
+
+    Returns: integer array of shape (3, number of groups) of genotype counts after the final generation
+    '''
+
+    for generation in range(generations):
+        gameOutcome = playSocialGameSexualVectorized(genotypeCounts, **kwargs)
+        genotypeCounts = deathAndReproductionSexualVectorized(genotypeCounts, gameOutcome, mutationRate, **kwargs)
+        if onGeneration is not None and generation < generations - 1:
+            onGeneration(genotypeCounts[0] + genotypeCounts[1], genotypeCounts[2])
+    return genotypeCounts
+
+def playSocialGameStrategiesVectorized(strategyCounts, helpMatrix, **kwargs):
+
+    '''
+    Description: generalizes the default social game of socialunits.group.SocialGroup to K strategies.
+        Each individual picks a random groupmate (excluding itself if prosociality is strong), and an
+        individual of strategy i helps a picked groupmate of strategy j with probability helpMatrix[i][j].
+        Helping grants the groupmate one extra reproduction chance and costs the helper the cost of
+        prosociality; since each individual picks once, it pays the cost at most once. With strategies
+        ordered as the values of socialunits.enums.Phenotype (altruistic, selfish, reciprocating), the
+        matrix [[1, 1, 1], [0, 0, 0], [0, 0, 1]] reproduces the default game. Groups with fewer than 2
+        members do not play
+
+    Parameters:
+    # strategyCounts: integer array of shape (K, number of groups)
+    # helpMatrix: array_like of shape (K, K) of help probabilities
+
+    Keyword args: typeProsociality, as for SocialGroup.playSocialGame
+
+    Returns: tuple of integer arrays (costPayers, extraChances), each of shape (K, number of groups),
+        respectively the number of individuals of each strategy per group who incurred the cost of
+        prosociality, and the number of extra reproduction chances granted to each strategy per group
+    '''
+
+    typeProsociality = kwargs['typeProsociality']
+    if not isinstance(typeProsociality, ProsocialityType):
+        raise TypeError('typeProsociality must of type socialunits.enums.ProsocialityType')
+
+    helpMatrix = numpy.asarray(helpMatrix, dtype=float)
+    numStrategies = strategyCounts.shape[0]
+    sizes = strategyCounts.sum(axis=0)
+    costPayers = numpy.zeros_like(strategyCounts)
+    extraChances = numpy.zeros_like(strategyCounts)
+    for actor in range(numStrategies):
+        if not helpMatrix[actor].any():
+            continue
+        players = numpy.where(sizes > 1, strategyCounts[actor], 0)
+        candidates = strategyCounts.astype(float)
+        if typeProsociality == ProsocialityType.strong:
+            candidates[actor] -= 1
+        candidates = numpy.maximum(candidates, 0)
+        picks = multinomialSplit(players, candidates / numpy.maximum(candidates.sum(axis=0), 1))
+        helps = numpy.random.binomial(picks, helpMatrix[actor].reshape(numStrategies, 1))
+        costPayers[actor] = helps.sum(axis=0)
+        extraChances += helps
+    return costPayers, extraChances
+
+def deathAndReproductionStrategiesVectorized(strategyCounts, gameOutcome, mutationMatrix=None, **kwargs):
+
+    '''
+    Description: generalizes deathAndReproductionVectorized to K strategies. Offspring of strategy i
+        are of strategy j with probability mutationMatrix[i][j], a multinomial draw per group
+
+    Parameters:
+    # strategyCounts: integer array of shape (K, number of groups)
+    # gameOutcome: tuple returned by playSocialGameStrategiesVectorized for the same counts
+    # mutationMatrix: optional array_like of shape (K, K) whose rows sum to 1. None means no mutation
+
+    Keyword args: as for deathAndReproductionVectorized
+
+    Returns: integer array of shape (K, number of groups) of strategy counts of progeny per group
+    '''
+
+    costPayers, extraChances = gameOutcome
+    baseChances = kwargs['baseReproductionChances']
+    baseProbability = kwargs['baseReproductionProbability']
+    costlyProbability = min(max(baseProbability - kwargs['costOfProsociality'], 0.0), 1.0)
+    baseProbability = min(max(baseProbability, 0.0), 1.0)
+
+    births = (numpy.random.binomial(costPayers * baseChances, costlyProbability) +
+              numpy.random.binomial((strategyCounts - costPayers) * baseChances, baseProbability) +
+              numpy.random.binomial(extraChances, kwargs['extraReproductionProbability']))
+    if mutationMatrix is None:
+        return births
+    mutationMatrix = numpy.asarray(mutationMatrix, dtype=float)
+    progeny = numpy.zeros_like(births)
+    for parent in range(births.shape[0]):
+        progeny += multinomialSplit(births[parent], mutationMatrix[parent])
+    return progeny
+
+def lifeCycleStrategiesVectorized(strategyCounts, kernel, mutationMatrix=None, generations=1, 
+                                  onGeneration=None, **kwargs):
+
+    '''
+    Description: as lifeCycleVectorized, for populations of K strategies
+
+    Parameters:
+    # strategyCounts: integer array of shape (K, number of groups)
+    # kernel: instance of a subclass of socialunits.kernels.PayoffKernel, which plays the social game
+    # mutationMatrix: as for deathAndReproductionStrategiesVectorized
+    # generations: number of generations to run
+    # onGeneration: optional callable taking strategyCounts, called after every generation but the last
+
+    Keyword args: as for kernel.play and deathAndReproductionStrategiesVectorized
+
+    Returns: integer array of shape (K, number of groups) of strategy counts after the final generation
+    '''
+
+    for generation in range(generations):
+        gameOutcome = kernel.play(strategyCounts, **kwargs)
+        strategyCounts = deathAndReproductionStrategiesVectorized(strategyCounts, gameOutcome, mutationMatrix, **kwargs)
+        if onGeneration is not None and generation < generations - 1:
+            onGeneration(strategyCounts)
+    return strategyCounts
+
+def multinomialSplit(totals, probabilities):
+
+    '''
+    Description: splits each of the totals among K categories by a multinomial draw, implemented as
+        a sequence of K-1 conditional binomial draws so that every total is split in one pass
+
+    Parameters:
+    # totals: integer array of shape (number of groups,)
+    # probabilities: array_like of shape (K,) or (K, number of groups), summing to 1 along the first axis
+
+    Returns: integer array of shape (K, number of groups)
+    '''
+
+    probabilities = numpy.asarray(probabilities, dtype=float)
+    if probabilities.ndim == 1:
+        probabilities = numpy.repeat(probabilities.reshape(-1, 1), len(totals), axis=1)
+    split = numpy.zeros((probabilities.shape[0], len(totals)), dtype=numpy.int64)
+    remaining = numpy.asarray(totals, dtype=numpy.int64)
+    remainingProbability = numpy.ones(len(totals))
+    for category in range(probabilities.shape[0] - 1):
+        conditional = numpy.clip(probabilities[category] / numpy.maximum(remainingProbability, 1e-12), 0.0, 1.0)
+        split[category] = numpy.random.binomial(remaining, conditional)
+        remaining = remaining - split[category]
+        remainingProbability = remainingProbability - probabilities[category]
+    split[-1] = remaining
+    return split
+
+def dealCountsToGroups(classTotals, groupSizes, segmentStarts=None):
+
+    '''
+    Description: randomly deals a pooled population, given as counts per class (e.g. per strategy),
+        into groups of the given sizes, returning the counts per class in every group. The result is
+        distributed as if individuals were shuffled and dealt out one by one, i.e. as a multivariate
+        hypergeometric draw per group, but it is computed by recursively halving the range of groups
+        with vectorized hypergeometric draws, so cost scales with the number of groups times the
+        number of classes rather than with the population. Several separately pooled populations may
+        be dealt at once, each into its own contiguous segment of the groups
+
+    Parameters:
+    # classTotals: integer array of shape (K,) of pooled counts per class, or of shape (K, number of 
+        segments) if segmentStarts is given
+    # groupSizes: integer array of shape (number of groups,) summing to the total of classTotals (of 
+        each segment's groups to the segment's total, if segmentStarts is given)
+    # segmentStarts: optional increasing integer array of the indices of the first groups of the segments, 
+        beginning with 0. Segments may be empty
+
+    Returns: integer array of shape (K, number of groups)
+    '''
+
+    classTotals = numpy.asarray(classTotals, dtype=numpy.int64)
+    groupSizes = numpy.asarray(groupSizes, dtype=numpy.int64)
+    numClasses = len(classTotals)
+    dealt = numpy.zeros((numClasses, len(groupSizes)), dtype=numpy.int64)
+    if len(groupSizes) == 0:
+        return dealt
+    cumulativeSizes = numpy.concatenate([[0], numpy.cumsum(groupSizes)])
+    # each segment is a contiguous range [start, end) of groups with its pooled counts per class
+    if segmentStarts is None:
+        starts = numpy.array([0])
+        ends = numpy.array([len(groupSizes)])
+        counts = classTotals.reshape(numClasses, 1)
+    else:
+        starts = numpy.asarray(segmentStarts, dtype=numpy.int64)
+        ends = numpy.append(starts[1:], len(groupSizes))
+        nonempty = ends > starts
+        starts, ends, counts = starts[nonempty], ends[nonempty], classTotals[:, nonempty]
+    while len(starts):
+        single = ends - starts == 1
+        dealt[:, starts[single]] = counts[:, single]
+        starts, ends, counts = starts[~single], ends[~single], counts[:, ~single]
+        if not len(starts):
+            break
+        mids = (starts + ends) // 2
+        remainingDraw = cumulativeSizes[mids] - cumulativeSizes[starts]
+        remainingPool = counts.sum(axis=0)
+        left = numpy.zeros_like(counts)
+        for classIndex in range(numClasses):
+            remainingPool = remainingPool - counts[classIndex]
+            left[classIndex] = _hypergeometric(counts[classIndex], remainingPool, remainingDraw)
+            remainingDraw = remainingDraw - left[classIndex]
+        starts, ends = numpy.concatenate([starts, mids]), numpy.concatenate([mids, ends])
+        counts = numpy.hstack([left, counts - left])
+    return dealt
+
+def priceDecomposition(parentProsocialCounts, parentSelfishCounts, progenyProsocialCounts, progenySelfishCounts):
+
+    '''
+    Description: decomposes the change in the population's prosocial proportion over one interval of
+        death and reproduction (no migration) into the two terms of the Price equation,
+            meanFitness * change in prosocial proportion = between + within,
+        where group fitness is a group's progeny per parent and every mean is weighted by group size
+        before reproduction. The between-group term is the covariance across groups of group fitness and
+        group prosocial proportion, i.e. selection between groups. The within-group term is the mean of
+        group fitness times the change of the group's prosocial proportion, i.e. selection (and mutation)
+        within groups. Groups empty before reproduction are ignored, and groups leaving no progeny have
+        fitness 0, so add nothing to the within-group term
+
+    Parameters:
+    # parentProsocialCounts, parentSelfishCounts: integer arrays of counts per group before reproduction
+    # progenyProsocialCounts, progenySelfishCounts: integer arrays of counts per group after reproduction,
+        each group in the same position as its parents
+
+    Returns: tuple of floats (between, within), both 0 if there are no parents
+    '''
+
+    parentSizes = (parentProsocialCounts + parentSelfishCounts).astype(float)
+    progenySizes = (progenyProsocialCounts + progenySelfishCounts).astype(float)
+    totalParents = parentSizes.sum()
+    if totalParents == 0:
+        return 0.0, 0.0
+    occupied = parentSizes > 0
+    parentSizes, progenySizes = parentSizes[occupied], progenySizes[occupied]
+    parentProportions = parentProsocialCounts[occupied] / parentSizes
+    progenyProportions = numpy.where(progenySizes > 0, progenyProsocialCounts[occupied] / numpy.maximum(progenySizes, 1), 
+                                     parentProportions)
+    fitnesses = progenySizes / parentSizes
+    meanFitness = progenySizes.sum() / totalParents
+    meanProportion = parentProsocialCounts.sum() / totalParents
+    between = (parentSizes * (fitnesses - meanFitness) * (parentProportions - meanProportion)).sum() / totalParents
+    within = (parentSizes * fitnesses * (progenyProportions - parentProportions)).sum() / totalParents
+    return float(between), float(within)
+
+def _hypergeometric(good, bad, draws):
+
+    '''vectorized hypergeometric draw that, unlike numpy.random.hypergeometric in older versions
+    of numpy, allows draws of zero'''
+
+    result = numpy.zeros(len(draws), dtype=numpy.int64)
+    drawing = draws > 0
+    if drawing.any():
+        result[drawing] = numpy.random.hypergeometric(good[drawing], bad[drawing], draws[drawing])
+    return result
@@ -0,0 +1,59 @@
+'''
+Package description: checks that the array-based and compiled implementations of the
+    model match the object-based implementation in distribution. Every test seeds the
+    random number generators, so the checks are reproducible. Run from src with
+    python -m unittest discover -s tests -t .
+Modules:
+# __init__.py:
+    # classes: DistributionTestCase
+# test_kernels.py:
+    # classes: KernelTest
+# test_jit.py:
+    # classes: JitTest
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+import numpy
+import unittest
+
+class DistributionTestCase(unittest.TestCase):
+
+    '''
+    Description: base class of tests comparing the sample means of two implementations that
+        should be equal in distribution
+
+    Public methods:
+    # assertSameMeans
+    '''
+
+    # bound on the z-scores of equivalent implementations; exceeded by chance with probability about 6e-5 each
+    MAX_Z_SCORE = 4.0
+
+    def assertSameMeans(self, description, samples, otherSamples):
+
+        '''
+        Description: fails if the means of any column of the samples differ by more than
+            MAX_Z_SCORE standard errors
+
+        Parameters:
+        # description: string naming the comparison in the failure message
+        # samples: array of shape (number of samples, number of statistics)
+        # otherSamples: array of the same number of statistics, from the other implementation
+
+        Errors:
+        AssertionError if any z-score exceeds MAX_Z_SCORE
+        '''
+
+        samples = numpy.asarray(samples, dtype=float)
+        otherSamples = numpy.asarray(otherSamples, dtype=float)
+        standardError = numpy.sqrt(samples.var(axis=0) / len(samples) + otherSamples.var(axis=0) / len(otherSamples))
+        zScores = (samples.mean(axis=0) - otherSamples.mean(axis=0)) / numpy.maximum(standardError, 1e-12)
+        self.assertTrue(numpy.all(numpy.abs(zScores) < self.MAX_Z_SCORE),
+                        description + ' differs in distribution: means ' + str(samples.mean(axis=0)) + ' vs. ' +
+                        str(otherSamples.mean(axis=0)) + ', z-scores ' + str(zScores))
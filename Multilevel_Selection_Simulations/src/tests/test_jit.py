@@ -0,0 +1,77 @@
+'''
+Module description:
+    checks that the kernels of socialunits.jit match their numpy or object-based
+    counterparts in distribution. Without numba, the same checks run on the fallbacks
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from tests import DistributionTestCase
+from socialunits.enums import Phenotype, Genotype, ReproductionType, ProsocialityType
+from socialunits.group import SocialGroup
+from socialunits.individual import Individual
+from socialunits.jit import seed, lifeCycleCounts, dealCounts, biasedRedistributionCounts
+from socialunits.vectorized import lifeCycleVectorized, dealCountsToGroups
+from simulation.migration import biasedRedistribution
+import numpy
+import random
+import unittest
+
+REPLICATES = 20000
+
+class _Pool:
+
+    '''stands in for a simulator in biasedRedistribution: 13 altruists and 12 selfish individuals, 5 groups'''
+
+    prosocialPhenotype = Phenotype.altruistic
+
+    def _mergeGroups(self):
+        self.allIndividuals = ([Individual(Genotype.A, ReproductionType.asexual) for _ in range(13)] +
+                               [Individual(Genotype.S, ReproductionType.asexual) for _ in range(12)])
+
+    def _resetGroupsBeforeReassignment(self):
+        self.groups = [SocialGroup(ReproductionType.asexual) for _ in range(5)]
+
+class JitTest(DistributionTestCase):
+
+    def setUp(self):
+        seed(1)
+        random.seed(1)
+
+    def testLifeCycleCountsMatchesVectorized(self):
+        prosocialCounts = numpy.full(REPLICATES, 6, dtype=numpy.int64)
+        selfishCounts = numpy.full(REPLICATES, 4, dtype=numpy.int64)
+        for prosocialPhenotype in (Phenotype.altruistic, Phenotype.reciprocating):
+            for typeProsociality in ProsocialityType:
+                kwargs = dict(reproduction=ReproductionType.asexual, typeProsociality=typeProsociality,
+                              costOfProsociality=.1, baseReproductionChances=1, baseReproductionProbability=.8,
+                              extraReproductionProbability=.5)
+                compiled = numpy.vstack(lifeCycleCounts(prosocialCounts, selfishCounts, prosocialPhenotype, .05,
+                                                        useJit=True, **kwargs)).T
+                vectorized = numpy.vstack(lifeCycleVectorized(prosocialCounts, selfishCounts, prosocialPhenotype, .05,
+                                                              **kwargs)).T
+                self.assertSameMeans('life cycle, ' + prosocialPhenotype.name + ', ' + typeProsociality.name,
+                                     compiled, vectorized)
+
+    def testDealCountsMatchesDealCountsToGroups(self):
+        groupSizes = numpy.array([10, 11, 10, 3, 0, 7])
+        compiled = numpy.array([dealCounts([20, 21], groupSizes, useJit=True)[0] for _ in range(REPLICATES)])
+        vectorized = numpy.array([dealCountsToGroups([20, 21], groupSizes)[0] for _ in range(REPLICATES)])
+        self.assertSameMeans('dealing, prosocial counts', compiled, vectorized)
+
+    def testBiasedRedistributionCountsMatchesObjects(self):
+        pool = _Pool()
+        objectCounts = []
+        for _ in range(REPLICATES // 4):
+            biasedRedistribution(pool)
+            objectCounts.append([group.countProsocial for group in pool.groups])
+        compiled = numpy.array([biasedRedistributionCounts(13, 12, 5)[0] for _ in range(REPLICATES // 4)])
+        self.assertSameMeans('biased redistribution, prosocial counts', compiled, objectCounts)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+'''
+Module description:
+    checks that the payoff kernels of socialunits.kernels match the mean progeny of the
+    default game of socialunits.group.SocialGroup, for both prosocial phenotypes and
+    both types of prosociality
+
+Created: Spring 2017
+
+Project: Multilevel_Selection_Simulations
+Course: COSI 210a, Independent study with Professor Jordan Pollack
+
+@author: William Edgecomb
+'''
+
+from tests import DistributionTestCase
+from socialunits.enums import Phenotype, Genotype, ReproductionType, ProsocialityType
+from socialunits.group import SocialGroup
+from socialunits.individual import Individual
+from socialunits.kernels import SoberWilsonKernel, PairwiseKernel
+from socialunits.vectorized import deathAndReproductionStrategiesVectorized
+import numpy
+import random
+import unittest
+
+REPLICATES = 20000
+COMPOSITION = (6, 4)
+PROSOCIAL_TYPES = ((Phenotype.altruistic, Genotype.A), (Phenotype.reciprocating, Genotype.R))
+
+class KernelTest(DistributionTestCase):
+
+    def setUp(self):
+        random.seed(0)
+        numpy.random.seed(0)
+
+    def _objectProgeny(self, prosocialGenotype, **kwargs):
+        objectProgeny = []
+        for _ in range(REPLICATES):
+            group = SocialGroup(ReproductionType.asexual)
+            group.addMembers([Individual(prosocialGenotype, ReproductionType.asexual) for _ in range(COMPOSITION[0])] +
+                             [Individual(Genotype.S, ReproductionType.asexual) for _ in range(COMPOSITION[1])])
+            group.playSocialGame(**kwargs)
+            group.deathAndReproduction(**kwargs)
+            objectProgeny.append((group.countProsocial, group.countSelfish))
+        return numpy.array(objectProgeny)
+
+    def _checkKernel(self, makeKernel):
+        counts = numpy.repeat(numpy.array(COMPOSITION).reshape(2, 1), REPLICATES, axis=1)
+        for prosocialPhenotype, prosocialGenotype in PROSOCIAL_TYPES:
+            for typeProsociality in ProsocialityType:
+                kwargs = dict(typeProsociality=typeProsociality, costOfProsociality=.1, baseReproductionChances=1,
+                              baseReproductionProbability=.8, extraReproductionProbability=.5)
+                kernel = makeKernel(prosocialPhenotype)
+                progeny = deathAndReproductionStrategiesVectorized(counts, kernel.play(counts, **kwargs), **kwargs)
+                self.assertSameMeans(kernel.__class__.__name__ + ', ' + prosocialPhenotype.name + ', ' +
+                                     typeProsociality.name, progeny.T, self._objectProgeny(prosocialGenotype, **kwargs))
+
+    def testSoberWilsonKernelMatchesSocialGroup(self):
+        self._checkKernel(SoberWilsonKernel)
+
+    def testPairwiseKernelMatchesSocialGroup(self):
+        # altruists help everyone, reciprocators only each other
+        self._checkKernel(lambda prosocialPhenotype: PairwiseKernel([[1, 1], [0, 0]] if prosocialPhenotype == Phenotype.altruistic
+                                                                    else [[1, 0], [0, 0]]))
+
+if __name__ == '__main__':
+    unittest.main()